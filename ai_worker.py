@@ -5,12 +5,21 @@ AI Translation Worker
 Background worker process that:
 1. Connects to Redis queue
 2. Loads the Gemma translation model
-3. Processes translation jobs segment by segment
-4. Updates database with AI suggestions
-5. Publishes progress updates via Redis pub/sub
+3. Serves interactive single-segment requests first, then pulls segment
+   chunks fairly across users and jobs
+4. Translates them in length-bucketed batches
+5. Writes AI suggestions back to the database in bulk
+6. Publishes progress updates via Redis pub/sub
+
+With --workers N (or auto) a supervisor runs N worker processes, each with
+its own model replica, all sharing the queue; crashed workers are restarted.
+
+The first start exports the loaded model to local safetensors
+(GEMMA_LOCAL_MODEL_DIR) so later starts memory-map it. Each worker keeps a
+readiness file fresh while it serves; --check-ready is the probe.
 
 Usage:
-    python ai_worker.py [--test]
+    python ai_worker.py [--test] [--workers N|auto] [--check-ready]
 """
 
 import os
@@ -27,6 +36,28 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///catapp.db')
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 
+# Max ids per IN (...) clause when prefetching
+IN_CLAUSE_SIZE = 500
+
+# Supervisor mode: RAM each model replica needs (4-bit 12B model + activations)
+WORKER_RAM_GB = float(os.environ.get('GEMMA_WORKER_RAM_GB', '9'))
+WORKER_RESTART_DELAY = 5  # Seconds before restarting a crashed worker
+WORKER_READY_TIMEOUT = 900  # Max seconds to wait for a replica to load before starting the next
+WORKER_SHUTDOWN_GRACE = 120  # Seconds a worker gets to finish its batch on shutdown
+# Progress is written to the job row and published at most this often,
+# unless it moved by PROGRESS_STEP_PERCENT since the last write
+PROGRESS_INTERVAL = float(os.environ.get('AI_PROGRESS_INTERVAL', '2.0'))
+PROGRESS_STEP_PERCENT = 5
+
+REAP_INTERVAL = 30  # Seconds between sweeps for expired chunk leases
+# Readiness probe: each worker touches <READY_FILE_PREFIX><worker_id>.ready
+# while serving; a probe passes if any file is fresher than READY_MAX_AGE
+READY_FILE_PREFIX = os.environ.get('AI_READY_FILE_PREFIX', '/tmp/glossio-ai-worker-')
+READY_MAX_AGE = 900  # Longer than one generation batch on the slowest hardware
+AUTO_EXPORT = os.environ.get('GEMMA_AUTO_EXPORT', '1') == '1'
+
+IDLE_WAIT_SECONDS = 1  # Blocking wait on the interactive lane between bulk queue polls
+
 # Flag for graceful shutdown
 shutdown_requested = False
 
@@ -47,138 +78,417 @@ def setup_database():
     return Session()
 
 
-def process_job(job_data: dict, session, task_queue, gemma_service):
+def chunked(items, size):
+    """Yield successive slices of `items` (keeps IN clauses under SQLite's variable limit)."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def prefetch_segments(session, segment_ids):
+    """
+    Load everything the job needs up front.
+    
+    Returns:
+        Tuple of ({segment_id: source_text}, set of segment ids that already
+        have a pending suggestion)
+    """
+    from app.models import AISuggestion, Segment
+    
+    sources = {}
+    pending = set()
+    for ids in chunked(segment_ids, IN_CLAUSE_SIZE):
+        sources.update(
+            session.query(Segment.id, Segment.source_text).filter(Segment.id.in_(ids)).all()
+        )
+        pending.update(
+            row.segment_id for row in session.query(AISuggestion.segment_id).filter(
+                AISuggestion.segment_id.in_(ids),
+                AISuggestion.status == 'pending'
+            )
+        )
+    return sources, pending
+
+
+def group_by_source(segment_ids, sources):
     """
-    Process a single translation job.
+    Group segment ids whose source text normalizes to the same string.
+    
+    Returns:
+        List of member-id lists, in order of first appearance
+    """
+    from app.services.translation_cache import normalize_source
+    
+    groups = {}
+    for sid in segment_ids:
+        groups.setdefault(normalize_source(sources[sid]), []).append(sid)
+    return list(groups.values())
+
+
+class ProgressThrottle:
+    """Decides when job progress is worth writing: on a time or percentage step."""
+    
+    def __init__(self, interval: float = PROGRESS_INTERVAL, step_percent: int = PROGRESS_STEP_PERCENT):
+        self.interval = interval
+        self.step_percent = step_percent
+        self._last_time = time.monotonic()
+        self._last_percent = 0
+    
+    def due(self, completed: int, total: int) -> bool:
+        now = time.monotonic()
+        percent = (completed * 100 // total) if total else 100
+        if now - self._last_time >= self.interval or percent - self._last_percent >= self.step_percent:
+            self._last_time = now
+            self._last_percent = percent
+            return True
+        return False
+
+
+def suggestion_rows(member_ids, job_id, translation, time_ms):
+    """
+    Suggestion rows for one translated text and all segments sharing it.
+    Only the first member carries the generation time; the rest were free.
+    """
+    now = datetime.utcnow()
+    return [{
+        'segment_id': sid,
+        'job_id': job_id,
+        'suggested_text': translation,
+        'status': 'pending',
+        'translation_time_ms': time_ms if i == 0 else 0,
+        'created_at': now
+    } for i, sid in enumerate(member_ids)]
+
+
+def process_chunk(chunk: dict, session, task_queue, gemma_service, translation_cache=None, worker_id=None):
+    """
+    Process one chunk of a translation job.
+    
+    Pipeline: prefetch all segments and existing suggestions, drop segments
+    that need no work, collapse identical sources, answer what we can from
+    the translation cache, hand the rest to batched generation (which
+    buckets by token length), and write each batch's suggestions back in
+    bulk, fanned out to every segment sharing the source.
+    
+    Several workers may hold chunks of the same job, so progress is added
+    atomically (Redis counters and completed_segments + n in SQL) and the
+    worker that finishes the last chunk finalizes the job.
+    
+    Chunks are leased: the lease is extended after every batch, a failure
+    hands the chunk back for another attempt, and a redelivered chunk
+    skips the segments an earlier attempt already finished. A cancelled
+    job is noticed before the chunk starts and between batches.
     
     Args:
-        job_data: Dict with job_id, project_id, segment_ids, target_lang
+        chunk: Leased chunk from TaskQueue.dequeue_chunk
         session: SQLAlchemy session
         task_queue: TaskQueue instance for progress updates
         gemma_service: GemmaService instance
+        translation_cache: Optional TranslationCache consulted before generation
+        worker_id: Replica whose readiness file is refreshed after every batch
     """
-    from app.models import AITranslationJob, AISuggestion, Segment
+    from sqlalchemy import update
+    from app.models import AITranslationJob, AISuggestion
     
-    job_id = job_data['job_id']
-    segment_ids = job_data['segment_ids']
-    target_lang = job_data.get('target_lang', 'ES')
+    job_id = chunk['job_id']
+    segment_ids = chunk['segment_ids']
+    source_lang = chunk.get('source_lang', 'en')
+    target_lang = chunk.get('target_lang', 'ES')
+    label = f"Job {job_id} chunk {chunk.get('chunk', 0)}"
     
-    print(f"Processing job {job_id}: {len(segment_ids)} segments -> {target_lang}")
+    print(f"Processing {label}: {len(segment_ids)} segments {source_lang} -> {target_lang}")
     
-    # Update job status
-    job = session.query(AITranslationJob).get(job_id)
-    if not job:
+    if session.get(AITranslationJob, job_id) is None:
         print(f"Job {job_id} not found in database")
+        task_queue.finish_chunk(chunk)
         return
     
-    job.status = 'running'
-    job.started_at = datetime.utcnow()
+    if task_queue.is_cancelled(job_id):
+        print(f"Job {job_id} was cancelled, dropping {label}")
+        task_queue.drop_chunk(chunk)
+        return
+    
+    # The first chunk to start flips the job to running
+    session.execute(
+        update(AITranslationJob)
+        .where(AITranslationJob.id == job_id, AITranslationJob.status == 'pending')
+        .values(status='running', started_at=datetime.utcnow())
+    )
     session.commit()
     
-    total_time_ms = 0
-    completed = 0
+    # Finished by an earlier delivery of this chunk
+    done = task_queue.done_segments(job_id, segment_ids)
+    if done:
+        print(f"  Resuming: {len(done)} segments already done")
+    
+    throttle = ProgressThrottle()
+    unsaved = 0  # Newly finished segments not yet added to completed_segments
+    dirty = False
+    last_state = None
+    last_segment = None
+    
+    def flush_progress():
+        """Write the job row and publish progress for everything reported so far."""
+        nonlocal unsaved, dirty
+        if not dirty:
+            return
+        values = {'completed_segments': AITranslationJob.completed_segments + unsaved}
+        if last_state['avg_ms']:
+            values['avg_time_per_segment'] = last_state['avg_ms'] / 1000
+        session.execute(update(AITranslationJob).where(AITranslationJob.id == job_id).values(**values))
+        session.commit()
+        unsaved = 0
+        dirty = False
+        remaining = max(0, last_state['total'] - last_state['completed'])
+        task_queue.publish_progress(
+            job_id=job_id,
+            completed=last_state['completed'],
+            total=last_state['total'],
+            segment_id=last_segment,
+            status='running',
+            project_id=chunk.get('project_id'),
+            remaining_seconds=remaining * last_state['avg_ms'] / 1000 if last_state['avg_ms'] else None
+        )
+    
+    def report(ids, time_ms=0, model_segments=0, segment_id=None):
+        """Commit pending suggestion rows, then count `ids` as finished; throttles the job row."""
+        nonlocal unsaved, dirty, last_state, last_segment
+        # Segments only count as done once their rows are written, so a failed
+        # commit leaves them for the retry
+        session.commit()
+        done.update(ids)
+        state = task_queue.record_progress(job_id, ids, time_ms, model_segments)
+        unsaved += state['added']
+        dirty = True
+        last_state = state
+        last_segment = segment_id or last_segment
+        if throttle.due(state['completed'], state['total']):
+            flush_progress()
+        return state
     
     try:
-        for segment_id in segment_ids:
-            if shutdown_requested:
-                print("Shutdown requested, pausing job...")
-                job.status = 'pending'  # Can be resumed
-                session.commit()
-                return
-            
-            # Get segment
-            segment = session.query(Segment).get(segment_id)
-            if not segment or not segment.source_text:
-                completed += 1
-                continue
+        todo_ids = [sid for sid in segment_ids if sid not in done]
+        sources, pending = prefetch_segments(session, todo_ids)
+        
+        work_ids = [
+            sid for sid in todo_ids
+            if sources.get(sid) and sid not in pending
+        ]
+        # Missing, empty and already-suggested segments count as done
+        work_set = set(work_ids)
+        skipped = [sid for sid in todo_ids if sid not in work_set]
+        if skipped:
+            report(skipped)
+        
+        # Identical sources are translated once and fanned out to every member
+        groups = group_by_source(work_ids, sources)
+        print(f"  {len(work_ids)} segments to translate ({len(groups)} unique), {len(skipped)} skipped")
+        
+        if translation_cache is not None and groups:
+            cached = translation_cache.get_many(
+                [sources[members[0]] for members in groups], source_lang, target_lang, gemma_service.model_id
+            )
+            hit_groups = [members for members in groups if sources[members[0]] in cached]
+            if hit_groups:
+                rows = []
+                for members in hit_groups:
+                    rows.extend(suggestion_rows(members, job_id, cached[sources[members[0]]], 0))
+                session.bulk_insert_mappings(AISuggestion, rows)
+                report([row['segment_id'] for row in rows])
+                groups = [members for members in groups if sources[members[0]] not in cached]
+                print(f"  {len(rows)} segments served from cache")
+        
+        batches = gemma_service.iter_translate_batches(
+            [sources[members[0]] for members in groups],
+            source_lang=source_lang,
+            target_lang=target_lang
+        )
+        
+        for indices, results in batches:
+            rows = []
+            fresh = []
+            batch_ids = []
+            batch_time_ms = 0
+            for idx, (translation, time_ms) in zip(indices, results):
+                members = groups[idx]
+                batch_ids.extend(members)
+                batch_time_ms += time_ms
+                if not translation:
+                    continue
+                rows.extend(suggestion_rows(members, job_id, translation, time_ms))
+                fresh.append((sources[members[0]], translation))
+            session.bulk_insert_mappings(AISuggestion, rows)
             
-            # Skip if already has a pending suggestion
-            existing = session.query(AISuggestion).filter_by(
-                segment_id=segment_id,
-                status='pending'
-            ).first()
-            if existing:
-                completed += 1
-                continue
+            if translation_cache is not None:
+                translation_cache.put_many(fresh, source_lang, target_lang, gemma_service.model_id)
             
-            # Translate
-            time_ms = 0  # default in case of skip or error
-            try:
-                translation, time_ms = gemma_service.translate(
-                    segment.source_text,
-                    source_lang=job_data.get('source_lang', 'en'),
-                    target_lang=target_lang
-                )
-                total_time_ms += time_ms
-                
-                # Create suggestion
-                suggestion = AISuggestion(
-                    segment_id=segment_id,
-                    job_id=job_id,
-                    suggested_text=translation,
-                    status='pending',
-                    translation_time_ms=time_ms
-                )
-                session.add(suggestion)
-                
-            except Exception as e:
-                print(f"Error translating segment {segment_id}: {e}")
-                # Continue with other segments
+            # Update job progress once per batch
+            state = report(batch_ids, batch_time_ms, len(indices), segment_id=groups[indices[-1]][0])
+            print(f"  [{state['completed']}/{state['total']}] Batch of {len(indices)}: {len(rows)} suggestions")
             
-            completed += 1
+            if task_queue.is_cancelled(job_id):
+                print(f"Job {job_id} was cancelled, stopping {label}")
+                flush_progress()
+                task_queue.drop_chunk(chunk)
+                return
             
-            # Update job progress
-            job.completed_segments = completed
-            if completed > 0 and total_time_ms > 0:
-                job.avg_time_per_segment = (total_time_ms / completed) / 1000
-            session.commit()
+            remaining = [sid for sid in segment_ids if sid not in done]
+            if shutdown_requested and remaining:
+                # This batch is written; hand the rest back before generating more
+                flush_progress()
+                task_queue.requeue_chunk(dict(chunk, segment_ids=remaining))
+                print(f"Shutdown requested, requeued {len(remaining)} segments of {label}")
+                return
             
-            # Publish progress
-            task_queue.publish_progress(
-                job_id=job_id,
-                completed=completed,
-                total=len(segment_ids),
-                segment_id=segment_id,
-                status='running'
-            )
+            if not task_queue.extend_chunk(chunk):
+                # Lease expired mid-batch and the chunk went to another worker
+                print(f"Lost lease on {label}, abandoning it")
+                flush_progress()
+                return
             
-            if time_ms > 0:
-                print(f"  [{completed}/{len(segment_ids)}] Segment {segment_id}: {time_ms}ms")
-            else:
-                print(f"  [{completed}/{len(segment_ids)}] Segment {segment_id}: skipped")
-        
-        # Job completed
-        job.status = 'completed'
-        job.completed_at = datetime.utcnow()
-        session.commit()
-        
-        task_queue.publish_progress(
-            job_id=job_id,
-            completed=completed,
-            total=len(segment_ids),
-            status='completed'
-        )
+            # Editor requests don't wait for the rest of the chunk
+            drain_interactive(task_queue, gemma_service, translation_cache)
+            if worker_id is not None:
+                # A long chunk must not look like a hung worker to the probe
+                mark_ready(worker_id)
         
-        avg_time = (total_time_ms / completed) if completed > 0 else 0
-        print(f"Job {job_id} completed: {completed} segments, avg {avg_time:.0f}ms/segment")
+        flush_progress()
+        print(f"{label} done")
+        if translation_cache is not None:
+            print(f"Translation cache: {translation_cache.stats()}")
+        if groups:
+            stats = gemma_service.generation_stats()
+            print(f"Generation: p95 {stats.get('p95_ms')}ms, {stats.get('avg_tokens_per_sec')} tok/s, "
+                  f"stops {stats.get('stop_reasons')}")
         
     except Exception as e:
-        print(f"Job {job_id} failed: {e}")
-        job.status = 'failed'
-        job.error_message = str(e)
-        job.completed_at = datetime.utcnow()
-        session.commit()
-        
-        task_queue.publish_progress(
-            job_id=job_id,
-            completed=completed,
-            total=len(segment_ids),
-            status='failed'
-        )
+        print(f"{label} failed (attempt {chunk.get('attempts', 0) + 1}): {e}")
+        session.rollback()
+        # Segments whose rows were committed stay counted (and are skipped on retry)
+        flush_progress()
+        state = task_queue.retry_chunk(chunk, error=str(e))
+        if state is not None:
+            # Out of attempts: the chunk was dead-lettered
+            session.execute(
+                update(AITranslationJob).where(AITranslationJob.id == job_id).values(error_message=str(e))
+            )
+            session.commit()
+            if state['finished']:
+                finalize_job(session, task_queue, job_id, state)
+        return
+    
+    state = task_queue.finish_chunk(chunk)
+    if state is not None and state['finished']:
+        finalize_job(session, task_queue, job_id, state)
+
+
+def serve_interactive(request: dict, task_queue, gemma_service, translation_cache=None):
+    """Translate one priority-lane request and hand the result back to its caller."""
+    text = request['text']
+    source_lang = request.get('source_lang', 'EN')
+    target_lang = request.get('target_lang', 'ES')
+    try:
+        cached = None
+        if translation_cache is not None:
+            cached = translation_cache.get(text, source_lang, target_lang, gemma_service.model_id)
+        if cached is not None:
+            result = {'translation': cached, 'time_ms': 0, 'cached': True}
+        else:
+            translation, time_ms = gemma_service.translate(text, source_lang, target_lang)
+            if translation_cache is not None and translation:
+                translation_cache.put(text, source_lang, target_lang, gemma_service.model_id, translation)
+            result = {'translation': translation, 'time_ms': time_ms, 'cached': False}
+    except Exception as e:
+        print(f"Interactive request {request['request_id']} failed: {e}")
+        result = {'error': str(e)}
+    task_queue.publish_result(request['request_id'], result)
+
+
+def drain_interactive(task_queue, gemma_service, translation_cache=None) -> int:
+    """Serve every waiting interactive request; returns how many were served."""
+    served = 0
+    while not shutdown_requested:
+        request = task_queue.dequeue_interactive()
+        if request is None:
+            break
+        serve_interactive(request, task_queue, gemma_service, translation_cache)
+        served += 1
+    return served
+
+
+def finalize_job(session, task_queue, job_id: int, state: dict):
+    """Close out a job once its last chunk is done (called by exactly one worker)."""
+    from sqlalchemy import update
+    from app.models import AITranslationJob
+    
+    job = session.get(AITranslationJob, job_id)
+    values = {'completed_at': datetime.utcnow()}
+    if state['failed_chunks']:
+        values['status'] = 'failed'
+        if job is not None and not job.error_message:
+            values['error_message'] = f"{state['failed_chunks']} of {state['chunks']} chunks failed"
+    else:
+        values['status'] = 'completed'
+        values['completed_segments'] = state['total']
+    result = session.execute(
+        update(AITranslationJob)
+        .where(AITranslationJob.id == job_id, AITranslationJob.status.in_(('pending', 'running')))
+        .values(**values)
+    )
+    session.commit()
+    if result.rowcount == 0:
+        return  # Cancelled (or already closed) meanwhile
+    
+    completed = state['total'] if values['status'] == 'completed' else state['completed']
+    task_queue.publish_progress(
+        job_id=job_id,
+        completed=completed,
+        total=state['total'],
+        status=values['status'],
+        project_id=job.project_id if job is not None else None
+    )
+    print(f"Job {job_id} {values['status']}: {completed}/{state['total']} segments, "
+          f"avg {state['avg_ms']:.0f}ms/segment")
+
 
+def ready_file(worker_id: int) -> str:
+    return f"{READY_FILE_PREFIX}{worker_id}.ready"
 
-def run_worker():
-    """Main worker loop."""
+
+def mark_ready(worker_id: int) -> None:
+    """Create or refresh this worker's readiness file."""
+    path = ready_file(worker_id)
+    with open(path, 'a'):
+        os.utime(path, None)
+
+
+def clear_ready(worker_id: int) -> None:
+    try:
+        os.remove(ready_file(worker_id))
+    except OSError:
+        pass
+
+
+def check_ready(max_age: float = READY_MAX_AGE) -> bool:
+    """Readiness probe: some worker has its model loaded and served recently."""
+    import glob
+    now = time.time()
+    for path in glob.glob(f"{READY_FILE_PREFIX}*.ready"):
+        try:
+            if now - os.path.getmtime(path) <= max_age:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def run_worker(worker_id: int = 0, ready=None):
+    """
+    Main worker loop.
+    
+    Args:
+        worker_id: Index of this replica (for logs)
+        ready: Optional multiprocessing Event set once the model is loaded
+    """
     global shutdown_requested
     
     # Set up signal handlers
@@ -186,7 +496,7 @@ def run_worker():
     signal.signal(signal.SIGTERM, signal_handler)
     
     print("=" * 60)
-    print("AI Translation Worker Starting")
+    print(f"AI Translation Worker {worker_id} Starting (pid {os.getpid()})")
     print(f"Database: {DATABASE_URL}")
     print(f"Redis: {REDIS_URL}")
     print("=" * 60)
@@ -194,37 +504,165 @@ def run_worker():
     # Initialize services
     from app.services.task_queue import TaskQueue
     from app.services.gemma_service import GemmaService
+    from app.services.translation_cache import get_translation_cache
     
     task_queue = TaskQueue(REDIS_URL)
     gemma_service = GemmaService()
+    translation_cache = get_translation_cache()
     
     # Pre-load model
     print("\nLoading translation model...")
     gemma_service.initialize()
     print(f"Model ready: {gemma_service.device_info}")
+    if AUTO_EXPORT and gemma_service.device_info['load_source'] == 'hub':
+        # One-time cost so every later start is a memory-mapped warm load
+        try:
+            gemma_service.export_local()
+        except Exception as e:
+            print(f"Model export failed, next start loads from the hub again: {e}")
+    if ready is not None:
+        ready.set()
     
     # Set up database
     session = setup_database()
+    mark_ready(worker_id)
     
     print("\nWorker ready, waiting for jobs...")
     
+    next_reap = 0
     while not shutdown_requested:
         try:
-            # Wait for job with 5 second timeout
-            job_data = task_queue.dequeue_job(timeout=5)
+            mark_ready(worker_id)
             
-            if job_data:
-                process_job(job_data, session, task_queue, gemma_service)
+            # Redeliver chunks of workers that died or hung
+            if time.time() >= next_reap:
+                next_reap = time.time() + REAP_INTERVAL
+                for state in task_queue.reap_expired():
+                    print(f"Job {state['job_id']}: a chunk ran out of attempts")
+                    if state['finished']:
+                        finalize_job(session, task_queue, state['job_id'], state)
+            
+            # Interactive requests always go first
+            if drain_interactive(task_queue, gemma_service, translation_cache):
+                continue
+            
+            chunk = task_queue.dequeue_chunk()
+            if chunk:
+                process_chunk(chunk, session, task_queue, gemma_service, translation_cache, worker_id)
+                continue
+            
+            # Whole jobs queued before chunking: split them into chunks
+            legacy = task_queue.dequeue_job()
+            if legacy:
+                if not task_queue.is_cancelled(legacy['job_id']):
+                    task_queue.enqueue_job(
+                        legacy['job_id'], legacy['project_id'], legacy['segment_ids'],
+                        legacy.get('target_lang', 'ES'), legacy.get('source_lang', 'EN'),
+                        legacy.get('pre_resolved', 0)
+                    )
+                continue
+            
+            # Idle: block on the interactive lane so editor requests start at once
+            request = task_queue.dequeue_interactive(timeout=IDLE_WAIT_SECONDS)
+            if request:
+                serve_interactive(request, task_queue, gemma_service, translation_cache)
             
         except Exception as e:
             print(f"Worker error: {e}")
             time.sleep(1)  # Brief pause before retry
     
     print("\nWorker shutting down...")
+    clear_ready(worker_id)
     session.close()
     gemma_service.unload()
 
 
+def available_memory_gb() -> float:
+    """Memory available for new processes, from /proc/meminfo where present."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / (1024 ** 2)
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') / (1024 ** 3)
+    except (AttributeError, ValueError, OSError):
+        return 0.0
+
+
+def workers_for_memory(available_gb: float, per_worker_gb: float = WORKER_RAM_GB,
+                       max_workers: int = None) -> int:
+    """How many model replicas fit in `available_gb` (at least 1, at most one per CPU)."""
+    max_workers = max_workers or os.cpu_count() or 1
+    return max(1, min(max_workers, int(available_gb // per_worker_gb)))
+
+
+def _worker_process(worker_id: int, threads: int, ready):
+    """Entry point of a supervised worker process."""
+    # Split CPU threads between replicas; must happen before torch is imported
+    os.environ.setdefault('OMP_NUM_THREADS', str(threads))
+    os.environ.setdefault('MKL_NUM_THREADS', str(threads))
+    run_worker(worker_id, ready)
+
+
+def run_supervisor(num_workers: int):
+    """
+    Run `num_workers` worker processes sharing the queue.
+    
+    Replicas start one at a time (each waits for the previous model to load,
+    so load-time memory peaks don't overlap), crashed workers are restarted,
+    and SIGINT/SIGTERM is passed on so each worker finishes its batch and
+    requeues the rest of its chunk.
+    """
+    import multiprocessing
+    
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    
+    ctx = multiprocessing.get_context('spawn')
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+    workers = {}
+    
+    def start(worker_id):
+        ready = ctx.Event()
+        process = ctx.Process(target=_worker_process, args=(worker_id, threads, ready),
+                              name=f'ai-worker-{worker_id}')
+        process.start()
+        workers[worker_id] = process
+        return ready
+    
+    print(f"Supervisor starting {num_workers} workers ({threads} CPU threads each)")
+    for worker_id in range(num_workers):
+        if shutdown_requested:
+            break
+        ready = start(worker_id)
+        deadline = time.time() + WORKER_READY_TIMEOUT
+        while not ready.wait(1) and workers[worker_id].is_alive() and time.time() < deadline:
+            if shutdown_requested:
+                break
+    
+    while not shutdown_requested:
+        for worker_id, process in list(workers.items()):
+            if not process.is_alive() and not shutdown_requested:
+                print(f"Worker {worker_id} exited with code {process.exitcode}, "
+                      f"restarting in {WORKER_RESTART_DELAY}s")
+                time.sleep(WORKER_RESTART_DELAY)
+                if not shutdown_requested:
+                    start(worker_id)
+        time.sleep(1)
+    
+    print("Supervisor stopping workers...")
+    for process in workers.values():
+        if process.is_alive():
+            process.terminate()  # SIGTERM: graceful in the worker
+    for process in workers.values():
+        process.join(timeout=WORKER_SHUTDOWN_GRACE)
+        if process.is_alive():
+            process.kill()
+
+
 def run_test():
     """Quick test of the translation service."""
     from app.services.gemma_service import GemmaService
@@ -245,7 +683,7 @@ def run_test():
     
     total_time = 0
     for source, lang in test_cases:
-        translation, time_ms = service.translate(source, lang)
+        translation, time_ms = service.translate(source, "en", lang)
         total_time += time_ms
         print(f"\nSource: {source}")
         print(f"Target ({lang}): {translation}")
@@ -267,9 +705,25 @@ def run_test():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="AI Translation Worker")
     parser.add_argument('--test', action='store_true', help='Run translation test')
+    parser.add_argument('--workers', default=os.environ.get('AI_WORKERS', '1'),
+                        help="Worker processes to run, or 'auto' to size by available RAM")
+    parser.add_argument('--check-ready', action='store_true',
+                        help='Exit 0 if a worker is loaded and serving (readiness probe)')
     args = parser.parse_args()
     
-    if args.test:
+    if args.check_ready:
+        sys.exit(0 if check_ready() else 1)
+    elif args.test:
         run_test()
     else:
-        run_worker()
+        if args.workers == 'auto':
+            available = available_memory_gb()
+            num_workers = workers_for_memory(available)
+            print(f"{available:.1f}GB available, {WORKER_RAM_GB}GB per replica -> {num_workers} workers")
+        else:
+            num_workers = max(1, int(args.workers))
+        
+        if num_workers > 1:
+            run_supervisor(num_workers)
+        else:
+            run_worker()
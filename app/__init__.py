@@ -18,6 +18,9 @@ def create_app(config_class=Config):
     login.init_app(app)
     socketio.init_app(app, async_mode=get_async_mode())
     
+    from app.services.audit_sink import audit_sink
+    audit_sink.init_app(app)
+    
     from app.extensions import init_firebase
     init_firebase(app)
     
@@ -52,9 +52,31 @@ class Config:
     
     # Feature Flags
     ENABLE_AI_FEATURES = False
+    # TM matches at or above this ratio become suggestions before the model runs
+    AI_TM_THRESHOLD = float(os.environ.get('AI_TM_THRESHOLD', '0.9'))
+    
+    # Where single-segment local model requests run: 'local' loads the model
+    # in this process (desktop build), 'worker' sends them to the AI worker's
+    # priority lane so web processes never hold the model
+    AI_INFERENCE_MODE = os.environ.get('AI_INFERENCE_MODE', 'local')
     
     # App specific config
     DEEPL_API_KEY = os.environ.get('DEEPL_API_KEY')
+    # Characters each user may send to the MT provider per calendar month (0 = unlimited);
+    # cache hits are free
+    MT_MONTHLY_CHAR_LIMIT = int(os.environ.get('MT_MONTHLY_CHAR_LIMIT', '0'))
+    # Version whose text is quoted with a segment's Bible reference, when imported offline
+    BIBLE_DEFAULT_VERSION = os.environ.get('BIBLE_DEFAULT_VERSION', 'RV1960')
+
+    # Audit logging: 'db' (batched inserts), 'jsonl' (append-only file) or 'sync'
+    AUDIT_LOG_MODE = os.environ.get('AUDIT_LOG_MODE', 'db')
+    AUDIT_LOG_PATH = os.environ.get('AUDIT_LOG_PATH') or os.path.join(os.path.expanduser('~'), '.glossio', 'audit.jsonl')
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '10000'))
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '200'))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', '1.0'))
+    # Days of raw audit rows kept hot, and days kept in the archive (0 = forever)
+    AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', '90'))
+    AUDIT_ARCHIVE_RETENTION_DAYS = int(os.environ.get('AUDIT_ARCHIVE_RETENTION_DAYS', '0'))
 
     # Firebase Config - computed at import time
     FIREBASE_CREDENTIALS_PATH = _get_firebase_credentials_path()
@@ -1,20 +1,32 @@
-from flask import request
+from flask import request, current_app
 from flask_login import current_user
 from flask_socketio import emit, join_room, leave_room
 from app.extensions import socketio, db
-from app.models import AuditLog, Segment, User, Project
+from app.models import Segment, Paragraph, User, Project
+from app.services.audit_sink import audit_sink
+from app.services.broadcast_coalescer import get_broadcast_coalescer
+from app.services.progress_relay import get_progress_relay
 from datetime import datetime
+import threading
+import time
 import json
 
 # Simple in-memory storage for active users: {project_id: {user_id: user_info}}
 project_users = {}
 
+# Streaming local translations in flight: {sid: cancel Event}
+active_streams = {}
+
 @socketio.on('join')
 def on_join(data):
     project_id = data['project_id']
     room = f"project_{project_id}"
     join_room(room)
     
+    # Job progress from AI workers is pushed to this room
+    if current_app.config.get('ENABLE_AI_FEATURES', False):
+        get_progress_relay().ensure_started(current_app._get_current_object())
+    
     # Broadcast user joined
     emit('user_joined', {
         'user_id': current_user.id,
@@ -23,14 +35,12 @@ def on_join(data):
     }, room=room)
     
     # Log action
-    log = AuditLog(
+    audit_sink.record(
         project_id=project_id,
         user_id=current_user.id,
         action='join',
         details=f"User {current_user.email} joined the session."
     )
-    db.session.add(log)
-    db.session.commit()
     
     # Update active users list
     if project_id not in project_users:
@@ -48,6 +58,9 @@ def on_join(data):
 
 @socketio.on('disconnect')
 def on_disconnect():
+    # Stop any translation this client was streaming
+    cancel_stream(request.sid)
+    
     # Find which project/room the user was in
     # Since socketio doesn't easily give us the room on disconnect without tracking,
     # we iterate our project_users tracker.
@@ -57,6 +70,8 @@ def on_disconnect():
         if user_id in users:
             del users[user_id]
             room = f"project_{pid}"
+            if not users:
+                get_broadcast_coalescer().forget_room(room)
             emit('user_left', {'user_id': user_id}, room=room)
             
             # Unlock all segments locked by this user
@@ -83,6 +98,8 @@ def on_leave(data):
     # Remove from active list
     if project_id in project_users and current_user.id in project_users[project_id]:
         del project_users[project_id][current_user.id]
+        if not project_users[project_id]:
+            get_broadcast_coalescer().forget_room(room)
         
     emit('user_left', {'user_id': current_user.id}, room=room)
     
@@ -96,7 +113,6 @@ def on_leave(data):
 
 @socketio.on('update_segment')
 def on_update_segment(data):
-    print(f"DEBUG: on_update_segment {data}")
     project_id = data['project_id']
     segment_id = data['segment_id']
     target_text = data['target_text']
@@ -104,8 +120,8 @@ def on_update_segment(data):
     
     room = f"project_{project_id}"
     
-    # Broadcast update
-    emit('segment_updated', {
+    # Queue update; the coalescer merges rapid edits and sends one frame per window
+    get_broadcast_coalescer().submit(room, 'update', {
         'segment_id': segment_id,
         'target_text': target_text,
         'note': note,
@@ -113,18 +129,17 @@ def on_update_segment(data):
         'user_name': current_user.name or current_user.email,
         'last_modified_by_name': current_user.name or current_user.email,
         'last_modified_at': datetime.utcnow().isoformat()
-    }, room=room, include_self=False)
-    print(f"DEBUG: Broadcasted to {room}")
+    })
 
 @socketio.on('typing')
 def on_typing(data):
     project_id = data['project_id']
     room = f"project_{project_id}"
-    emit('user_typing', {
+    get_broadcast_coalescer().submit(room, 'typing', {
         'user_id': current_user.id,
         'name': current_user.name or current_user.email,
         'segment_id': data.get('segment_id')
-    }, room=room, include_self=False)
+    })
 
 @socketio.on('lock_segment')
 def on_lock_segment(data):
@@ -225,3 +240,121 @@ def on_paragraph_merged(data):
     
     # Log the broadcast
     print(f"Broadcasted paragraph merge: {len(data['deleted_segment_ids'])} segments -> {data['merged_segment_id']}")
+
+def cancel_stream(sid):
+    """Signal the running stream for `sid` (if any) to stop generating."""
+    cancel = active_streams.pop(sid, None)
+    if cancel:
+        cancel.set()
+
+@socketio.on('translate_stream')
+def on_translate_stream(data):
+    """
+    Translate one segment with the local model, streaming partial output.
+    
+    Emits to the requesting client only:
+        translation_chunk: {request_id, segment_id, delta, text}
+        translation_done:  {request_id, segment_id, translation, time_ms, ttft_ms, cached, cancelled}
+        translation_error: {request_id, segment_id, error}
+    
+    A new request from the same client cancels the previous one. With
+    AI_INFERENCE_MODE=worker the translation runs on an AI worker's priority
+    lane and arrives as a single translation_done, without chunks.
+    """
+    if not current_user.is_authenticated:
+        return
+    
+    from app.services.gemma_service import GemmaService
+    from app.services.translation_cache import get_translation_cache
+    
+    sid = request.sid
+    text = data.get('text', '')
+    source_lang = data.get('source_lang', 'EN')
+    target_lang = data.get('target_lang', 'ES')
+    meta = {'request_id': data.get('request_id'), 'segment_id': data.get('segment_id')}
+    
+    cancel_stream(sid)
+    if not text.strip():
+        emit('translation_done', dict(meta, translation='', time_ms=0, ttft_ms=0, cached=False, cancelled=False))
+        return
+    
+    if current_app.config.get('AI_INFERENCE_MODE') == 'worker':
+        # The worker reads and fills the translation cache under its own backend's model id
+        from app.services.task_queue import get_task_queue
+        cancel = threading.Event()
+        active_streams[sid] = cancel
+        socketio.start_background_task(
+            run_remote, sid, meta, get_task_queue(), text, source_lang, target_lang, cancel
+        )
+        return
+    
+    service = GemmaService()
+    cache = get_translation_cache()
+    cached = cache.get(text, source_lang, target_lang, service.model_id)
+    if cached is not None:
+        emit('translation_done', dict(meta, translation=cached, time_ms=0, ttft_ms=0, cached=True, cancelled=False))
+        return
+    
+    cancel = threading.Event()
+    active_streams[sid] = cancel
+    socketio.start_background_task(
+        run_stream, sid, meta, service, cache, text, source_lang, target_lang, cancel
+    )
+
+def run_remote(sid, meta, task_queue, text, source_lang, target_lang, cancel):
+    """Background half of translate_stream in worker mode: one request on the priority lane."""
+    start = time.time()
+    try:
+        result = task_queue.translate_interactive(text, source_lang, target_lang)
+        translation = result['translation']
+        elapsed_ms = int((time.time() - start) * 1000)
+        socketio.emit('translation_done', dict(
+            meta,
+            translation='' if cancel.is_set() else translation,
+            time_ms=elapsed_ms,
+            ttft_ms=elapsed_ms,
+            cached=result.get('cached', False),
+            cancelled=cancel.is_set()
+        ), to=sid)
+    except Exception as e:
+        print(f"Worker translation error: {e}")
+        socketio.emit('translation_error', dict(meta, error=str(e)), to=sid)
+    finally:
+        if active_streams.get(sid) is cancel:
+            del active_streams[sid]
+
+def run_stream(sid, meta, service, cache, text, source_lang, target_lang, cancel):
+    """Background half of translate_stream: relay model output to `sid`."""
+    start = time.time()
+    ttft_ms = None
+    parts = []
+    try:
+        for piece in service.translate_stream(text, source_lang, target_lang, cancel_event=cancel):
+            if ttft_ms is None:
+                ttft_ms = int((time.time() - start) * 1000)
+            parts.append(piece)
+            socketio.emit('translation_chunk', dict(meta, delta=piece, text=''.join(parts)), to=sid)
+            socketio.sleep(0)
+        
+        translation = ''.join(parts).strip()
+        cancelled = cancel.is_set()
+        if translation and not cancelled:
+            cache.put(text, source_lang, target_lang, service.model_id, translation)
+        socketio.emit('translation_done', dict(
+            meta,
+            translation=translation,
+            time_ms=int((time.time() - start) * 1000),
+            ttft_ms=ttft_ms or 0,
+            cached=False,
+            cancelled=cancelled
+        ), to=sid)
+    except Exception as e:
+        print(f"Streaming translation error: {e}")
+        socketio.emit('translation_error', dict(meta, error=str(e)), to=sid)
+    finally:
+        if active_streams.get(sid) is cancel:
+            del active_streams[sid]
+
+@socketio.on('translate_cancel')
+def on_translate_cancel(data=None):
+    cancel_stream(request.sid)
@@ -68,6 +68,9 @@ class Segment(db.Model):
     locked_by_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     locked_at = db.Column(db.DateTime, nullable=True)
     
+    # Bible/EGW references found by the citation scanner at import; None = not scanned yet
+    citations = db.Column(db.JSON, nullable=True)
+    
     last_modified_by = db.relationship('User', foreign_keys=[last_modified_by_id])
     locked_by = db.relationship('User', foreign_keys=[locked_by_user_id])
     
@@ -93,12 +96,55 @@ class AuditLog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     segment_id = db.Column(db.Integer, db.ForeignKey('segment.id'), nullable=True)
     action = db.Column(db.String(50), nullable=False) # 'edit', 'merge', 'join', 'leave'
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     details = db.Column(db.Text) # JSON or text description
+    word_count = db.Column(db.Integer, nullable=True) # Target words written, for 'edit'
     
     user = db.relationship('User', backref='audit_logs')
     project = db.relationship('Project', backref='audit_logs')
 
+class AuditLogArchive(db.Model):
+    """Cold storage for AuditLog rows past the retention window"""
+    id = db.Column(db.Integer, primary_key=True) # Same id as the original AuditLog row
+    project_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer)
+    segment_id = db.Column(db.Integer)
+    action = db.Column(db.String(50), nullable=False)
+    timestamp = db.Column(db.DateTime, index=True)
+    details = db.Column(db.Text)
+    word_count = db.Column(db.Integer)
+
+class UserDailyStats(db.Model):
+    """Per-user, per-project daily productivity rollup built from AuditLog"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    edits = db.Column(db.Integer, default=0)
+    segments_completed = db.Column(db.Integer, default=0)
+    words = db.Column(db.Integer, default=0)
+    merges = db.Column(db.Integer, default=0)
+    joins = db.Column(db.Integer, default=0)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'project_id', 'day'),)
+    
+    user = db.relationship('User')
+
+
+class MTUsage(db.Model):
+    """Characters sent to (billed) or served from cache for a machine translation provider, per user per day"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    provider = db.Column(db.String(20), nullable=False, default='deepl')
+    day = db.Column(db.Date, nullable=False)
+    billed_chars = db.Column(db.Integer, default=0)
+    cached_chars = db.Column(db.Integer, default=0)
+    requests = db.Column(db.Integer, default=0)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'provider', 'day'),)
+    
+    user = db.relationship('User')
+
 
 class AITranslationJob(db.Model):
     """Tracks background translation jobs for entire documents"""
@@ -139,6 +185,8 @@ class AISuggestion(db.Model):
     suggested_text = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, accepted, rejected, edited
     translation_time_ms = db.Column(db.Integer)  # For benchmarking
+    origin = db.Column(db.String(20), default='ai')  # ai, tm_exact, tm_fuzzy
+    match_score = db.Column(db.Integer)  # TM match percentage, for tm_* origins
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     reviewed_at = db.Column(db.DateTime)
     
@@ -1,18 +1,27 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from app.models import Project, Paragraph, Segment, TranslationMemory, Glossary, User, project_assignments, AuditLog, AITranslationJob, AISuggestion
+from app.models import Project, Paragraph, Segment, TranslationMemory, Glossary, User, project_assignments, AITranslationJob, AISuggestion, UserDailyStats
 from app.services.task_queue import get_task_queue
+from app.services.broadcast_coalescer import get_broadcast_coalescer
+from app.services.audit_sink import audit_sink
+from app.services.mt_cache import translate_cached, month_usage, MTBudgetError
+from app.services.mt_client import MTAuthError, MTError
+from app.services.mt_pretranslate import untranslated_segments, start_pretranslate_job
+from app.services.http_gateway import get_http_gateway, CircuitOpenError, GatewayBusyError, GatewayTimeoutError
+from app.services.bible_cache import get_bible_cache, InvalidVersionError
+from app.services.bible_store import get_bible_store, parse_verse_spec, plain_text
+from app.services.citation_scanner import get_citation_scanner, bible_data as citation_bible_data, egw_data as citation_egw_data
 from app.extensions import db
-from app.utils import TextUtils, lookup_tm, lookup_glossary, get_nlp
+from app.utils import TextUtils, lookup_tm, lookup_tm_batch, lookup_glossary, get_nlp, segment_paragraph
 import os
 import re
-import requests
 import tempfile
 import docx
 from docx import Document
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.services.gemma_service import GemmaService
+from app.services.translation_cache import get_translation_cache, get_mt_cache
 
 # Firestore service (optional - gracefully handle if not configured)
 try:
@@ -29,6 +38,18 @@ def health_check():
     """Health check endpoint for Electron to verify backend is running."""
     return jsonify({'status': 'ok', 'version': '1.0.0'})
 
+@bp.route('/api/realtime/metrics')
+@login_required
+def realtime_metrics():
+    """Socket.IO message rates for the rooms of the user's own and assigned projects."""
+    owned = db.session.query(Project.id).filter(Project.user_id == current_user.id)
+    assigned = db.session.query(project_assignments.c.project_id).filter(
+        project_assignments.c.user_id == current_user.id
+    )
+    rooms = {f"project_{pid}" for (pid,) in owned.union(assigned).all()}
+    metrics = get_broadcast_coalescer().metrics()
+    return jsonify({room: stats for room, stats in metrics.items() if room in rooms})
+
 @bp.route('/')
 @login_required
 def index():
@@ -139,32 +160,7 @@ def process_docx_firestore():
             if not text:
                 continue
             
-            # Segment with spaCy
-            doc_spacy = nlp(text)
-            sents = [s.text.strip() for s in doc_spacy.sents if s.text.strip()]
-            
-            if not sents:
-                sents = [text]
-            
-            # Post-process to merge pronouns and verse refs (same logic as parse_docx_to_db)
-            merged_sents = []
-            pronouns = ['He', 'She', 'Him', 'Her', 'His', 'They', 'Them', 'Their', 'It', 'Its']
-            verse_ref_regex = re.compile(r'^\d?\s*[A-Za-z]+\s+\d+:\d+(?:-\d+)?$')
-            
-            for i, sent in enumerate(sents):
-                if i == 0:
-                    merged_sents.append(sent)
-                    continue
-                
-                prev = sents[i-1]
-                starts_with_pronoun = any(sent.startswith(p + ' ') or sent == p for p in pronouns)
-                prev_ends_properly = prev.rstrip().endswith(('.', '!', '?', '."', '!"', '?"'))
-                is_verse_ref = verse_ref_regex.match(sent)
-                
-                if (starts_with_pronoun and not prev_ends_properly) or is_verse_ref:
-                    merged_sents[-1] += ' ' + sent
-                else:
-                    merged_sents.append(sent)
+            merged_sents = segment_paragraph(text, nlp)
             
             segments = [{'s_idx': j, 'source_text': s} for j, s in enumerate(merged_sents)]
             
@@ -277,6 +273,8 @@ def add_firestore_collaborator(project_id):
 def parse_docx_to_db(filepath, project_id):
     doc = Document(filepath)
     nlp = get_nlp()
+    project = db.session.get(Project, project_id)
+    scanner = get_citation_scanner(project.source_lang if project else "EN")
     
     for i, p in enumerate(doc.paragraphs):
         text = p.text.strip()
@@ -291,50 +289,9 @@ def parse_docx_to_db(filepath, project_id):
         db.session.add(para)
         db.session.flush() # get ID
         
-        doc_spacy = nlp(text)
-        sents = [s.text.strip() for s in doc_spacy.sents if s.text.strip()]
-        
-        if not sents:
-             # Treat whole paragraph as one segment if spacy fails or empty
-             seg = Segment(paragraph_id=para.id, s_idx=0, source_text=text)
-             db.session.add(seg)
-        else:
-            # Post-process sents to fix pronoun-based incorrect splits and merge standalone verse references
-            merged_sents = []
-            if sents:
-                # List of capitalizedpronouns that shouldn't start new sentences after commas
-                pronouns = ['He', 'She', 'Him', 'Her', 'His', 'They', 'Them', 'Their', 'It', 'Its']
-                
-                i = 0
-                while i < len(sents):
-                    if i == 0:
-                        merged_sents.append(sents[i])
-                        i += 1
-                        continue
-                    
-                    prev = sents[i-1]
-                    curr = sents[i]
-                    
-                    # Check 1: If current starts with pronoun and previous doesn't end with sentence ender
-                    starts_with_pronoun = any(curr.startswith(p + ' ') or curr == p for p in pronouns)
-                    prev_ends_properly = prev.rstrip().endswith(('.', '!', '?', '."', '!"', '?"', '."', '!"', '?"'))
-                    
-                    # Check 2: If current is standalone verse ref (e.g. "John 3:16")
-                    verse_ref_regex = re.compile(r'^\d?\s*[A-Za-z]+\s+\d+:\d+(?:-\d+)?$')
-                    is_verse_ref = verse_ref_regex.match(curr)
-                    
-                    if (starts_with_pronoun and not prev_ends_properly) or is_verse_ref:
-                        # Merge with previous
-                        merged_sents[-1] += ' ' + curr
-                    else:
-                        merged_sents.append(curr)
-                    i += 1
-                
-                sents = merged_sents
-            
-            for j, s_text in enumerate(sents):
-                seg = Segment(paragraph_id=para.id, s_idx=j, source_text=s_text)
-                db.session.add(seg)
+        for j, s_text in enumerate(segment_paragraph(text, nlp)):
+            seg = Segment(paragraph_id=para.id, s_idx=j, source_text=s_text, citations=scanner.scan(s_text))
+            db.session.add(seg)
                 
     db.session.commit()
 
@@ -442,17 +399,42 @@ def resign_project(project_id):
     db.session.commit()
     
     # Log resignation
-    log = AuditLog(
+    audit_sink.record(
         project_id=project_id,
         user_id=current_user.id,
         action='leave',
         details=f"User {current_user.email} resigned from project."
     )
-    db.session.add(log)
-    db.session.commit()
     
     return jsonify({'status': 'success'})
 
+@bp.route('/api/project/<int:project_id>/stats', methods=['GET'])
+@login_required
+def project_stats(project_id):
+    """Daily per-user productivity from precomputed rollups."""
+    project = Project.query.get_or_404(project_id)
+    if project.user_id != current_user.id and current_user not in project.assigned_users:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    days = request.args.get('days', 30, type=int)
+    since = datetime.utcnow().date() - timedelta(days=days)
+    
+    rows = UserDailyStats.query.filter(
+        UserDailyStats.project_id == project_id,
+        UserDailyStats.day >= since
+    ).order_by(UserDailyStats.day).all()
+    
+    return jsonify([{
+        'day': r.day.isoformat(),
+        'user_id': r.user_id,
+        'user_name': (r.user.name or r.user.email) if r.user else None,
+        'edits': r.edits,
+        'segments_completed': r.segments_completed,
+        'words': r.words,
+        'merges': r.merges,
+        'joins': r.joins
+    } for r in rows])
+
 @bp.route('/api/segment/<int:segment_id>', methods=['GET'])
 @login_required
 def get_segment(segment_id):
@@ -474,9 +456,30 @@ def get_segment(segment_id):
 
     tm_match, tm_score = lookup_tm(segment.source_text, user_id=current_user.id)
     glossary_matches = lookup_glossary(segment.source_text, user_id=current_user.id)
-    bible_data = TextUtils.get_bible_url(segment.source_text)
-    # Use project source lang for abbreviations
-    egw_data = TextUtils.get_egw_url(segment.source_text, project.source_lang)
+    citations = segment.citations
+    if citations is None:
+        # Imported before citations were scanned at ingest (update_db_schema.py backfills them)
+        citations = get_citation_scanner(project.source_lang).scan(segment.source_text)
+    bible_data = citation_bible_data(citations)
+    if bible_data and bible_data.get('api_data'):
+        # Quote the passage when the default version is stored offline
+        passage = resolve_bible_passage(current_app.config['BIBLE_DEFAULT_VERSION'], bible_data['api_data'])
+        if passage:
+            bible_data['text'] = passage['text']
+    egw_data = citation_egw_data(citations)
+    
+    ai_suggestion = None
+    if current_app.config.get('ENABLE_AI_FEATURES', False):
+        suggestion = AISuggestion.query.filter_by(segment_id=segment.id).order_by(AISuggestion.created_at.desc()).first()
+        if suggestion:
+            ai_suggestion = {
+                'id': suggestion.id,
+                'suggested_text': suggestion.suggested_text,
+                'status': suggestion.status,
+                'translation_time_ms': suggestion.translation_time_ms,
+                'origin': suggestion.origin or 'ai',
+                'match_score': suggestion.match_score
+            }
     
     return jsonify({
         'id': segment.id,
@@ -490,10 +493,12 @@ def get_segment(segment_id):
         'glossary_matches': glossary_matches,
         'bible_data': bible_data,
         'egw_data': egw_data,
+        'citations': citations,
         'last_modified_by_name': (segment.last_modified_by.name or segment.last_modified_by.email) if segment.last_modified_by else None,
         'last_modified_at': segment.last_modified_at.isoformat() if segment.last_modified_at else None,
         'locked_by_user_id': segment.locked_by_user_id,
-        'locked_by_name': (segment.locked_by.name or segment.locked_by.email) if segment.locked_by else None
+        'locked_by_name': (segment.locked_by.name or segment.locked_by.email) if segment.locked_by else None,
+        'ai_suggestion': ai_suggestion
     })
 
 @bp.route('/api/segment/<int:segment_id>/save', methods=['POST'])
@@ -575,17 +580,17 @@ def save_segment(segment_id):
             exists.last_modified_by_id = current_user.id
             exists.last_modified_at = datetime.utcnow()
             
+    db.session.commit()
+    
     # Log the edit
-    log = AuditLog(
+    audit_sink.record(
         project_id=proj.id,
         user_id=current_user.id,
         segment_id=segment_id,
         action='edit',
-        details=f"Updated segment {segment.s_idx}"
+        details=f"Updated segment {segment.s_idx}",
+        word_count=len(target.split())
     )
-    db.session.add(log)
-
-    db.session.commit()
     
     return jsonify({'status': 'success'})
 
@@ -597,32 +602,110 @@ def translate_mt():
     target_lang = data.get('target_lang', 'ES')
     api_key = data.get('api_key')
     
-    translation = TextUtils.get_mt_translation(text, target_lang, api_key)
+    if not text.strip():
+        return jsonify({'translation': ''})
     
-    if translation is None:
+    api_key = api_key or current_app.config.get('DEEPL_API_KEY')
+    if not api_key:
         return jsonify({'error': 'Missing API Key'}), 400
+    
+    try:
+        # Fail fast: retries with backoff are for the pretranslate job, not a web thread
+        translation = translate_cached([text], target_lang, api_key, user_id=current_user.id, interactive=True)[0]
+    except MTAuthError:
+        return jsonify({'error': 'Invalid API Key'}), 400
+    except MTBudgetError as e:
+        return jsonify({'error': str(e)}), 429
+    except MTError as e:
+        return jsonify({'error': f"MT failed: {e}"}), 502
         
     return jsonify({'translation': translation})
 
+@bp.route('/api/translate/mt/usage', methods=['GET'])
+@login_required
+def mt_usage():
+    """The user's machine translation characters this month, budget and cache stats."""
+    return jsonify(dict(month_usage(current_user.id), cache=get_mt_cache().stats()))
+
+@bp.route('/api/upstream-stats', methods=['GET'])
+@login_required
+def upstream_stats():
+    """Outbound HTTP gateway load, coalescing and per-host circuit breaker state."""
+    return jsonify(get_http_gateway().stats())
+
+@bp.route('/api/project/<int:project_id>/mt-pretranslate', methods=['POST'])
+@login_required
+def mt_pretranslate_project(project_id):
+    """Fill all untranslated segments with DeepL in the background."""
+    project = Project.query.get_or_404(project_id)
+    if project.user_id != current_user.id and current_user not in project.assigned_users:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.json or {}
+    api_key = data.get('api_key') or current_app.config.get('DEEPL_API_KEY')
+    if not api_key:
+        return jsonify({'error': 'Missing API Key'}), 400
+    target_lang = data.get('target_lang') or project.target_lang
+    
+    segments = untranslated_segments(project_id)
+    if not segments:
+        return jsonify({'status': 'no_work', 'message': 'No untranslated segments found'})
+    
+    started = start_pretranslate_job(
+        current_app._get_current_object(), project_id, current_user.id, api_key,
+        target_lang, project.source_lang, segments
+    )
+    if not started:
+        return jsonify({'error': 'MT pretranslation already running'}), 409
+    return jsonify({'status': 'started', 'total': len(segments)}), 202
+
 @bp.route('/api/translate/local', methods=['POST'])
 @login_required
 def translate_local():
     data = request.json
     text = data.get('text', '')
+    source_lang = data.get('source_lang', 'EN')
     target_lang = data.get('target_lang', 'ES')
     
     if not text.strip():
         return jsonify({'translation': ''})
 
     try:
+        if current_app.config.get('AI_INFERENCE_MODE') == 'worker':
+            # Priority lane: a worker takes it ahead of bulk job chunks. The worker
+            # reads and fills the translation cache under its own backend's model id
+            result = get_task_queue().translate_interactive(text, source_lang, target_lang)
+            return jsonify({'translation': result['translation'], 'time_ms': result['time_ms']})
+        
         service = GemmaService() # Singleton
+        cache = get_translation_cache()
+        cached = cache.get(text, source_lang, target_lang, service.model_id)
+        if cached is not None:
+            return jsonify({'translation': cached, 'time_ms': 0, 'cached': True})
+        
         # Initialize will load model if not loaded
-        translation = service.translate(text, target_lang)
-        return jsonify({'translation': translation})
+        translation, time_ms = service.translate(text, source_lang, target_lang)
+        if translation:
+            cache.put(text, source_lang, target_lang, service.model_id, translation)
+        return jsonify({'translation': translation, 'time_ms': time_ms})
+    except TimeoutError as e:
+        return jsonify({'error': str(e)}), 504
     except Exception as e:
         print(f"Local translation error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/translate/cache-stats', methods=['GET'])
+@login_required
+def translation_cache_stats():
+    """Hit rate and size of the local model translation cache."""
+    return jsonify(get_translation_cache().stats())
+
+@bp.route('/api/translate/generation-stats', methods=['GET'])
+@login_required
+def generation_stats():
+    """Latency, tokens/sec and stop reasons of recent local model generations."""
+    return jsonify(GemmaService().generation_stats())
+
 @bp.route('/api/project/<int:project_id>/translate-all', methods=['POST'])
 @login_required
 def translate_project_all(project_id):
@@ -664,17 +747,41 @@ def translate_project_all(project_id):
         status='pending'
     )
     db.session.add(job)
+    db.session.flush()
+    
+    # TM pre-pass: exact and high fuzzy matches become suggestions right away,
+    # only the remainder is sent to the model
+    tm_resolved = resolve_from_tm(
+        job,
+        [s for s in segments if not s.target_text],
+        f"{project.source_lang}-{project.target_lang}"
+    )
+    remaining_ids = [sid for sid in segment_ids if sid not in tm_resolved]
+    job.completed_segments = len(tm_resolved)
+    
+    if not remaining_ids:
+        job.status = 'completed'
+        job.started_at = job.completed_at = datetime.utcnow()
+        db.session.commit()
+        return jsonify({
+            'status': 'success',
+            'job_id': job.id,
+            'tm_matches': len(tm_resolved),
+            'message': f'All {len(tm_resolved)} segments resolved from translation memory'
+        })
     db.session.commit()
     
     # Enqueue in Redis
     try:
         task_queue = get_task_queue()
-        task_queue.enqueue_job(job.id, project_id, segment_ids, project.target_lang)
+        task_queue.enqueue_job(job.id, project_id, remaining_ids, project.target_lang, project.source_lang,
+                               pre_resolved=len(tm_resolved), user_id=current_user.id)
         
         return jsonify({
             'status': 'success',
             'job_id': job.id,
-            'message': f'Started translation for {len(segment_ids)} segments'
+            'tm_matches': len(tm_resolved),
+            'message': f'Started translation for {len(remaining_ids)} segments ({len(tm_resolved)} from translation memory)'
         })
     except Exception as e:
         job.status = 'failed'
@@ -682,6 +789,54 @@ def translate_project_all(project_id):
         db.session.commit()
         return jsonify({'error': str(e)}), 500
 
+def resolve_from_tm(job, segments, lang_pair):
+    """
+    Write TM matches at or above AI_TM_THRESHOLD as suggestions for `job`.
+    Segments that already have a pending suggestion are left alone.
+    
+    Returns:
+        Set of segment ids resolved from the TM
+    """
+    threshold = current_app.config.get('AI_TM_THRESHOLD', 0.9)
+    matches = lookup_tm_batch(
+        [s.source_text for s in segments],
+        threshold=threshold,
+        user_id=current_user.id,
+        lang_pair=lang_pair
+    )
+    if not matches:
+        return set()
+    
+    candidates = [s for s in segments if s.source_text in matches]
+    pending = set()
+    ids = [s.id for s in candidates]
+    for i in range(0, len(ids), 500):
+        pending.update(
+            row.segment_id for row in db.session.query(AISuggestion.segment_id).filter(
+                AISuggestion.segment_id.in_(ids[i:i + 500]),
+                AISuggestion.status == 'pending'
+            )
+        )
+    
+    now = datetime.utcnow()
+    rows = []
+    for segment in candidates:
+        if segment.id in pending:
+            continue
+        target, score = matches[segment.source_text]
+        rows.append({
+            'segment_id': segment.id,
+            'job_id': job.id,
+            'suggested_text': target,
+            'status': 'pending',
+            'translation_time_ms': 0,
+            'origin': 'tm_exact' if score >= 100 else 'tm_fuzzy',
+            'match_score': score,
+            'created_at': now
+        })
+    db.session.bulk_insert_mappings(AISuggestion, rows)
+    return {row['segment_id'] for row in rows}
+
 @bp.route('/api/project/<int:project_id>/translation-job', methods=['GET'])
 @login_required
 def get_translation_job(project_id):
@@ -704,6 +859,45 @@ def get_translation_job(project_id):
         'error': job.error_message
     })
 
+@bp.route('/api/project/<int:project_id>/translation-job/cancel', methods=['POST'])
+@login_required
+def cancel_translation_job(project_id):
+    """Cancel the project's active translation job; workers stop within one batch."""
+    if not current_app.config.get('ENABLE_AI_FEATURES', False):
+        return jsonify({'error': 'AI features are disabled in this build'}), 403
+    
+    project = Project.query.get_or_404(project_id)
+    if project.user_id != current_user.id and current_user not in project.assigned_users:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    job = AITranslationJob.query.filter(
+        AITranslationJob.project_id == project_id,
+        AITranslationJob.status.in_(('pending', 'running'))
+    ).order_by(AITranslationJob.created_at.desc()).first()
+    if not job:
+        return jsonify({'error': 'No active translation job'}), 404
+    
+    job.status = 'cancelled'
+    job.completed_at = datetime.utcnow()
+    db.session.commit()
+    
+    try:
+        task_queue = get_task_queue()
+        task_queue.cancel_job(job.id)
+        task_queue.publish_progress(job.id, job.completed_segments, job.total_segments,
+                                    status='cancelled', project_id=project_id)
+    except Exception as e:
+        # The job row is already cancelled; workers that can't see the flag
+        # still won't finalize it
+        current_app.logger.warning(f"Could not flag job {job.id} as cancelled in the queue: {e}")
+    
+    return jsonify({
+        'status': 'success',
+        'job_id': job.id,
+        'completed': job.completed_segments,
+        'total': job.total_segments
+    })
+
 @bp.route('/api/segment/<int:segment_id>/suggestion/accept', methods=['POST'])
 @login_required
 def accept_suggestion(segment_id):
@@ -818,15 +1012,13 @@ def merge_paragraph(paragraph_id):
     db.session.commit()
     
     # Log the merge
-    log = AuditLog(
+    audit_sink.record(
         project_id=project.id,
         user_id=current_user.id,
         segment_id=first_seg.id,
         action='merge',
         details=f"Merged paragraph {para.p_idx}, {len(segments)} segments into 1"
     )
-    db.session.add(log)
-    db.session.commit()
     
     # Return comprehensive data for UI update
     return jsonify({
@@ -887,15 +1079,13 @@ def merge_prev(segment_id):
     db.session.commit()
     
     # Log the merge
-    log = AuditLog(
+    audit_sink.record(
         project_id=proj.id,
         user_id=current_user.id,
         segment_id=prev_seg.id,
         action='merge',
         details=f"Merged segment {curr_seg.s_idx} with previous in paragraph {para.p_idx}"
     )
-    db.session.add(log)
-    db.session.commit()
     
     # Return comprehensive data for UI update
     return jsonify({
@@ -1031,41 +1221,108 @@ def api_load_glossary():
              return jsonify({'status': 'error', 'message': str(e)})
     return jsonify({'status': 'error', 'message': 'Invalid file'})
 
+def proxy_json(fetch):
+    """Relay a JSON document from an upstream API, mapping gateway failures to HTTP errors."""
+    try:
+        return jsonify(fetch())
+    except InvalidVersionError as e:
+        # Not ValueError: a non-JSON upstream body (JSONDecodeError) is a 502
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except (CircuitOpenError, GatewayBusyError) as e:
+        return jsonify({'error': str(e)}), 503
+    except GatewayTimeoutError as e:
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        return jsonify({'error': str(e)}), 502
+
+def bible_source(slug):
+    """The offline store when the version is imported, else the bolls.life cache."""
+    store = get_bible_store()
+    return store if store.has_version(slug) else get_bible_cache()
+
+def bible_versions():
+    try:
+        return get_bible_cache().get_versions()
+    except Exception:
+        # Offline with no cached list: offer what was imported
+        listing = get_bible_store().versions_listing()
+        if not listing:
+            raise
+        return listing
+
+def resolve_bible_passage(slug, api_data, allow_network=False):
+    """
+    Text of a reference found by TextUtils.get_bible_url.
+
+    Returns:
+        {'verses': [...], 'text': ...} or None; without allow_network only
+        the offline store is consulted
+    """
+    book, chapter = int(api_data['book_id']), int(api_data['chapter'])
+    store = get_bible_store()
+    if store.has_version(slug):
+        return store.get_passage(slug, book, chapter, api_data.get('verse') or '')
+    if not allow_network:
+        return None
+    wanted = set(parse_verse_spec(api_data.get('verse') or ''))
+    verses = [{'verse': v['verse'], 'text': plain_text(v['text'])}
+              for v in get_bible_cache().get_chapter(slug, book, chapter) if not wanted or v['verse'] in wanted]
+    if not verses:
+        return None
+    return {'verses': verses, 'text': ' '.join(v['text'] for v in verses)}
+
 @bp.route('/api/bible/versions', methods=['GET'])
 @login_required
 def proxy_bible_versions():
-    try:
-        r = requests.get('https://bolls.life/static/bolls/app/views/languages.json', timeout=10)
-        return jsonify(r.json())
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return proxy_json(bible_versions)
 
 @bp.route('/api/bible/books/<slug>', methods=['GET'])
 @login_required
 def proxy_bible_books(slug):
-    try:
-        url = f'https://bolls.life/get-books/{slug}/'
-        r = requests.get(url, timeout=10)
-        return jsonify(r.json())
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return proxy_json(lambda: bible_source(slug).get_books(slug))
 
 @bp.route('/api/bible/text/<slug>/<int:book>/<int:chapter>', methods=['GET'])
 @login_required
 def proxy_bible_chapter(slug, book, chapter):
-    try:
-        url = f'https://bolls.life/get-text/{slug}/{book}/{chapter}/'
-        r = requests.get(url, timeout=10)
-        return jsonify(r.json())
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return proxy_json(lambda: bible_source(slug).get_chapter(slug, book, chapter))
 
 @bp.route('/api/bible/verse/<slug>/<int:book>/<int:chapter>/<int:verse>', methods=['GET'])
 @login_required
 def proxy_bible_verse(slug, book, chapter, verse):
+    # Served from the stored or cached chapter: no per-verse upstream calls
+    return proxy_json(lambda: bible_source(slug).get_verse(slug, book, chapter, verse))
+
+@bp.route('/api/bible/passage/<slug>', methods=['GET'])
+@login_required
+def bible_passage(slug):
+    """Resolve a reference like 'Juan 3:16-18, 20' (?ref=) to its text."""
+    bible_data = TextUtils.get_bible_url(request.args.get('ref', ''))
+    if not bible_data or not bible_data.get('api_data'):
+        return jsonify({'error': 'No Bible reference found'}), 400
+
+    def fetch():
+        passage = resolve_bible_passage(slug, bible_data['api_data'], allow_network=True)
+        if passage is None:
+            raise LookupError(f"{bible_data['match']} not found in {slug}")
+        return dict(passage, match=bible_data['match'], version=slug, **bible_data['api_data'])
+    return proxy_json(fetch)
+
+@bp.route('/api/bible/preload/<slug>', methods=['POST'])
+@login_required
+def preload_bible_version(slug):
+    """Download a whole version into the Bible cache so the panel works offline."""
     try:
-        url = f'https://bolls.life/get-verse/{slug}/{book}/{chapter}/{verse}/'
-        r = requests.get(url, timeout=10)
-        return jsonify(r.json())
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        started = get_bible_cache().start_preload(slug)
+    except InvalidVersionError as e:
+        return jsonify({'error': str(e)}), 400
+    if not started:
+        return jsonify({'error': 'Preload already running'}), 409
+    return jsonify({'status': 'started', 'version': slug}), 202
+
+@bp.route('/api/bible/cache', methods=['GET'])
+@login_required
+def bible_cache_stats():
+    """Bible cache hits, cached versions, preload progress and the offline store."""
+    return jsonify(dict(get_bible_cache().stats(), store=get_bible_store().stats()))
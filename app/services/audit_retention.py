@@ -0,0 +1,173 @@
+"""
+AuditLog retention and daily productivity rollups.
+
+- rollup_daily_stats(): aggregates audit_log and audit_log_archive into
+  user_daily_stats (edits, segments completed, words, merges, joins per
+  user/project/day)
+- archive_audit_logs(): moves rows older than the retention window into
+  audit_log_archive so the hot table stays small
+- purge_archive(): deletes archived rows past the archive retention window
+
+Rollups are always refreshed before archiving, so dashboards reading
+user_daily_stats never lose history when raw rows move out.
+Must be called inside an app context.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, distinct, func
+
+from app.extensions import db
+from app.models import AuditLog, AuditLogArchive, UserDailyStats
+
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def _as_date(value) -> date:
+    # SQLite returns func.date() as a 'YYYY-MM-DD' string
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _audit_rows():
+    """audit_log and audit_log_archive as one selectable, so archived days can be rebuilt."""
+    columns = ('user_id', 'project_id', 'segment_id', 'action', 'timestamp', 'word_count')
+    hot, cold = AuditLog.__table__, AuditLogArchive.__table__
+    return db.union_all(
+        db.select(*[hot.c[c] for c in columns]),
+        db.select(*[cold.c[c] for c in columns]),
+    ).subquery('audit_rows')
+
+
+def rollup_daily_stats(since: Optional[date] = None) -> int:
+    """
+    Rebuild daily rollups from `since` onwards, from audit_log and its archive.
+
+    Days whose raw rows were purged from the archive are never rebuilt:
+    `since` is clamped to the oldest remaining day (purges drop whole days,
+    so that day is complete).
+
+    Args:
+        since: First day to recompute. Defaults to the last rolled-up day
+               (it may have been partial) or the oldest audit row.
+
+    Returns:
+        Number of rollup rows written
+    """
+    rows_src = _audit_rows()
+    oldest = db.session.query(func.min(rows_src.c.timestamp)).scalar()
+    if oldest is None:
+        return 0
+    oldest_day = _as_date(oldest)
+
+    if since is None:
+        last_day = db.session.query(func.max(UserDailyStats.day)).scalar()
+        since = _as_date(last_day) if last_day is not None else oldest_day
+    since = max(since, oldest_day)
+
+    start = datetime.combine(since, datetime.min.time())
+    day_col = func.date(rows_src.c.timestamp)
+    is_edit = rows_src.c.action == 'edit'
+
+    rows = db.session.query(
+        rows_src.c.user_id,
+        rows_src.c.project_id,
+        day_col.label('day'),
+        func.sum(case((is_edit, 1), else_=0)).label('edits'),
+        func.count(distinct(case((is_edit, rows_src.c.segment_id)))).label('segments_completed'),
+        func.sum(case((is_edit, func.coalesce(rows_src.c.word_count, 0)), else_=0)).label('words'),
+        func.sum(case((rows_src.c.action == 'merge', 1), else_=0)).label('merges'),
+        func.sum(case((rows_src.c.action == 'join', 1), else_=0)).label('joins'),
+    ).filter(
+        rows_src.c.timestamp >= start
+    ).group_by(
+        rows_src.c.user_id, rows_src.c.project_id, day_col
+    ).all()
+
+    UserDailyStats.query.filter(UserDailyStats.day >= since).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(UserDailyStats, [{
+        'user_id': r.user_id,
+        'project_id': r.project_id,
+        'day': _as_date(r.day),
+        'edits': r.edits or 0,
+        'segments_completed': r.segments_completed or 0,
+        'words': r.words or 0,
+        'merges': r.merges or 0,
+        'joins': r.joins or 0,
+    } for r in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def archive_audit_logs(older_than_days: int, refresh_rollups: bool = True) -> int:
+    """
+    Move audit_log rows older than `older_than_days` into audit_log_archive.
+
+    Args:
+        older_than_days: Retention window for the hot table
+        refresh_rollups: Bring rollups up to date first, so the rows being
+                         archived are already counted
+
+    Returns:
+        Number of rows archived
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    if refresh_rollups:
+        rollup_daily_stats()
+
+    columns = ['id', 'project_id', 'user_id', 'segment_id', 'action',
+               'timestamp', 'details', 'word_count']
+    source = AuditLog.__table__
+    archived = 0
+
+    while True:
+        ids = [row.id for row in db.session.query(AuditLog.id).filter(
+            AuditLog.timestamp < cutoff
+        ).order_by(AuditLog.id).limit(ARCHIVE_BATCH_SIZE)]
+        if not ids:
+            break
+
+        select_batch = db.select(*[source.c[c] for c in columns]).where(source.c.id.in_(ids))
+        db.session.execute(AuditLogArchive.__table__.insert().from_select(columns, select_batch))
+        db.session.execute(source.delete().where(source.c.id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+
+    return archived
+
+
+def purge_archive(older_than_days: int) -> int:
+    """
+    Delete archived rows older than `older_than_days`. Returns rows deleted.
+
+    Only whole days are purged, so the oldest remaining day can still be rolled up.
+    """
+    cutoff = datetime.combine((datetime.utcnow() - timedelta(days=older_than_days)).date(), datetime.min.time())
+    deleted = AuditLogArchive.query.filter(
+        AuditLogArchive.timestamp < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def run_retention(retention_days: int, archive_retention_days: int = 0) -> dict:
+    """
+    Full maintenance pass: rollup, archive, then purge.
+
+    Args:
+        retention_days: Days of raw rows kept in audit_log
+        archive_retention_days: Days kept in the archive (0 = keep forever)
+    """
+    result = {
+        'rollup_rows': rollup_daily_stats(),
+        'archived': archive_audit_logs(retention_days, refresh_rollups=False),
+        'purged': 0,
+    }
+    if archive_retention_days > 0:
+        result['purged'] = purge_archive(archive_retention_days)
+    return result
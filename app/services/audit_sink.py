@@ -0,0 +1,166 @@
+"""
+Asynchronous, batched AuditLog writer.
+
+Request and socket handlers call `audit_sink.record(...)` instead of adding an
+AuditLog row and committing. Entries are queued in memory and written by a
+background flusher:
+- 'db' mode bulk-inserts queued entries into the audit_log table
+- 'jsonl' mode appends one JSON object per line to an append-only file
+- 'sync' mode writes each entry immediately (no background thread)
+
+The queue is bounded. When it is full the caller flushes inline instead of
+dropping entries, which slows the producer down until the writer catches up.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+MODES = ('db', 'jsonl', 'sync')
+
+
+class AuditSink:
+    """Queues audit entries and writes them in batches."""
+
+    def __init__(self):
+        self.app = None
+        self.mode = 'db'
+        self.path = None
+        self.batch_size = 200
+        self.flush_interval = 1.0
+        self._queue = queue.Queue(maxsize=10000)
+        self._write_lock = threading.Lock()
+        self._flusher = None
+        self.written_total = 0
+        self.inline_flushes = 0
+
+    def init_app(self, app) -> None:
+        """Read configuration from the Flask app and start the flusher."""
+        self.app = app
+        self.mode = app.config.get('AUDIT_LOG_MODE', 'db')
+        if self.mode not in MODES:
+            print(f"Unknown AUDIT_LOG_MODE '{self.mode}', falling back to 'db'")
+            self.mode = 'db'
+        self.path = app.config.get('AUDIT_LOG_PATH')
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', self.flush_interval)
+
+        max_queue = app.config.get('AUDIT_QUEUE_SIZE', 10000)
+        if self._queue.maxsize != max_queue and self._queue.empty():
+            self._queue = queue.Queue(maxsize=max_queue)
+
+        if self.mode != 'sync' and self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    @property
+    def pending(self) -> int:
+        """Number of entries waiting to be written."""
+        return self._queue.qsize()
+
+    def record(self, project_id: int, action: str, user_id: Optional[int] = None,
+               segment_id: Optional[int] = None, details: Optional[str] = None,
+               word_count: Optional[int] = None) -> None:
+        """
+        Queue an audit entry.
+
+        Args:
+            project_id: Project the action belongs to
+            action: 'edit', 'merge', 'join', 'leave', ...
+            user_id: Acting user
+            segment_id: Affected segment (if any)
+            details: Free-form description
+            word_count: Words in the saved target text (edits only)
+        """
+        entry = {
+            'project_id': project_id,
+            'user_id': user_id,
+            'segment_id': segment_id,
+            'action': action,
+            'details': details,
+            'word_count': word_count,
+            'timestamp': datetime.utcnow(),
+        }
+
+        if self.mode == 'sync' or self.app is None:
+            self._write([entry])
+            return
+
+        try:
+            self._queue.put(entry, timeout=0.05)
+        except queue.Full:
+            # Backpressure: the caller pays for a flush instead of losing the entry
+            self.inline_flushes += 1
+            self.flush()
+            self._queue.put_nowait(entry)
+
+    def flush(self) -> int:
+        """Write everything queued so far. Returns the number of entries written."""
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            self._write(batch)
+            written += len(batch)
+
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first] + self._take(self.batch_size - 1)
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Error writing {len(batch)} audit entries: {e}")
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        with self._write_lock:
+            if self.mode == 'jsonl':
+                self._write_jsonl(entries)
+            else:
+                self._write_db(entries)
+            self.written_total += len(entries)
+
+    def _write_db(self, entries: List[Dict[str, Any]]) -> None:
+        from app.extensions import db
+        from app.models import AuditLog
+
+        if self.app is None:
+            # Called inside an existing app context (e.g. scripts)
+            db.session.execute(AuditLog.__table__.insert(), entries)
+            db.session.commit()
+            return
+
+        # Separate app context so the flusher never shares a request's session
+        with self.app.app_context():
+            db.session.execute(AuditLog.__table__.insert(), entries)
+            db.session.commit()
+            db.session.remove()
+
+    def _write_jsonl(self, entries: List[Dict[str, Any]]) -> None:
+        path = self.path or os.path.join(os.path.expanduser('~'), '.glossio', 'audit.jsonl')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                line = dict(entry, timestamp=entry['timestamp'].isoformat())
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+
+audit_sink = AuditSink()
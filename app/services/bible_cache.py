@@ -0,0 +1,278 @@
+"""
+On-disk caching proxy for the bolls.life Bible API.
+
+The Bible panel asks for the version list, a version's books and whole
+chapters. Each answer is stored as a JSON envelope under BIBLE_CACHE_DIR
+together with the upstream ETag / Last-Modified:
+- Fresh entries (younger than the kind's max age) are served from disk,
+  with a small in-memory LRU in front for the chapters in use
+- Stale entries are revalidated with If-None-Match / If-Modified-Since;
+  a 304 only refreshes the timestamp
+- If bolls.life is unreachable, stale entries are served as they are, so
+  cached versions keep working offline
+- Single verses are cut out of the cached chapter instead of being
+  fetched one by one
+- preload_version() downloads every chapter of a version ahead of time
+
+Upstream calls go through the HTTP gateway (pool, circuit breaker).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.http_gateway import HttpGateway, get_http_gateway
+
+BOLLS_BASE_URL = os.environ.get('BOLLS_BASE_URL', 'https://bolls.life')
+CACHE_DIR = os.environ.get('BIBLE_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.glossio', 'bible_cache')
+
+# Seconds before an entry is revalidated; Bible text practically never changes
+MAX_AGE = {
+    'versions': 86400,
+    'books': 7 * 86400,
+    'text': 30 * 86400,
+}
+
+# Chapters kept decoded in memory
+MEMORY_ENTRIES = 256
+
+# Chapters downloaded in parallel by preload_version (below the gateway's pending limit)
+PRELOAD_CONCURRENCY = 4
+
+_SLUG = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+
+class InvalidVersionError(ValueError):
+    """The version slug is malformed (a client error, unlike a bad upstream body)."""
+
+
+def _check_slug(slug: str) -> str:
+    if not _SLUG.match(slug or ''):
+        raise InvalidVersionError(f"Invalid Bible version '{slug}'")
+    return slug
+
+
+class BibleCache:
+    """ETag-revalidating disk cache in front of bolls.life."""
+
+    def __init__(self, cache_dir: Optional[str] = None, base_url: Optional[str] = None,
+                 gateway: Optional[HttpGateway] = None, clock: Callable[[], float] = time.time):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.base_url = (base_url or BOLLS_BASE_URL).rstrip('/')
+        self.gateway = gateway or get_http_gateway()
+        self.clock = clock
+        self.hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+        self.stale_served = 0
+        self.preloads: Dict[str, Dict] = {}
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- storage ---------------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, *key.split('/')) + '.json'
+
+    def _read(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _write(self, key: str, entry: Dict) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._remember(key, entry)
+
+    # --- fetching --------------------------------------------------------
+
+    def _get(self, key: str, url: str, kind: str) -> Any:
+        """
+        Return the cached document for `key`, revalidating or fetching as needed.
+
+        Raises:
+            The gateway or requests error, when nothing is cached
+        """
+        entry = self._read(key)
+        now = self.clock()
+        if entry is not None and now - entry['fetched_at'] < MAX_AGE[kind]:
+            self.hits += 1
+            return entry['data']
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            response = self.gateway.request('GET', url, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                entry = dict(entry, fetched_at=now)
+                self._write(key, entry)
+                self.revalidated += 1
+                return entry['data']
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            if entry is None:
+                raise
+            # Offline or upstream down: old text beats no text
+            self.stale_served += 1
+            return entry['data']
+
+        self._write(key, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': now,
+            'data': data,
+        })
+        self.fetched += 1
+        return data
+
+    def get_versions(self) -> Any:
+        """Languages and their versions, as bolls.life lists them."""
+        return self._get('versions', f"{self.base_url}/static/bolls/app/views/languages.json", 'versions')
+
+    def get_books(self, slug: str) -> List[Dict]:
+        """Books of a version: bookid, name, chapters, ..."""
+        _check_slug(slug)
+        return self._get(f"books/{slug}", f"{self.base_url}/get-books/{slug}/", 'books')
+
+    def get_chapter(self, slug: str, book: int, chapter: int) -> List[Dict]:
+        """Verses of a chapter: [{pk, verse, text}, ...]."""
+        _check_slug(slug)
+        return self._get(f"text/{slug}/{int(book)}/{int(chapter)}",
+                         f"{self.base_url}/get-text/{slug}/{int(book)}/{int(chapter)}/", 'text')
+
+    def get_verse(self, slug: str, book: int, chapter: int, verse: int) -> Dict:
+        """
+        One verse, cut out of its cached chapter, shaped like bolls.life's get-verse.
+
+        Raises:
+            LookupError: The chapter has no such verse
+        """
+        for item in self.get_chapter(slug, book, chapter) or []:
+            if item.get('verse') == verse:
+                return dict(item, translation=slug, book=book, chapter=chapter)
+        raise LookupError(f"Verse {book}:{chapter}:{verse} not found in {slug}")
+
+    def preload_version(self, slug: str, progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Download every chapter of a version into the cache.
+
+        Args:
+            slug: Version, e.g. 'RV1960'
+            progress: Optional callback(done, total) after each chapter
+
+        Returns:
+            Dict with chapters total, loaded and failed
+        """
+        books = self.get_books(slug)
+        chapters = [(b['bookid'], c) for b in books for c in range(1, int(b.get('chapters') or 0) + 1)]
+        summary = {'version': slug, 'chapters': len(chapters), 'loaded': 0, 'failed': 0}
+        done_lock = threading.Lock()
+
+        def load(item):
+            try:
+                self.get_chapter(slug, *item)
+                ok = True
+            except Exception as e:
+                print(f"Preload of {slug} {item[0]}:{item[1]} failed: {e}")
+                ok = False
+            with done_lock:
+                summary['loaded' if ok else 'failed'] += 1
+                if progress:
+                    progress(summary['loaded'] + summary['failed'], len(chapters))
+
+        with ThreadPoolExecutor(max_workers=PRELOAD_CONCURRENCY) as pool:
+            list(pool.map(load, chapters))
+        return summary
+
+    def start_preload(self, slug: str) -> bool:
+        """
+        Preload a version in the background; progress is kept in self.preloads.
+
+        Returns:
+            False if that version is already being preloaded
+        """
+        from app.extensions import socketio
+
+        _check_slug(slug)
+        with self._lock:
+            if self.preloads.get(slug, {}).get('status') == 'running':
+                return False
+            self.preloads[slug] = {'status': 'running', 'done': 0, 'total': None}
+
+        def run():
+            status = self.preloads[slug]
+            try:
+                summary = self.preload_version(slug, progress=lambda done, total: status.update(done=done, total=total))
+                status.update(summary, status='completed')
+            except Exception as e:
+                status.update(status='failed', error=str(e))
+
+        socketio.start_background_task(run)
+        return True
+
+    def cached_versions(self) -> Dict[str, int]:
+        """Chapters on disk per version."""
+        root = os.path.join(self.cache_dir, 'text')
+        counts = {}
+        if os.path.isdir(root):
+            for slug in sorted(os.listdir(root)):
+                counts[slug] = sum(
+                    1 for _, _, files in os.walk(os.path.join(root, slug)) for name in files if name.endswith('.json')
+                )
+        return counts
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.revalidated + self.fetched + self.stale_served
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'fetched': self.fetched,
+            'stale_served': self.stale_served,
+            'hit_rate': round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'cache_dir': self.cache_dir,
+            'versions': self.cached_versions(),
+            'preloads': self.preloads,
+        }
+
+
+# Singleton instance for the application
+_bible_cache = None
+
+def get_bible_cache() -> BibleCache:
+    """Get the global Bible cache."""
+    global _bible_cache
+    if _bible_cache is None:
+        _bible_cache = BibleCache()
+    return _bible_cache
@@ -0,0 +1,349 @@
+"""
+Offline Bible corpus store.
+
+Whole versions are imported into a local SQLite file (BIBLE_STORE_PATH) and
+served from there instead of bolls.life:
+- verses is a WITHOUT ROWID table clustered on (version, book, chapter,
+  verse), so a chapter or verse range is one index range scan
+- Importers read bolls.life's full-translation downloads
+  (/static/translations/<slug>.zip, a JSON list of
+  {pk, translation, book, chapter, verse, text}) from a local file or
+  straight from the site
+- get_books/get_chapter/get_verse answer in the same shapes as the
+  bolls.life API (and BibleCache), so the /api/bible/* routes can use
+  whichever has the version
+- get_passage resolves a verse spec like "16-18, 20", as found by
+  TextUtils.get_bible_url, to text
+"""
+
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.services.http_gateway import HttpGateway, get_http_gateway
+
+BOLLS_BASE_URL = os.environ.get('BOLLS_BASE_URL', 'https://bolls.life')
+
+# A full translation download is tens of MB
+DOWNLOAD_DEADLINE = 300.0
+
+# Verses per executemany batch during import
+IMPORT_BATCH = 5000
+
+# Book names for versions imported without a books list
+DEFAULT_BOOK_NAMES = [
+    "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy", "Joshua", "Judges", "Ruth",
+    "1 Samuel", "2 Samuel", "1 Kings", "2 Kings", "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah",
+    "Esther", "Job", "Psalms", "Proverbs", "Ecclesiastes", "Song of Solomon", "Isaiah", "Jeremiah",
+    "Lamentations", "Ezekiel", "Daniel", "Hosea", "Joel", "Amos", "Obadiah", "Jonah", "Micah", "Nahum",
+    "Habakkuk", "Zephaniah", "Haggai", "Zechariah", "Malachi", "Matthew", "Mark", "Luke", "John", "Acts",
+    "Romans", "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians", "Philippians", "Colossians",
+    "1 Thessalonians", "2 Thessalonians", "1 Timothy", "2 Timothy", "Titus", "Philemon", "Hebrews", "James",
+    "1 Peter", "2 Peter", "1 John", "2 John", "3 John", "Jude", "Revelation",
+]
+
+# bolls.life text carries Strong's numbers (<S>1234</S>) and inline markup
+_STRONGS = re.compile(r'<S>\d+</S>')
+_TAGS = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'\s+')
+
+
+def parse_verse_spec(spec: str) -> List[int]:
+    """
+    Verse numbers of a spec like "16", "16-18" or "7-12, 15", in order.
+
+    Unparseable parts are skipped; an empty result means "whole chapter".
+    """
+    verses: List[int] = []
+    seen: Set[int] = set()
+    for part in (spec or '').split(','):
+        bounds = [b.strip() for b in part.split('-')]
+        try:
+            start = int(bounds[0])
+            end = int(bounds[1]) if len(bounds) > 1 and bounds[1] else start
+        except ValueError:
+            continue
+        for verse in range(start, min(end, start + 200) + 1):
+            if verse not in seen:
+                seen.add(verse)
+                verses.append(verse)
+    return verses
+
+
+def plain_text(text: str) -> str:
+    """Verse text without Strong's numbers and markup."""
+    return _SPACES.sub(' ', _TAGS.sub('', _STRONGS.sub('', text or ''))).strip()
+
+
+class BibleStore:
+    """SQLite store of whole Bible versions."""
+
+    def __init__(self, path: Optional[str] = None, base_url: Optional[str] = None,
+                 gateway: Optional[HttpGateway] = None):
+        default_path = os.path.join(os.path.expanduser('~'), '.glossio', 'bible.db')
+        self.path = path or os.environ.get('BIBLE_STORE_PATH', default_path)
+        self.base_url = (base_url or BOLLS_BASE_URL).rstrip('/')
+        self._gateway = gateway
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Lazy connection; creates the schema on first use."""
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS bible_versions (
+                    slug TEXT PRIMARY KEY,
+                    full_name TEXT,
+                    language TEXT,
+                    verses INTEGER NOT NULL,
+                    imported_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS bible_books (
+                    slug TEXT NOT NULL,
+                    book INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    chapters INTEGER NOT NULL,
+                    PRIMARY KEY (slug, book)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS bible_verses (
+                    slug TEXT NOT NULL,
+                    book INTEGER NOT NULL,
+                    chapter INTEGER NOT NULL,
+                    verse INTEGER NOT NULL,
+                    pk INTEGER,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (slug, book, chapter, verse)
+                ) WITHOUT ROWID;
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    @property
+    def gateway(self) -> HttpGateway:
+        return self._gateway or get_http_gateway()
+
+    # --- import ----------------------------------------------------------
+
+    def import_records(self, slug: str, records: Iterable[Dict], books: Optional[List[Dict]] = None,
+                       full_name: Optional[str] = None, language: Optional[str] = None) -> int:
+        """
+        Replace a version with the given verses.
+
+        Args:
+            slug: Version, e.g. 'RV1960'
+            records: Verses as {book, chapter, verse, text, pk?}
+            books: bolls.life books list ({bookid, name, chapters}); derived
+                from the verses, with English names, when missing
+            full_name: Display name of the version
+            language: Language shown in the version list
+
+        Returns:
+            Number of verses stored
+        """
+        chapters: Dict[int, int] = {}
+        count = 0
+        with self._lock:
+            conn = self.conn
+            conn.execute('DELETE FROM bible_verses WHERE slug = ?', (slug,))
+            conn.execute('DELETE FROM bible_books WHERE slug = ?', (slug,))
+            batch = []
+            for r in records:
+                book, chapter = int(r['book']), int(r['chapter'])
+                chapters[book] = max(chapters.get(book, 0), chapter)
+                batch.append((slug, book, chapter, int(r['verse']), r.get('pk'), r.get('text') or ''))
+                if len(batch) >= IMPORT_BATCH:
+                    conn.executemany('INSERT OR REPLACE INTO bible_verses VALUES (?, ?, ?, ?, ?, ?)', batch)
+                    count += len(batch)
+                    batch = []
+            conn.executemany('INSERT OR REPLACE INTO bible_verses VALUES (?, ?, ?, ?, ?, ?)', batch)
+            count += len(batch)
+
+            if books:
+                book_rows = [(slug, int(b['bookid']), b['name'], int(b.get('chapters') or chapters.get(int(b['bookid']), 0)))
+                             for b in books if int(b['bookid']) in chapters]
+            else:
+                book_rows = [(slug, book, DEFAULT_BOOK_NAMES[book - 1] if book <= len(DEFAULT_BOOK_NAMES) else str(book),
+                              last) for book, last in sorted(chapters.items())]
+            conn.executemany('INSERT INTO bible_books VALUES (?, ?, ?, ?)', book_rows)
+            conn.execute('INSERT OR REPLACE INTO bible_versions VALUES (?, ?, ?, ?, ?)',
+                         (slug, full_name or slug, language or '', count, time.time()))
+            conn.commit()
+        return count
+
+    @staticmethod
+    def read_translation_file(data: bytes) -> List[Dict]:
+        """Verses from a bolls.life translation download (.zip holding one .json, or the .json itself)."""
+        if data[:2] == b'PK':
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                name = next(n for n in archive.namelist() if n.endswith('.json'))
+                data = archive.read(name)
+        return json.loads(data.decode('utf-8'))
+
+    def import_file(self, slug: str, path: str, books: Optional[List[Dict]] = None, **version_info) -> int:
+        """Import a version from a downloaded translation .zip or .json."""
+        with open(path, 'rb') as f:
+            records = self.read_translation_file(f.read())
+        return self.import_records(slug, records, books=books, **version_info)
+
+    def import_from_bolls(self, slug: str) -> int:
+        """
+        Download a whole version from bolls.life and import it.
+
+        Raises:
+            The gateway or requests error of the download
+        """
+        from app.services.bible_cache import get_bible_cache
+
+        response = self.gateway.request('GET', f"{self.base_url}/static/translations/{slug}.zip",
+                                        deadline=DOWNLOAD_DEADLINE, timeout=(5, DOWNLOAD_DEADLINE))
+        response.raise_for_status()
+        records = self.read_translation_file(response.content)
+
+        cache = get_bible_cache()
+        books, full_name, language = None, None, None
+        try:
+            books = cache.get_books(slug)
+            for lang in cache.get_versions():
+                for t in lang.get('translations', []):
+                    if t.get('short_name') == slug:
+                        full_name, language = t.get('full_name'), lang.get('language')
+        except Exception as e:
+            print(f"Bible store: no book list for {slug}, using default names ({e})")
+        return self.import_records(slug, records, books=books, full_name=full_name, language=language)
+
+    def delete_version(self, slug: str) -> None:
+        with self._lock:
+            for table in ('bible_verses', 'bible_books', 'bible_versions'):
+                self.conn.execute(f'DELETE FROM {table} WHERE slug = ?', (slug,))
+            self.conn.commit()
+
+    # --- lookups ---------------------------------------------------------
+
+    def versions(self) -> Set[str]:
+        """
+        Slugs of the imported versions.
+
+        Not cached: scripts/import_bible.py writes from another process, and
+        the query is a single primary-key scan of a handful of rows.
+        """
+        if self.path != ':memory:' and not os.path.exists(self.path):
+            # Nothing imported yet; don't create the file just to look
+            return set()
+        with self._lock:
+            return {row[0] for row in self.conn.execute('SELECT slug FROM bible_versions')}
+
+    def has_version(self, slug: str) -> bool:
+        return slug in self.versions()
+
+    def versions_listing(self) -> List[Dict]:
+        """Imported versions in the shape of bolls.life's languages.json."""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT slug, full_name, language FROM bible_versions ORDER BY language, slug'
+            ).fetchall()
+        languages: Dict[str, List[Dict]] = {}
+        for slug, full_name, language in rows:
+            languages.setdefault(language or 'Offline', []).append({'short_name': slug, 'full_name': full_name})
+        return [{'language': lang, 'translations': translations} for lang, translations in languages.items()]
+
+    def get_books(self, slug: str) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT book, name, chapters FROM bible_books WHERE slug = ? ORDER BY book', (slug,)
+            ).fetchall()
+        return [{'bookid': book, 'name': name, 'chapters': chapters} for book, name, chapters in rows]
+
+    def get_chapter(self, slug: str, book: int, chapter: int) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT pk, verse, text FROM bible_verses WHERE slug = ? AND book = ? AND chapter = ? ORDER BY verse',
+                (slug, book, chapter)
+            ).fetchall()
+        return [{'pk': pk, 'verse': verse, 'text': text} for pk, verse, text in rows]
+
+    def get_verse(self, slug: str, book: int, chapter: int, verse: int) -> Dict:
+        """
+        Raises:
+            LookupError: The version has no such verse
+        """
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT pk, text FROM bible_verses WHERE slug = ? AND book = ? AND chapter = ? AND verse = ?',
+                (slug, book, chapter, verse)
+            ).fetchone()
+        if row is None:
+            raise LookupError(f"Verse {book}:{chapter}:{verse} not found in {slug}")
+        return {'pk': row[0], 'translation': slug, 'book': book, 'chapter': chapter, 'verse': verse, 'text': row[1]}
+
+    def get_passage(self, slug: str, book: int, chapter: int, verse_spec: str = '') -> Optional[Dict]:
+        """
+        Resolve a verse spec of one chapter to text.
+
+        Args:
+            slug: Version
+            book: bolls.life book id (1-66)
+            chapter: Chapter number
+            verse_spec: e.g. "16", "16-18, 20"; empty for the whole chapter
+
+        Returns:
+            {'verses': [{verse, text}], 'text': plain text joined}, or None if
+            none of the verses are stored
+        """
+        wanted = parse_verse_spec(verse_spec)
+        with self._lock:
+            if wanted:
+                placeholders = ','.join('?' * len(wanted))
+                rows = self.conn.execute(
+                    f'SELECT verse, text FROM bible_verses WHERE slug = ? AND book = ? AND chapter = ? '
+                    f'AND verse IN ({placeholders}) ORDER BY verse',
+                    (slug, book, chapter, *wanted)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    'SELECT verse, text FROM bible_verses WHERE slug = ? AND book = ? AND chapter = ? ORDER BY verse',
+                    (slug, book, chapter)
+                ).fetchall()
+        if not rows:
+            return None
+        verses = [{'verse': verse, 'text': plain_text(text)} for verse, text in rows]
+        return {'verses': verses, 'text': ' '.join(v['text'] for v in verses)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT slug, full_name, language, verses, imported_at FROM bible_versions ORDER BY slug'
+            ).fetchall()
+        size = os.path.getsize(self.path) if self.path != ':memory:' and os.path.exists(self.path) else 0
+        return {
+            'path': self.path,
+            'size_mb': round(size / (1024 * 1024), 1),
+            'versions': [{'slug': r[0], 'full_name': r[1], 'language': r[2], 'verses': r[3],
+                          'imported_at': r[4]} for r in rows],
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Singleton instance for the application
+_bible_store = None
+
+def get_bible_store() -> BibleStore:
+    """Get the global offline Bible store."""
+    global _bible_store
+    if _bible_store is None:
+        _bible_store = BibleStore()
+    return _bible_store
@@ -0,0 +1,189 @@
+"""
+Coalescing broadcaster for high-frequency collaboration events.
+
+Typing indicators and live segment updates are emitted by the editor on every
+keystroke. Instead of rebroadcasting each one to the room immediately, events
+are buffered per (room, segment) for a short window and sent as a single
+'segment_batch' frame:
+- a newer update for a segment replaces the pending one
+- typing events are dropped when superseded by a newer typing or update
+  event from the same user on the same segment
+- per-room inbound/outbound message rates are tracked for worker sizing
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+BATCH_EVENT = 'segment_batch'
+
+
+class RoomStats:
+    """Message counters for one room, with per-second buckets for rates."""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.inbound_total = 0
+        self.outbound_frames_total = 0
+        self.outbound_events_total = 0
+        self.dropped_total = 0
+        self._inbound = deque()   # [second, count]
+        self._outbound = deque()  # [second, count]
+
+    def _bump(self, buckets: deque, now: float, count: int = 1) -> None:
+        second = int(now)
+        if buckets and buckets[-1][0] == second:
+            buckets[-1][1] += count
+        else:
+            buckets.append([second, count])
+        self._trim(buckets, now)
+
+    def _trim(self, buckets: deque, now: float) -> None:
+        cutoff = int(now) - self.window_seconds
+        while buckets and buckets[0][0] <= cutoff:
+            buckets.popleft()
+
+    def _rate(self, buckets: deque, now: float) -> float:
+        self._trim(buckets, now)
+        return round(sum(count for _, count in buckets) / self.window_seconds, 2)
+
+    def record_inbound(self, now: float) -> None:
+        self.inbound_total += 1
+        self._bump(self._inbound, now)
+
+    def record_frame(self, now: float, event_count: int) -> None:
+        self.outbound_frames_total += 1
+        self.outbound_events_total += event_count
+        self._bump(self._outbound, now)
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            'inbound_total': self.inbound_total,
+            'outbound_frames_total': self.outbound_frames_total,
+            'outbound_events_total': self.outbound_events_total,
+            'dropped_total': self.dropped_total,
+            'inbound_per_sec': self._rate(self._inbound, now),
+            'outbound_frames_per_sec': self._rate(self._outbound, now),
+            'window_seconds': self.window_seconds,
+        }
+
+
+class BroadcastCoalescer:
+    """Buffers typing/update events per room and flushes them as batched frames."""
+
+    def __init__(self, window_ms: Optional[int] = None):
+        if window_ms is None:
+            window_ms = int(os.environ.get('BROADCAST_COALESCE_MS', '150'))
+        self.window_seconds = max(window_ms, 10) / 1000.0
+        self._pending: Dict[str, OrderedDict] = {}
+        self._stats: Dict[str, RoomStats] = {}
+        self._lock = threading.Lock()
+        self._flusher_started = False
+
+    def _room_stats(self, room: str) -> RoomStats:
+        if room not in self._stats:
+            self._stats[room] = RoomStats()
+        return self._stats[room]
+
+    def submit(self, room: str, kind: str, payload: Dict[str, Any]) -> None:
+        """
+        Queue an event for the next frame.
+
+        Args:
+            room: Socket.IO room name
+            kind: 'update' or 'typing'
+            payload: Event body; must contain segment_id and user_id
+        """
+        segment_id = payload.get('segment_id')
+        user_id = payload.get('user_id')
+        event = dict(payload, type=kind)
+        typing_key = ('typing', segment_id, user_id)
+        update_key = ('update', segment_id)
+        now = time.time()
+
+        with self._lock:
+            stats = self._room_stats(room)
+            stats.record_inbound(now)
+            pending = self._pending.setdefault(room, OrderedDict())
+
+            if kind == 'typing':
+                queued_update = pending.get(update_key)
+                if queued_update and queued_update.get('user_id') == user_id:
+                    # The update already tells everyone this user is active here
+                    stats.dropped_total += 1
+                    return
+                if pending.pop(typing_key, None) is not None:
+                    stats.dropped_total += 1
+                pending[typing_key] = event
+            else:
+                if pending.pop(typing_key, None) is not None:
+                    stats.dropped_total += 1
+                if pending.pop(update_key, None) is not None:
+                    stats.dropped_total += 1
+                pending[update_key] = event
+
+        self._ensure_flusher()
+
+    def drain(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Take all pending events and return them as (room, frame) pairs."""
+        now = time.time()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            frames = []
+            for room, events in pending.items():
+                if not events:
+                    continue
+                frame = {'events': list(events.values()), 'sent_at': now}
+                self._room_stats(room).record_frame(now, len(frame['events']))
+                frames.append((room, frame))
+        return frames
+
+    def flush(self) -> None:
+        """Emit every pending frame to its room."""
+        from app.extensions import socketio
+        for room, frame in self.drain():
+            socketio.emit(BATCH_EVENT, frame, to=room)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-room message counters and rates."""
+        now = time.time()
+        with self._lock:
+            return {room: stats.as_dict(now) for room, stats in self._stats.items()}
+
+    def forget_room(self, room: str) -> None:
+        """Drop buffered events and stats for a room nobody is in anymore."""
+        with self._lock:
+            self._pending.pop(room, None)
+            self._stats.pop(room, None)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher_started:
+            return
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        from app.extensions import socketio
+        socketio.start_background_task(self._run)
+
+    def _run(self) -> None:
+        from app.extensions import socketio
+        while True:
+            socketio.sleep(self.window_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing broadcast frames: {e}")
+
+
+# Singleton instance for the application
+_coalescer = None
+
+def get_broadcast_coalescer() -> BroadcastCoalescer:
+    """Get the global broadcast coalescer instance."""
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = BroadcastCoalescer()
+    return _coalescer
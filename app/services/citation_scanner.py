@@ -0,0 +1,251 @@
+"""
+Single-pass Bible and EGW citation scanner.
+
+All reference forms are folded into one precompiled regex, built once per
+source language:
+- Bible: book name or abbreviation + chapter:verses ("Juan 3:16-18, 20",
+  "1 Cor. 13:4"). Book names come from TextUtils.BIBLE_BOOK_MAP (plus
+  accent-less spellings) and are compiled from a trie, so candidates are
+  rejected after a character or two instead of probing the map per match
+- EGW abbreviation + page.paragraph ("DA 214.1", "{1MCP 23.4}"), from
+  abb_<LANG>.csv
+- EGW title + page.paragraph ("The Desire of Ages, p. 214.1"), also a trie
+- Any other capitalized title + page.paragraph; its words are matched
+  against known titles and abbreviations (longest suffix), else it becomes
+  a Google search
+scan() returns every citation with its span. Segments are scanned once at
+ingest and the result is stored in Segment.citations.
+"""
+
+import csv
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+BIBLEGATEWAY_URL = "https://www.biblegateway.com/passage/?search="
+BIBLEGATEWAY_VERSION = "&version=RVR1960"
+EGW_SEARCH_URL = "https://m.egwwritings.org/en/search?query="
+GOOGLE_URL = "https://www.google.com/search?q="
+
+# Leading articles dropped from EGW titles ("Desire of Ages" finds "The Desire of Ages")
+TITLE_ARTICLES = ('the ', 'a ', 'an ', 'el ', 'la ', 'los ', 'las ', 'un ', 'una ')
+
+_VERSES = r'\d{1,3}(?:\s*[-–]\s*\d{1,3}|\s*,\s*\d{1,3}(?!\s*[^\W\d_]+\.?\s*\d+:))*'
+_PAGE = r'\d+\.\d+(?!\.?\d)'
+_TITLE_SEP = r'(?:,\s*(?:p\.?\s*)?|,?\s+(?:p\.?\s*)?)'
+_GENERIC_TITLE = r"[A-Z][A-Za-z']*(?: [A-Za-z']+){0,7}"
+_WHITESPACE = re.compile(r'\s+')
+_BOOK_NUMBER = re.compile(r'^(\d)\s*')
+
+
+def fold_accents(text: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c))
+
+
+def trie_regex(words) -> str:
+    """
+    Regex matching any of `words`, factored through a character trie.
+
+    Spaces match any whitespace run (optional after a leading book number,
+    so "1Cor" works too).
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node, prev):
+        end = '' in node
+        alts = []
+        for ch in sorted(k for k in node if k):
+            if ch == ' ':
+                piece = r'\s*' if prev.isdigit() else r'\s+'
+            else:
+                piece = re.escape(ch)
+            alts.append(piece + build(node[ch], ch))
+        if not alts:
+            return ''
+        if len(alts) == 1 and not end:
+            return alts[0]
+        return '(?:' + '|'.join(alts) + ')' + ('?' if end else '')
+
+    return build(trie, '')
+
+
+def load_egw_abbreviations(lang_code: str = "EN") -> Dict[str, str]:
+    """{title: abbreviation} from app/data/abb_<LANG>.csv; empty if missing."""
+    path = os.path.join(DATA_DIR, f"abb_{lang_code}.csv")
+    abbrevs = {}
+    if not os.path.exists(path):
+        return abbrevs
+    try:
+        with open(path, mode='r', encoding='utf-8-sig') as f:
+            for row in csv.reader(f):
+                if len(row) >= 2:
+                    abbrevs[row[0].strip()] = row[1].strip()
+    except Exception as e:
+        print(f"Error reading abb_{lang_code}.csv: {e}")
+    return abbrevs
+
+
+class CitationScanner:
+    """Precompiled scanner for Bible and EGW references."""
+
+    def __init__(self, book_map: Dict[str, str], book_ids: Dict[str, int],
+                 egw_abbreviations: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            book_map: {lowercase book name or abbreviation: English book name}
+            book_ids: {English book name: bolls.life book id}
+            egw_abbreviations: {title: abbreviation}; no EGW scanning if empty
+        """
+        self.book_ids = book_ids
+        self.books: Dict[str, str] = {}
+        for name, book in book_map.items():
+            for variant in (name, fold_accents(name)):
+                self.books.setdefault(self._book_key(variant), book)
+
+        parts = [rf'(?<!\w)(?i:(?P<book>{trie_regex(self.books)}))\.?\s*(?P<chapter>\d{{1,3}}):(?P<verses>{_VERSES})']
+
+        abbrevs = egw_abbreviations or {}
+        self.abbreviations = set(abbrevs.values())
+        self.titles: Dict[str, str] = {}
+        for title, abbr in abbrevs.items():
+            key = title.lower()
+            self.titles.setdefault(key, abbr)
+            for article in TITLE_ARTICLES:
+                if key.startswith(article):
+                    self.titles.setdefault(key[len(article):], abbr)
+        if abbrevs:
+            parts.append(rf'(?<!\w)(?P<abbr>{trie_regex(self.abbreviations)})\s+(?P<aref>{_PAGE})')
+            parts.append(rf'(?<!\w)(?i:(?P<title>{trie_regex(self.titles)})){_TITLE_SEP}(?P<tref>{_PAGE})')
+            parts.append(rf'(?<!\w)(?P<gtitle>{_GENERIC_TITLE}){_TITLE_SEP}(?P<gref>{_PAGE})')
+        self.pattern = re.compile('|'.join(parts))
+
+    @staticmethod
+    def _book_key(text: str) -> str:
+        # "1Cor" and "1  cor" both become "1 cor"
+        return _BOOK_NUMBER.sub(r'\1 ', _WHITESPACE.sub(' ', text.lower()).strip())
+
+    def scan(self, text: str) -> List[Dict]:
+        """
+        All citations in `text`, in order, with [start, end) spans.
+
+        Returns:
+            Dicts with type 'bible' (book, book_id, chapter, verse), 'egw'
+            (abbr, ref) or 'google' (title, ref), plus match and url
+        """
+        citations = []
+        if not text:
+            return citations
+        for m in self.pattern.finditer(text):
+            if m.group('book') is not None:
+                citation = self._bible(m)
+            elif m.group('abbr') is not None:
+                citation = self._egw(m.group('abbr'), m.group('aref'), m.start(), m.end(), text)
+            elif m.group('title') is not None:
+                citation = self._egw(self.titles[self._book_key(m.group('title'))], m.group('tref'),
+                                     m.start(), m.end(), text)
+            else:
+                citation = self._generic(m, text)
+            if citation:
+                citations.append(citation)
+        return citations
+
+    def _bible(self, m) -> Optional[Dict]:
+        book = self.books.get(self._book_key(m.group('book')))
+        if book is None:
+            return None
+        chapter = int(m.group('chapter'))
+        verse = m.group('verses').strip()
+        url_ref = f"{chapter}:{verse}".replace(' ', '').replace(',', '%2C').replace(':', '%3A')
+        return {
+            'type': 'bible',
+            'start': m.start(),
+            'end': m.end(),
+            'match': m.group(0),
+            'book': book,
+            'book_id': self.book_ids.get(book),
+            'chapter': chapter,
+            'verse': verse,
+            'url': f"{BIBLEGATEWAY_URL}{book}%20{url_ref}{BIBLEGATEWAY_VERSION}",
+        }
+
+    @staticmethod
+    def _egw(abbr: str, ref: str, start: int, end: int, text: str) -> Dict:
+        return {
+            'type': 'egw',
+            'start': start,
+            'end': end,
+            'match': text[start:end],
+            'abbr': abbr,
+            'ref': ref,
+            'url': f"{EGW_SEARCH_URL}{abbr}+{ref}",
+        }
+
+    def _generic(self, m, text: str) -> Dict:
+        title, ref = m.group('gtitle'), m.group('gref')
+        # "See also Desire of Ages, p. 214.1" or "Read DA 214.1": the title or
+        # abbreviation is a suffix of the words
+        offset = 0
+        for word in title.split(' '):
+            suffix = title[offset:]
+            abbr = suffix if suffix in self.abbreviations else self.titles.get(suffix.lower())
+            if abbr:
+                return self._egw(abbr, ref, m.start() + offset, m.end(), text)
+            offset += len(word) + 1
+        return {
+            'type': 'google',
+            'start': m.start(),
+            'end': m.end(),
+            'match': m.group(0),
+            'title': title,
+            'ref': ref,
+            'url': f"{GOOGLE_URL}{title.replace(' ', '+')}+{ref}+Ellen+White",
+        }
+
+
+def bible_data(citations: List[Dict]) -> Optional[Dict]:
+    """First Bible citation in the shape of TextUtils.get_bible_url."""
+    for c in citations or []:
+        if c['type'] == 'bible':
+            api_data = None
+            if c['book_id']:
+                api_data = {'book_id': c['book_id'], 'chapter': str(c['chapter']), 'verse': c['verse']}
+            return {'en': c['url'], 'type': 'bible', 'api_data': api_data, 'match': c['match']}
+    return None
+
+
+def egw_data(citations: List[Dict]) -> Dict:
+    """First EGW citation (abbreviated or known title before Google fallbacks) in the shape of TextUtils.get_egw_url."""
+    found = [c for c in citations or [] if c['type'] in ('egw', 'google')]
+    if not found:
+        return {'en': None, 'type': 'none'}
+    c = min(found, key=lambda c: c['type'] != 'egw')
+    return {'en': c['url'], 'type': c['type'], 'match': c['match']}
+
+
+# Scanners per source language, built on first use
+_scanners: Dict[str, CitationScanner] = {}
+_scanners_lock = threading.Lock()
+
+def get_citation_scanner(lang_code: str = "EN") -> CitationScanner:
+    """Get the shared scanner for a source language."""
+    lang_code = (lang_code or "EN").upper()
+    scanner = _scanners.get(lang_code)
+    if scanner is None:
+        from app.utils import TextUtils
+
+        with _scanners_lock:
+            scanner = _scanners.get(lang_code)
+            if scanner is None:
+                scanner = CitationScanner(TextUtils.BIBLE_BOOK_MAP, TextUtils.BIBLE_BOOK_IDS,
+                                          load_egw_abbreviations(lang_code))
+                _scanners[lang_code] = scanner
+    return scanner
@@ -4,15 +4,99 @@ Gemma Translation Service
 Provides translation using google/translategemma-12b-it model with:
 - 4-bit NF4 quantization via bitsandbytes (~8GB RAM for 12B model)
 - AMD Barcelo APU / CPU inference support
+- Batched generation with left padding and length-bucketed batches
+- Token streaming with cooperative cancellation for interactive use
+- Length-aware generation limits and repetition early stopping
+- Per language pair prompt prefix: template tokens and KV cache computed once
+- One-time export of the loaded (quantized) model to local safetensors, which
+  later starts memory-map instead of downloading and re-quantizing
+- Pluggable inference backends (GEMMA_BACKEND): transformers (default),
+  onnx (ONNX Runtime int8 export driven through the same generate() code)
+  and llama_cpp (GGUF via llama-cpp-python, see llama_cpp_backend)
 - Singleton pattern for efficient model reuse
 """
 
+import copy
+import json
+import math
 import os
+import shutil
 import time
-from typing import Optional, Tuple
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Optional, Tuple
 
 MODEL_ID = "google/translategemma-12b-it"
 
+# Batched generation limits. The token budget caps padded tokens per batch
+# (batch_size * (longest prompt + max_new_tokens)) to bound activation memory.
+MAX_NEW_TOKENS = 256
+MAX_BATCH_SIZE = int(os.environ.get('GEMMA_MAX_BATCH_SIZE', '8'))
+BATCH_TOKEN_BUDGET = int(os.environ.get('GEMMA_BATCH_TOKEN_BUDGET', '8192'))
+
+# Length-aware generation limits: the budget for each text is its source
+# token count scaled by the language-pair expansion ratio, with headroom,
+# clamped to [MIN_NEW_TOKENS, MAX_NEW_TOKENS].
+MIN_NEW_TOKENS = 16
+LENGTH_SAFETY_FACTOR = float(os.environ.get('GEMMA_LENGTH_SAFETY_FACTOR', '1.6'))
+LENGTH_HEADROOM_TOKENS = 12
+
+# Approximate tokens needed per English token for the same content
+EXPANSION_RATIOS = {
+    "en": 1.0,
+    "es": 1.25,
+    "pt": 1.25,
+    "fr": 1.3,
+    "it": 1.25,
+    "ro": 1.3,
+    "de": 1.3,
+    "nl": 1.25,
+    "ru": 1.4,
+    "uk": 1.45,
+    "pl": 1.45,
+    "el": 1.6,
+    "ar": 1.3,
+    "he": 1.3,
+    "hi": 1.6,
+    "th": 1.5,
+    "zh": 1.0,
+    "ja": 1.2,
+    "ko": 1.3,
+}
+DEFAULT_EXPANSION_RATIO = 1.4
+
+# Repetition stop: a trailing n-gram (n <= REPEAT_MAX_NGRAM) repeated
+# REPEAT_MIN_COPIES times, spanning at least REPEAT_MIN_SPAN tokens
+REPEAT_MAX_NGRAM = 8
+REPEAT_MIN_COPIES = 3
+REPEAT_MIN_SPAN = 8
+
+# How many recent generations generation_stats() summarizes
+STATS_WINDOW = 500
+
+# Prompt prefix reuse. The chat template is rendered once per language pair
+# around a sentinel; everything before it is tokenized (and its KV cache
+# computed) once and shared by every call for that pair.
+PREFIX_CACHE_ENABLED = os.environ.get('GEMMA_PREFIX_CACHE', '1') == '1'
+PROMPT_SENTINEL = "\ue000SEGMENT\ue000"
+PREFIX_PROBE_TEXT = "In the beginning God created the heaven and the earth."
+
+# Local export of the loaded model. Safetensors shards are memory-mapped on
+# load and the NF4 weights are stored already quantized, so a warm start only
+# pages in the weights instead of fetching and quantizing them again.
+LOCAL_MODEL_DIR = os.environ.get('GEMMA_LOCAL_MODEL_DIR') or os.path.join(
+    os.path.expanduser('~'), '.glossio', 'models', MODEL_ID.split('/')[-1]
+)
+EXPORT_MARKER = 'glossio_export.json'
+EXPORT_SHARD_SIZE = '2GB'
+
+# Inference engine. 'onnx' loads the int8 export made by export_onnx();
+# 'llama_cpp' loads GEMMA_GGUF_PATH.
+BACKENDS = ('transformers', 'onnx', 'llama_cpp')
+GEMMA_BACKEND = os.environ.get('GEMMA_BACKEND', 'transformers')
+ONNX_FP32_FILE = 'model.onnx'
+ONNX_INT8_FILE = 'model_quantized.onnx'
+
 # Language code to name mapping
 LANG_MAP = {
     "es": "Spanish",
@@ -94,6 +178,177 @@ def detect_device() -> Tuple[str, bool]:
         return 'cpu', False
 
 
+def plan_batches(lengths: List[int], max_batch_size: int = MAX_BATCH_SIZE,
+                 token_budget: int = BATCH_TOKEN_BUDGET,
+                 max_new_tokens: int = MAX_NEW_TOKENS) -> List[List[int]]:
+    """
+    Group prompt indices into length-bucketed batches.
+    
+    Prompts are sorted by token length so each batch pads to a similar size,
+    then packed greedily until either max_batch_size or token_budget
+    (batch_size * (longest prompt + max_new_tokens)) would be exceeded.
+    
+    Args:
+        lengths: Prompt length in tokens, one per input
+        max_batch_size: Upper bound on sequences per batch
+        token_budget: Upper bound on padded tokens per batch
+        max_new_tokens: Generation budget reserved per sequence
+    
+    Returns:
+        List of batches, each a list of indices into `lengths`
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    longest = 0
+    
+    for idx in order:
+        candidate_longest = max(longest, lengths[idx])
+        fits = (len(current) + 1) * (candidate_longest + max_new_tokens) <= token_budget
+        if current and (len(current) >= max_batch_size or not fits):
+            batches.append(current)
+            current = []
+            candidate_longest = lengths[idx]
+        current.append(idx)
+        longest = candidate_longest
+    
+    if current:
+        batches.append(current)
+    return batches
+
+
+def expansion_ratio(source_lang: str, target_lang: str) -> float:
+    """Expected target/source token ratio for a language pair."""
+    source = EXPANSION_RATIOS.get(source_lang.lower()[:2], DEFAULT_EXPANSION_RATIO)
+    target = EXPANSION_RATIOS.get(target_lang.lower()[:2], DEFAULT_EXPANSION_RATIO)
+    return target / source
+
+
+def max_new_tokens_for(source_tokens: int, source_lang: str = "en", target_lang: str = "es") -> int:
+    """
+    Generation budget for a source of `source_tokens` tokens.
+    
+    Returns:
+        ceil(source_tokens * pair ratio * safety factor) + headroom,
+        clamped to [MIN_NEW_TOKENS, MAX_NEW_TOKENS]
+    """
+    expected = source_tokens * expansion_ratio(source_lang, target_lang) * LENGTH_SAFETY_FACTOR
+    budget = math.ceil(expected) + LENGTH_HEADROOM_TOKENS
+    return max(MIN_NEW_TOKENS, min(MAX_NEW_TOKENS, budget))
+
+
+def detect_repetition(tokens: List[int], max_ngram: int = REPEAT_MAX_NGRAM,
+                      min_copies: int = REPEAT_MIN_COPIES,
+                      min_span: int = REPEAT_MIN_SPAN) -> Tuple[int, int]:
+    """
+    Check whether `tokens` ends in a degenerate loop.
+    
+    Returns:
+        (ngram size, tokens spanned by the repeats), or (0, 0) if none.
+        Short n-grams need more copies so "very very very" is not a loop.
+    """
+    for n in range(1, max_ngram + 1):
+        copies = max(min_copies, math.ceil(min_span / n))
+        span = n * copies
+        if len(tokens) < span:
+            continue
+        tail = tokens[-span:]
+        unit = tail[-n:]
+        if all(tail[i:i + n] == unit for i in range(0, span, n)):
+            return n, span
+    return 0, 0
+
+
+def split_template(rendered: str, sentinel: str = PROMPT_SENTINEL) -> Optional[Tuple[str, str]]:
+    """
+    Split a chat template rendered around `sentinel` into (prefix, suffix).
+    
+    Returns:
+        None unless the sentinel occurs exactly once
+    """
+    if rendered.count(sentinel) != 1:
+        return None
+    prefix, suffix = rendered.split(sentinel)
+    return prefix, suffix
+
+
+class PromptPrefix:
+    """Static chat-template parts around the segment text for one language pair."""
+    
+    def __init__(self, ids: List[int], suffix: str):
+        self.ids = ids
+        self.suffix = suffix
+        self.kv = None  # past_key_values for `ids`, computed on first use
+        self.kv_failed = False
+    
+    def encode(self, tokenizer, texts: List[str]) -> List[List[int]]:
+        """Prompt ids for each text: cached prefix ids + tokenized text and suffix."""
+        rest = tokenizer([text + self.suffix for text in texts], add_special_tokens=False)['input_ids']
+        return [self.ids + ids for ids in rest]
+
+
+def _stopping_criteria(prompt_len: int, budgets: Optional[List[int]] = None, events=()):
+    """
+    Build a stopping guard for one generate() call.
+    
+    Each step it ends rows that reached their own budget or whose tail is a
+    repetition loop and, once any of `events` is set, all rows. The guard
+    remembers why rows stopped.
+    
+    Returns:
+        (StoppingCriteriaList, guard)
+    """
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+    
+    window = REPEAT_MAX_NGRAM * max(REPEAT_MIN_COPIES, REPEAT_MIN_SPAN)
+    
+    class _GenerationGuard(StoppingCriteria):
+        def __init__(self):
+            self.repeated = {}  # row -> generated length to keep
+            self.cancelled = False
+            self.steps = 0
+        
+        def __call__(self, input_ids, scores, **kwargs):
+            self.steps = input_ids.shape[1] - prompt_len
+            if any(e is not None and e.is_set() for e in events):
+                self.cancelled = True
+            done = []
+            for row in range(input_ids.shape[0]):
+                if row not in self.repeated:
+                    tail = input_ids[row, max(prompt_len, input_ids.shape[1] - window):].tolist()
+                    n, span = detect_repetition(tail)
+                    if n:
+                        # Keep one copy of the looping n-gram
+                        self.repeated[row] = self.steps - (span - n)
+                over_budget = budgets is not None and self.steps >= budgets[row]
+                done.append(self.cancelled or over_budget or row in self.repeated)
+            return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+    
+    guard = _GenerationGuard()
+    return StoppingCriteriaList([guard]), guard
+
+
+def local_model_path(quantized: bool, base_dir: Optional[str] = None) -> str:
+    """Export directory for the given weight format."""
+    return os.path.join(base_dir or LOCAL_MODEL_DIR, 'nf4' if quantized else 'fp32')
+
+
+def onnx_model_path(base_dir: Optional[str] = None) -> str:
+    """Export directory of the ONNX Runtime int8 model."""
+    return os.path.join(base_dir or LOCAL_MODEL_DIR, 'onnx-int8')
+
+
+def read_export_marker(path: str) -> Optional[dict]:
+    """Metadata of a finished export at `path`, or None if there isn't one."""
+    try:
+        with open(os.path.join(path, EXPORT_MARKER)) as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return marker if marker.get('model_id') == MODEL_ID else None
+
+
 class GemmaService:
     """Singleton service for Gemma translation model."""
     
@@ -103,6 +358,12 @@ class GemmaService:
     _device = None
     _use_quantization = False
     _load_time_seconds = 0
+    _load_source = None  # 'local' (exported safetensors) or 'hub'
+    _backend = GEMMA_BACKEND if GEMMA_BACKEND in BACKENDS else 'transformers'
+    _engine = None  # LlamaCppEngine when the llama_cpp backend is loaded
+    _stats = deque(maxlen=STATS_WINDOW)
+    _totals = Counter()  # Running token counts since the last reset_stats()
+    _prefixes = {}  # (source_lang, target_lang) -> PromptPrefix or None
     
     def __new__(cls):
         if cls._instance is None:
@@ -112,7 +373,35 @@ class GemmaService:
     @property
     def is_loaded(self) -> bool:
         """Check if model is loaded."""
-        return self._model is not None
+        return self._model is not None or self._engine is not None
+    
+    @property
+    def backend(self) -> str:
+        """Inference engine in use: one of BACKENDS."""
+        return self._backend
+    
+    @property
+    def model_id(self) -> str:
+        """Identifier of the loaded weights, used to key cached translations."""
+        if self._backend == 'onnx':
+            return f"{MODEL_ID}#onnx-int8"
+        if self._backend == 'llama_cpp':
+            from app.services.llama_cpp_backend import GGUF_PATH
+            return f"{MODEL_ID}#gguf:{os.path.basename(GGUF_PATH)}"
+        return MODEL_ID
+    
+    def set_backend(self, name: str) -> None:
+        """
+        Switch inference engine, unloading the current one.
+        
+        Raises:
+            ValueError: Unknown backend name
+        """
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown backend '{name}', expected one of {', '.join(BACKENDS)}")
+        if name != self._backend and self.is_loaded:
+            self.unload()
+        self._backend = name
     
     @property
     def device_info(self) -> dict:
@@ -120,9 +409,13 @@ class GemmaService:
         return {
             'device': self._device,
             'quantized': self._use_quantization,
-            'model_id': MODEL_ID,
+            'model_id': self.model_id,
+            'backend': self._backend,
             'loaded': self.is_loaded,
-            'load_time_seconds': self._load_time_seconds
+            'load_time_seconds': self._load_time_seconds,
+            'load_source': self._load_source,
+            'prefix_cache_pairs': sum(1 for p in self._prefixes.values() if p is not None),
+            'engine': self._engine.info() if self._engine is not None else None
         }
     
     def initialize(self, force_cpu: bool = False) -> None:
@@ -132,7 +425,11 @@ class GemmaService:
         Args:
             force_cpu: If True, skip GPU detection and use CPU
         """
-        if self._model is not None:
+        if self.is_loaded:
+            return
+        
+        if self._backend == 'llama_cpp':
+            self._initialize_llama_cpp()
             return
         
         try:
@@ -151,14 +448,38 @@ class GemmaService:
         else:
             self._device, self._use_quantization = detect_device()
         
-        print(f"Loading model {MODEL_ID}...")
+        if self._backend == 'onnx':
+            self._initialize_onnx()
+            self._load_time_seconds = time.time() - start_time
+            print(f"ONNX model loaded successfully in {self._load_time_seconds:.1f}s")
+            return
+        
+        local_path = local_model_path(self._use_quantization)
+        use_local = read_export_marker(local_path) is not None
+        
+        print(f"Loading model {MODEL_ID} from {local_path if use_local else 'Hugging Face'}...")
         print(f"Device: {self._device}, Quantization: {self._use_quantization}")
         
         try:
             from transformers import BitsAndBytesConfig
-            self._tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+            self._tokenizer = AutoTokenizer.from_pretrained(local_path if use_local else MODEL_ID)
+            # Decoder-only batching pads on the left so generation continues from real tokens
+            self._tokenizer.padding_side = 'left'
+            if self._tokenizer.pad_token is None:
+                self._tokenizer.pad_token = self._tokenizer.eos_token
             
-            if self._use_quantization:
+            if use_local:
+                # Pre-quantized (or fp32) safetensors: config.json carries the
+                # quantization config, and shards are memory-mapped
+                device_map = "auto" if self._device != 'cpu' else {"": "cpu"}
+                self._model = AutoModelForCausalLM.from_pretrained(
+                    local_path,
+                    device_map=device_map,
+                    torch_dtype=None if self._use_quantization else torch.float32,
+                    low_cpu_mem_usage=True,
+                    trust_remote_code=True
+                )
+            elif self._use_quantization:
                 # 4-bit NF4 quantization: ~8GB RAM for 12B model (vs ~24GB fp16)
                 # This works on CPU and is compatible with AMD APUs
                 quantization_config = BitsAndBytesConfig(
@@ -184,6 +505,7 @@ class GemmaService:
                     trust_remote_code=True
                 )
             
+            self._load_source = 'local' if use_local else 'hub'
             self._load_time_seconds = time.time() - start_time
             print(f"Model loaded successfully in {self._load_time_seconds:.1f}s")
             
@@ -191,6 +513,60 @@ class GemmaService:
             print(f"Error loading model: {e}")
             raise e
     
+    def _initialize_llama_cpp(self) -> None:
+        from app.services.llama_cpp_backend import LlamaCppEngine
+        
+        start_time = time.time()
+        engine = LlamaCppEngine(record_stats=self._record_stats)
+        print(f"Loading GGUF model {engine.model_path} with llama.cpp...")
+        engine.load()
+        self._engine = engine
+        self._device = 'cpu'
+        self._use_quantization = True
+        self._load_source = 'local'
+        self._load_time_seconds = time.time() - start_time
+        print(f"GGUF model loaded successfully in {self._load_time_seconds:.1f}s")
+    
+    def _initialize_onnx(self) -> None:
+        """Load the int8 ONNX Runtime export; generation reuses the transformers path."""
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+            from transformers import AutoTokenizer
+        except ImportError:
+            raise ImportError("Please install optimum[onnxruntime] to use GEMMA_BACKEND=onnx.")
+        
+        path = onnx_model_path()
+        if read_export_marker(path) is None:
+            raise FileNotFoundError(f"No ONNX export at {path}. Run: python -m app.services.gemma_service --export-onnx")
+        
+        self._device = 'cpu'
+        self._use_quantization = True
+        self._tokenizer = AutoTokenizer.from_pretrained(path)
+        self._tokenizer.padding_side = 'left'
+        if self._tokenizer.pad_token is None:
+            self._tokenizer.pad_token = self._tokenizer.eos_token
+        self._model = ORTModelForCausalLM.from_pretrained(
+            path, file_name=ONNX_INT8_FILE, provider='CPUExecutionProvider', use_cache=True
+        )
+        self._load_source = 'local'
+    
+    @staticmethod
+    def _build_messages(text: str, source_lang: str, target_lang: str) -> list:
+        # TranslateGemma requires a specific structured content format:
+        # Each message must have content as a list with exactly one mapping dict
+        return [
+            {
+                "role": "user",
+                "content": [{
+                    "type": "text",
+                    "source_lang_code": source_lang.lower(),
+                    "target_lang_code": target_lang.lower(),
+                    "text": text,
+                    "image": None
+                }]
+            },
+        ]
+    
     def translate(self, text: str, source_lang: str = "en", target_lang: str = "es") -> Tuple[str, int]:
         """
         Translate text to the target language using TranslateGemma's structured format.
@@ -206,88 +582,434 @@ class GemmaService:
         if not text:
             return "", 0
         
-        if self._model is None:
+        if not self.is_loaded:
             self.initialize()
         
         start_time = time.time()
+        if self._engine is not None:
+            source_tokens = self._engine.count_tokens(text)
+            translation = self._engine.translate(
+                self._build_messages(text, source_lang, target_lang),
+                max_new_tokens_for(source_tokens, source_lang, target_lang),
+                source_tokens
+            )
+            return translation, int((time.time() - start_time) * 1000)
         
-        # TranslateGemma requires a specific structured content format:
-        # Each message must have content as a list with exactly one mapping dict
-        messages = [
-            {
-                "role": "user",
-                "content": [{
-                    "type": "text",
-                    "source_lang_code": source_lang.lower(),
-                    "target_lang_code": target_lang.lower(),
-                    "text": text,
-                    "image": None
-                }]
-            },
-        ]
+        encoded = self._encode_prompts([text], source_lang, target_lang)
+        source_tokens = self._count_source_tokens([text])
+        budget = max_new_tokens_for(source_tokens[0], source_lang, target_lang)
+        prefix = self._prompt_prefix(source_lang, target_lang)
+        translation = self._generate_batch(encoded, [budget], source_tokens, prefix)[0]
         
-        # Tokenize using TranslateGemma's chat template
-        # apply_chat_template returns a BatchEncoding; we need the raw input_ids tensor
-        encoded = self._tokenizer.apply_chat_template(
-            messages,
-            return_tensors="pt",
-            tokenize=True,
+        return translation, int((time.time() - start_time) * 1000)
+    
+    def translate_stream(self, text: str, source_lang: str = "en", target_lang: str = "es",
+                         cancel_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Translate text, yielding decoded pieces as tokens are generated.
+        
+        generate() runs on a helper thread feeding a TextIteratorStreamer.
+        Setting `cancel_event`, or closing the generator early, stops
+        generation at the next token instead of running out the budget.
+        
+        Args:
+            text: Source text to translate
+            source_lang: ISO language code of the source
+            target_lang: ISO language code of the target
+            cancel_event: Optional event the caller sets to abort
+        
+        Yields:
+            Non-empty text pieces; joined they form the translation
+        """
+        if not text:
+            return
+        
+        if not self.is_loaded:
+            self.initialize()
+        
+        if self._engine is not None:
+            source_tokens = self._engine.count_tokens(text)
+            yield from self._engine.generate(
+                self._build_messages(text, source_lang, target_lang),
+                max_new_tokens_for(source_tokens, source_lang, target_lang),
+                source_tokens,
+                cancel_event=cancel_event
+            )
+            return
+        
+        from transformers import TextIteratorStreamer
+        
+        source_tokens = self._count_source_tokens([text])[0]
+        budget = max_new_tokens_for(source_tokens, source_lang, target_lang)
+        encoded = self._encode_prompts([text], source_lang, target_lang)
+        prefix = self._prompt_prefix(source_lang, target_lang)
+        inputs = self._tokenizer.pad({'input_ids': encoded}, return_tensors='pt')
+        if self._device != 'cpu':
+            inputs = {k: v.to(self._model.device) for k, v in inputs.items()}
+        
+        streamer = TextIteratorStreamer(self._tokenizer, skip_prompt=True, skip_special_tokens=True)
+        closed = threading.Event()
+        criteria, guard = _stopping_criteria(inputs['input_ids'].shape[1], events=(cancel_event, closed))
+        errors = []
+        reused = []
+        
+        def run():
+            try:
+                _, prefix_tokens = self._generate(
+                    inputs,
+                    prefix,
+                    max_new_tokens=budget,
+                    do_sample=False,
+                    temperature=None,
+                    pad_token_id=self._tokenizer.pad_token_id,
+                    eos_token_id=self._eos_token_ids(),
+                    streamer=streamer,
+                    stopping_criteria=criteria
+                )
+                reused.append(prefix_tokens)
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer, which would otherwise wait forever
+                streamer.end()
+        
+        start_time = time.time()
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        try:
+            for piece in streamer:
+                if piece:
+                    yield piece
+        finally:
+            closed.set()
+            worker.join()
+            if not errors:
+                if guard.cancelled:
+                    reason = 'cancelled'
+                elif 0 in guard.repeated:
+                    reason = 'repetition'
+                elif guard.steps >= budget:
+                    reason = 'max_tokens'
+                else:
+                    reason = 'eos'
+                self._record_stats(time.time() - start_time, [source_tokens], [budget],
+                                   [guard.steps], [reason], reused[0] if reused else 0)
+        
+        if errors:
+            raise errors[0]
+    
+    def _encode_prompts(self, texts: List[str], source_lang: str, target_lang: str) -> List[List[int]]:
+        """
+        Prompt token ids for each text, without padding.
+        
+        Uses the language pair's cached prefix when available, so only the
+        segment text and the short template suffix are tokenized per call.
+        """
+        prefix = self._prompt_prefix(source_lang, target_lang)
+        if prefix is not None:
+            return prefix.encode(self._tokenizer, texts)
+        
+        prompts = [
+            self._tokenizer.apply_chat_template(
+                self._build_messages(text, source_lang, target_lang),
+                tokenize=False,
+                add_generation_prompt=True
+            )
+            for text in texts
+        ]
+        # The rendered template already contains <bos>
+        return self._tokenizer(prompts, add_special_tokens=False)['input_ids']
+    
+    def _prompt_prefix(self, source_lang: str, target_lang: str) -> Optional[PromptPrefix]:
+        """Cached PromptPrefix for a language pair (None if the template can't be split)."""
+        if not PREFIX_CACHE_ENABLED:
+            return None
+        key = (source_lang.lower(), target_lang.lower())
+        if key not in self._prefixes:
+            self._prefixes[key] = self._build_prefix(source_lang, target_lang)
+        return self._prefixes[key]
+    
+    def _build_prefix(self, source_lang: str, target_lang: str) -> Optional[PromptPrefix]:
+        rendered = self._tokenizer.apply_chat_template(
+            self._build_messages(PROMPT_SENTINEL, source_lang, target_lang),
+            tokenize=False,
             add_generation_prompt=True
         )
-        # BatchEncoding has an input_ids attribute; plain tensors do not
-        inputs = {}
-        if hasattr(encoded, 'input_ids'):
-            inputs['input_ids'] = encoded.input_ids
-            inputs['attention_mask'] = encoded.attention_mask
-        else:
-            inputs['input_ids'] = encoded
+        parts = split_template(rendered)
+        if parts is None:
+            print(f"Prompt prefix cache disabled for {source_lang}->{target_lang}: template did not split")
+            return None
+        
+        prefix_text, suffix = parts
+        prefix = PromptPrefix(self._tokenizer(prefix_text, add_special_tokens=False)['input_ids'], suffix)
+        
+        # Only reuse the prefix if tokenizing in two parts matches tokenizing the whole
+        probe = self._tokenizer(prefix_text + PREFIX_PROBE_TEXT + suffix, add_special_tokens=False)['input_ids']
+        if prefix.encode(self._tokenizer, [PREFIX_PROBE_TEXT])[0] != probe:
+            print(f"Prompt prefix cache disabled for {source_lang}->{target_lang}: token boundary mismatch")
+            return None
+        return prefix
+    
+    def _prefix_kv(self, prefix: PromptPrefix):
+        """A private copy of the prefix KV cache (generate() extends it in place)."""
+        if prefix.kv is None:
+            import torch
+            with torch.no_grad():
+                ids = torch.tensor([prefix.ids], device=self._model.device)
+                prefix.kv = self._model(input_ids=ids, use_cache=True).past_key_values
+        return copy.deepcopy(prefix.kv)
+    
+    def _generate(self, inputs: dict, prefix: Optional[PromptPrefix], **kwargs):
+        """
+        model.generate(), seeding single unpadded sequences with the prefix KV cache.
+        
+        Left padding shifts the prefix in multi-row batches, so those (and any
+        pair whose KV reuse failed once) run a full prefill.
+        
+        Returns:
+            (generate output, number of prompt tokens served from the cache)
+        """
+        single = inputs['input_ids'].shape[0] == 1 and bool(inputs['attention_mask'].all())
+        # ONNX Runtime sessions take their own past_key_values layout
+        reusable = self._backend == 'transformers'
+        if prefix is not None and single and reusable and not prefix.kv_failed:
+            try:
+                outputs = self._model.generate(**inputs, past_key_values=self._prefix_kv(prefix), **kwargs)
+                return outputs, len(prefix.ids)
+            except Exception as e:
+                print(f"Prefix KV reuse failed ({e}), falling back to full prefill")
+                prefix.kv_failed = True
+                prefix.kv = None
+        return self._model.generate(**inputs, **kwargs), 0
+    
+    def _count_source_tokens(self, texts: List[str]) -> List[int]:
+        """Token count of each bare source text, without the prompt template."""
+        return [len(ids) for ids in self._tokenizer(texts, add_special_tokens=False)['input_ids']]
+    
+    def _eos_token_ids(self) -> List[int]:
+        """Token ids that end a turn: eos plus Gemma's <end_of_turn> when present."""
+        ids = [self._tokenizer.eos_token_id]
+        end_of_turn = self._tokenizer.convert_tokens_to_ids('<end_of_turn>')
+        if end_of_turn is not None and end_of_turn != self._tokenizer.unk_token_id:
+            ids.append(end_of_turn)
+        return ids
+    
+    def _generate_batch(self, batch_ids: List[List[int]], budgets: List[int],
+                        source_tokens: Optional[List[int]] = None,
+                        prefix: Optional[PromptPrefix] = None) -> List[str]:
+        """
+        Run one left-padded generate() call and decode the new tokens.
         
+        The batch runs to the largest member budget; each row is cut back to
+        its own budget, and rows caught looping are trimmed to one copy.
+        """
+        inputs = self._tokenizer.pad(
+            {'input_ids': batch_ids},
+            padding=True,
+            return_tensors='pt'
+        )
         if self._device != 'cpu':
-            for k, v in inputs.items():
-                inputs[k] = v.to(self._model.device)
-        
-        # Generate (max_new_tokens=256 is sufficient for any segment/verse)
-        print(f"DEBUG: Starting generation for '{text[:50]}...'")
-        outputs = self._model.generate(
-            **inputs,
-            max_new_tokens=256,
+            inputs = {k: v.to(self._model.device) for k, v in inputs.items()}
+        
+        prompt_len = inputs['input_ids'].shape[1]
+        criteria, guard = _stopping_criteria(prompt_len, budgets)
+        eos_ids = self._eos_token_ids()
+        
+        start_time = time.time()
+        outputs, prefix_tokens = self._generate(
+            inputs,
+            prefix,
+            max_new_tokens=max(budgets),
             do_sample=False,
             temperature=None,
-            pad_token_id=self._tokenizer.eos_token_id
+            pad_token_id=self._tokenizer.pad_token_id,
+            eos_token_id=eos_ids,
+            stopping_criteria=criteria
         )
+        elapsed = time.time() - start_time
+        
+        translations, new_tokens, reasons = [], [], []
+        for row, output in enumerate(outputs):
+            generated = output[prompt_len:].tolist()
+            if row in guard.repeated:
+                generated = generated[:guard.repeated[row]]
+                reason = 'repetition'
+            else:
+                end = next((i for i, t in enumerate(generated) if t in eos_ids), None)
+                if end is not None and end < budgets[row]:
+                    generated = generated[:end]
+                    reason = 'eos'
+                else:
+                    generated = generated[:budgets[row]]
+                    reason = 'max_tokens'
+            translations.append(self._tokenizer.decode(generated, skip_special_tokens=True).strip())
+            new_tokens.append(len(generated))
+            reasons.append(reason)
+        
+        self._record_stats(elapsed, source_tokens or [0] * len(batch_ids), budgets, new_tokens, reasons,
+                           prefix_tokens)
+        return translations
+    
+    def _record_stats(self, elapsed: float, source_tokens: List[int], budgets: List[int],
+                      new_tokens: List[int], reasons: List[str], prefix_tokens: int = 0) -> None:
+        """Remember one entry per sequence of a generate() call."""
+        total_new = sum(new_tokens)
+        tokens_per_sec = round(total_new / elapsed, 2) if elapsed > 0 else 0.0
+        self._totals.update({
+            'calls': 1,
+            'sequences': len(new_tokens),
+            'source_tokens': sum(source_tokens),
+            'new_tokens': total_new,
+            'max_new_tokens': sum(budgets),
+            'generate_ms': int(elapsed * 1000),
+        })
+        for src, budget, count, reason in zip(source_tokens, budgets, new_tokens, reasons):
+            self._stats.append({
+                'time_ms': int(elapsed * 1000),
+                'batch_size': len(new_tokens),
+                'source_tokens': src,
+                'max_new_tokens': budget,
+                'new_tokens': count,
+                'tokens_per_sec': tokens_per_sec,
+                'stop_reason': reason,
+                'prefix_cached_tokens': prefix_tokens,
+            })
+    
+    def generation_stats(self) -> Dict:
+        """
+        Summary of recent generations, to compare tail latency and budgets.
+        
+        Returns:
+            Dict with count, p50/p95/max call time, average tokens/sec,
+            budget utilisation, stop-reason counts, prefix KV reuse rate,
+            running token totals and the last entry
+        """
+        entries = list(self._stats)
+        if not entries:
+            return {'count': 0}
+        
+        times = sorted(e['time_ms'] for e in entries)
+        
+        def percentile(p):
+            return times[min(len(times) - 1, int(p * len(times)))]
+        
+        return {
+            'count': len(entries),
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': times[-1],
+            'avg_tokens_per_sec': round(sum(e['tokens_per_sec'] for e in entries) / len(entries), 2),
+            'budget_used': round(sum(e['new_tokens'] for e in entries) /
+                                 max(1, sum(e['max_new_tokens'] for e in entries)), 3),
+            'stop_reasons': dict(Counter(e['stop_reason'] for e in entries)),
+            'prefix_reuse_rate': round(sum(1 for e in entries if e['prefix_cached_tokens']) / len(entries), 3),
+            'totals': dict(self._totals),
+            'last': entries[-1],
+        }
+    
+    def reset_stats(self) -> None:
+        """Forget recorded generations, e.g. between benchmark runs."""
+        self._stats.clear()
+        self._totals.clear()
+    
+    def iter_translate_batches(self, texts: List[str], source_lang: str = "en",
+                               target_lang: str = "es",
+                               max_batch_size: Optional[int] = None,
+                               token_budget: Optional[int] = None
+                               ) -> Iterator[Tuple[List[int], List[Tuple[str, int]]]]:
+        """
+        Translate texts in length-bucketed batches, yielding as each batch finishes.
+        
+        Args:
+            texts: Source texts
+            source_lang: ISO language code of the source
+            target_lang: ISO language code of the target
+            max_batch_size: Override GEMMA_MAX_BATCH_SIZE
+            token_budget: Override GEMMA_BATCH_TOKEN_BUDGET
+        
+        Yields:
+            (indices into texts, list of (translation, time_ms)) per batch.
+            time_ms is the batch wall time divided across its sequences.
+        """
+        if not self.is_loaded:
+            self.initialize()
         
-        # Decode only the new tokens
-        input_ids = inputs['input_ids']
-        generated_ids = outputs[0][input_ids.shape[1]:]
-        response = self._tokenizer.decode(generated_ids, skip_special_tokens=True)
-        print(f"DEBUG: Generation complete: '{response[:50]}...'")
+        # Empty texts never reach the model
+        work = [i for i, text in enumerate(texts) if text and text.strip()]
+        empty = [i for i, text in enumerate(texts) if not (text and text.strip())]
+        if empty:
+            yield empty, [("", 0)] * len(empty)
+        if not work:
+            return
         
-        translation_time_ms = int((time.time() - start_time) * 1000)
+        work_texts = [texts[i] for i in work]
+        if self._engine is not None:
+            for indices, results in self._engine.iter_translate_batches(
+                    work_texts,
+                    lambda text: self._build_messages(text, source_lang, target_lang),
+                    lambda n: max_new_tokens_for(n, source_lang, target_lang)):
+                yield [work[j] for j in indices], results
+            return
         
-        return response.strip(), translation_time_ms
+        prefix = self._prompt_prefix(source_lang, target_lang)
+        encoded = self._encode_prompts(work_texts, source_lang, target_lang)
+        source_tokens = self._count_source_tokens(work_texts)
+        budgets = [max_new_tokens_for(n, source_lang, target_lang) for n in source_tokens]
+        batches = plan_batches(
+            [len(ids) for ids in encoded],
+            max_batch_size=max_batch_size or MAX_BATCH_SIZE,
+            token_budget=token_budget or BATCH_TOKEN_BUDGET,
+            max_new_tokens=max(budgets)
+        )
+        
+        for batch in batches:
+            start_time = time.time()
+            try:
+                translations = self._generate_batch(
+                    [encoded[j] for j in batch], [budgets[j] for j in batch], [source_tokens[j] for j in batch], prefix
+                )
+            except Exception as e:
+                # One bad input should not sink the whole batch; retry singly
+                print(f"Batch generation failed ({e}), retrying {len(batch)} texts one by one")
+                translations = []
+                for j in batch:
+                    try:
+                        translations.append(
+                            self._generate_batch([encoded[j]], [budgets[j]], [source_tokens[j]], prefix)[0]
+                        )
+                    except Exception as item_error:
+                        print(f"Error translating text {work[j]}: {item_error}")
+                        translations.append("")
+            per_item_ms = int((time.time() - start_time) * 1000 / len(batch))
+            yield [work[j] for j in batch], [(t, per_item_ms) for t in translations]
     
-    def translate_batch(self, texts: list, target_lang: str = "es",
-                        progress_callback=None) -> list:
+    def translate_batch(self, texts: list, source_lang: str = "en", target_lang: str = "es",
+                        progress_callback=None, max_batch_size: Optional[int] = None,
+                        token_budget: Optional[int] = None) -> list:
         """
-        Translate multiple texts.
+        Translate multiple texts with batched generation.
         
         Args:
             texts: List of source texts
+            source_lang: Source language code
             target_lang: Target language code
-            progress_callback: Optional callback(index, total, translation)
+            progress_callback: Optional callback(completed, total, translation)
+            max_batch_size: Override GEMMA_MAX_BATCH_SIZE
+            token_budget: Override GEMMA_BATCH_TOKEN_BUDGET
         
         Returns:
-            List of (translation, time_ms) tuples
+            List of (translation, time_ms) tuples, in input order
         """
-        results = []
+        results = [("", 0)] * len(texts)
         total = len(texts)
+        completed = 0
         
-        for i, text in enumerate(texts):
-            translation, time_ms = self.translate(text, target_lang)
-            results.append((translation, time_ms))
-            
-            if progress_callback:
-                progress_callback(i + 1, total, translation)
+        for indices, batch_results in self.iter_translate_batches(
+                texts, source_lang, target_lang, max_batch_size, token_budget):
+            for idx, result in zip(indices, batch_results):
+                results[idx] = result
+                completed += 1
+                if progress_callback:
+                    progress_callback(completed, total, result[0])
         
         return results
     
@@ -299,14 +1021,119 @@ class GemmaService:
         snapshot_download(repo_id=MODEL_ID)
         print("Download complete.")
     
+    def export_local(self, force_cpu: bool = False, base_dir: Optional[str] = None) -> str:
+        """
+        Save the loaded model and tokenizer as local safetensors shards.
+        
+        Loads the model first if needed. The export is written to a temporary
+        directory and renamed into place, so a crash never leaves a half
+        export that initialize() would pick up.
+        
+        Args:
+            force_cpu: Passed to initialize() if the model isn't loaded yet
+            base_dir: Override GEMMA_LOCAL_MODEL_DIR
+        
+        Returns:
+            Path of the export
+        """
+        if self._model is None:
+            self.initialize(force_cpu=force_cpu)
+        
+        path = local_model_path(self._use_quantization, base_dir)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        
+        start_time = time.time()
+        print(f"Exporting model to {path}...")
+        try:
+            self._model.save_pretrained(tmp_path, safe_serialization=True, max_shard_size=EXPORT_SHARD_SIZE)
+            self._tokenizer.save_pretrained(tmp_path)
+            with open(os.path.join(tmp_path, EXPORT_MARKER), 'w') as f:
+                json.dump({
+                    'model_id': MODEL_ID,
+                    'quantized': self._use_quantization,
+                    'device': self._device,
+                    'exported_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                }, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        
+        print(f"Export complete in {time.time() - start_time:.1f}s")
+        return path
+    
+    def export_onnx(self, base_dir: Optional[str] = None) -> str:
+        """
+        Export the model to ONNX and quantize it to dynamic int8 for ONNX Runtime.
+        
+        A one-time step for GEMMA_BACKEND=onnx; the fp32 export needs roughly
+        4 bytes per parameter of free disk and RAM while it runs.
+        
+        Returns:
+            Path of the int8 export
+        """
+        from optimum.onnxruntime import ORTModelForCausalLM, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        path = onnx_model_path(base_dir)
+        fp32_path = f"{path}.fp32-{os.getpid()}"
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        for stale in (fp32_path, tmp_path):
+            shutil.rmtree(stale, ignore_errors=True)
+        
+        start_time = time.time()
+        print(f"Exporting {MODEL_ID} to ONNX...")
+        try:
+            model = ORTModelForCausalLM.from_pretrained(MODEL_ID, export=True, use_cache=True)
+            model.save_pretrained(fp32_path)
+            
+            try:
+                with open('/proc/cpuinfo') as f:
+                    vnni = 'avx512_vnni' in f.read()
+            except OSError:
+                vnni = False
+            qconfig = (AutoQuantizationConfig.avx512_vnni if vnni else AutoQuantizationConfig.avx2)(
+                is_static=False, per_channel=False
+            )
+            print(f"Quantizing to int8 ({'avx512_vnni' if vnni else 'avx2'})...")
+            quantizer = ORTQuantizer.from_pretrained(fp32_path, file_name=ONNX_FP32_FILE)
+            # Weights of a 12B model exceed protobuf's 2GB limit
+            quantizer.quantize(save_dir=tmp_path, quantization_config=qconfig, use_external_data_format=True)
+            
+            AutoTokenizer.from_pretrained(MODEL_ID).save_pretrained(tmp_path)
+            model.config.save_pretrained(tmp_path)
+            with open(os.path.join(tmp_path, EXPORT_MARKER), 'w') as f:
+                json.dump({
+                    'model_id': MODEL_ID,
+                    'quantized': True,
+                    'format': 'onnx-int8',
+                    'exported_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                }, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        finally:
+            shutil.rmtree(fp32_path, ignore_errors=True)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        
+        print(f"ONNX export complete in {time.time() - start_time:.1f}s")
+        return path
+    
     def unload(self):
         """Unload the model to free memory."""
+        if self._engine is not None:
+            self._engine.unload()
+            self._engine = None
         if self._model is not None:
             del self._model
             self._model = None
         if self._tokenizer is not None:
             del self._tokenizer
             self._tokenizer = None
+        self._prefixes.clear()
         
         # Clear CUDA cache if available
         try:
@@ -325,13 +1152,17 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1 and sys.argv[1] == "--download":
         GemmaService.download_model()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--export":
+        GemmaService().export_local()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--export-onnx":
+        GemmaService().export_onnx()
     else:
         print("Testing Gemma Translation Service...")
         service = GemmaService()
         service.initialize()
         
         test_text = "Hello, how are you today?"
-        translation, time_ms = service.translate(test_text, "es")
+        translation, time_ms = service.translate(test_text, "en", "es")
         
         print(f"\nSource: {test_text}")
         print(f"Translation: {translation}")
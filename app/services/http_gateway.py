@@ -0,0 +1,275 @@
+"""
+Outbound HTTP gateway for calls to third-party APIs (DeepL, bolls.life).
+
+Request handlers must not sit on a slow upstream: in threading mode (the
+PyInstaller build) every blocked handler is a lost web thread. All
+outbound calls go through one gateway instead:
+- A bounded pool of MAX_CONCURRENCY workers sharing one pooled
+  requests.Session performs the calls; callers get a Future and wait at
+  most their own deadline, so a hung upstream costs a pool slot, not the
+  editor. Past MAX_PENDING queued calls, new ones fail fast (busy)
+- A circuit breaker per host opens after BREAKER_FAILURES consecutive
+  network errors or 5xx responses and fails calls immediately for
+  BREAKER_RESET_SECONDS, then lets one trial call through (half-open)
+- Identical in-flight requests (GETs by default) are coalesced: later
+  callers wait on the first caller's Future instead of sending again
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_CONCURRENCY = int(os.environ.get('HTTP_GATEWAY_MAX_CONCURRENCY', '16'))
+MAX_PENDING = int(os.environ.get('HTTP_GATEWAY_MAX_PENDING', '64'))
+
+# Seconds a caller waits for a response by default
+DEFAULT_DEADLINE = float(os.environ.get('HTTP_GATEWAY_DEADLINE', '5'))
+# Socket timeouts of the upstream call itself (it may outlive the caller's deadline)
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = float(os.environ.get('HTTP_GATEWAY_READ_TIMEOUT', '10'))
+
+BREAKER_FAILURES = int(os.environ.get('HTTP_BREAKER_FAILURES', '5'))
+BREAKER_RESET_SECONDS = float(os.environ.get('HTTP_BREAKER_RESET', '30'))
+
+
+class GatewayError(Exception):
+    """An outbound call was not answered."""
+
+
+class CircuitOpenError(GatewayError):
+    """The upstream host is failing; calls are refused until the breaker resets."""
+
+
+class GatewayBusyError(GatewayError):
+    """Too many outbound calls are already queued."""
+
+
+class GatewayTimeoutError(GatewayError):
+    """No response within the caller's deadline."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips_total = 0
+        self.rejected_total = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open only one trial at a time."""
+        with self._lock:
+            if self.state == 'open' and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected_total += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.trips_total += 1
+                self.state = 'open'
+                self.opened_at = self.clock()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'trips': self.trips_total,
+            'rejected': self.rejected_total,
+        }
+
+
+def request_key(method: str, url: str, params=None, data=None, json_body=None, headers=None) -> str:
+    """Identity of a request for coalescing; includes the credentials sent."""
+    auth = (headers or {}).get('Authorization', '')
+    raw = json.dumps([method.upper(), url, params, data, json_body, auth], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class HttpGateway:
+    """Bounded, breaker-guarded, coalescing executor for outbound HTTP."""
+
+    def __init__(self, max_workers: int = MAX_CONCURRENCY, max_pending: int = MAX_PENDING,
+                 breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.breaker_factory = breaker_factory
+        self.requests_total = 0
+        self.coalesced_total = 0
+        self.busy_total = 0
+        self.timeouts_total = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._session = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Only used under self._lock
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='http-gateway')
+        return self._executor
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = self.breaker_factory()
+            return self._breakers[host]
+
+    def _call(self, breaker: CircuitBreaker, method: str, url: str, kwargs: Dict) -> requests.Response:
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def _finish(self, key: Optional[str], future: Future) -> None:
+        with self._lock:
+            self._outstanding -= 1
+            if key is not None and self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def submit(self, method: str, url: str, coalesce: Optional[bool] = None, **kwargs) -> Future:
+        """
+        Start a request in the pool.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            coalesce: Share an identical in-flight request (default: GET/HEAD only)
+            **kwargs: Passed to requests (params, data, json, headers, timeout)
+
+        Returns:
+            Future resolving to the requests.Response
+
+        Raises:
+            CircuitOpenError: The host's breaker is open
+            GatewayBusyError: MAX_PENDING calls are already waiting for a worker
+        """
+        method = method.upper()
+        if coalesce is None:
+            coalesce = method in ('GET', 'HEAD')
+        key = None
+        if coalesce:
+            key = request_key(method, url, kwargs.get('params'), kwargs.get('data'), kwargs.get('json'),
+                              kwargs.get('headers'))
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+
+        with self._lock:
+            existing = self._inflight.get(key) if key is not None else None
+            if existing is not None:
+                self.coalesced_total += 1
+                return existing
+            if self._outstanding >= self.max_workers + self.max_pending:
+                self.busy_total += 1
+                raise GatewayBusyError("Too many outbound requests in progress")
+            if not breaker.allow():
+                raise CircuitOpenError(f"{host} is unavailable (circuit open)")
+            self._outstanding += 1
+            self.requests_total += 1
+            future = self.executor.submit(self._call, breaker, method, url, kwargs)
+            if key is not None:
+                self._inflight[key] = future
+        # Outside the lock: the callback runs inline if the call already finished
+        future.add_done_callback(lambda f: self._finish(key, f))
+        return future
+
+    def request(self, method: str, url: str, deadline: float = DEFAULT_DEADLINE,
+                coalesce: Optional[bool] = None, **kwargs) -> requests.Response:
+        """
+        Perform a request, waiting at most `deadline` seconds for it.
+
+        Raises:
+            CircuitOpenError, GatewayBusyError, GatewayTimeoutError, or the
+            requests exception the call ended with
+        """
+        future = self.submit(method, url, coalesce=coalesce, **kwargs)
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeout:
+            self.timeouts_total += 1
+            raise GatewayTimeoutError(f"No response from {urlsplit(url).netloc} within {deadline:g}s")
+
+    def get_json(self, url: str, deadline: float = DEFAULT_DEADLINE, **kwargs) -> Any:
+        """GET a JSON document; HTTP errors raise requests.HTTPError."""
+        response = self.request('GET', url, deadline=deadline, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = {host: b.as_dict() for host, b in self._breakers.items()}
+            outstanding = self._outstanding
+        return {
+            'requests': self.requests_total,
+            'coalesced': self.coalesced_total,
+            'busy_rejected': self.busy_total,
+            'caller_timeouts': self.timeouts_total,
+            'outstanding': outstanding,
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'breakers': breakers,
+        }
+
+
+# Singleton instance for the application
+_gateway = None
+
+def get_http_gateway() -> HttpGateway:
+    """Get the global outbound HTTP gateway."""
+    global _gateway
+    if _gateway is None:
+        _gateway = HttpGateway()
+    return _gateway
@@ -0,0 +1,163 @@
+"""
+llama.cpp (GGUF) inference backend for GemmaService.
+
+Selected with GEMMA_BACKEND=llama_cpp. Runs a quantized GGUF conversion of
+the model through llama-cpp-python, which is usually the fastest option on
+CPU-only hosts and needs neither torch nor bitsandbytes.
+
+- The prompt is rendered from the chat template embedded in the GGUF file
+  (falling back to Gemma's turn format), with the same structured message
+  GemmaService uses for transformers
+- llama.cpp keeps the KV state of the previous prompt and reuses its longest
+  common prefix, so the per language pair template costs nothing after the
+  first call
+- Generation is sequential; iter_translate_batches yields groups of texts so
+  callers see the same shape as the batched backends
+"""
+
+import os
+import time
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Path of the .gguf file (e.g. a Q4_K_M conversion of the model)
+GGUF_PATH = os.environ.get('GEMMA_GGUF_PATH', '')
+GGUF_CONTEXT = int(os.environ.get('GEMMA_GGUF_CONTEXT', '4096'))
+GGUF_THREADS = int(os.environ.get('GEMMA_GGUF_THREADS', '0'))  # 0 = llama.cpp default
+
+# Texts per yielded group in iter_translate_batches
+GROUP_SIZE = 8
+
+STOP_STRINGS = ["<end_of_turn>", "<eos>"]
+
+# Used when the GGUF file carries no chat template
+FALLBACK_TEMPLATE = (
+    "{{ bos_token }}{% for message in messages %}<start_of_turn>user\n"
+    "{% for item in message['content'] %}Translate the following {{ item['source_lang_code'] }} text "
+    "into {{ item['target_lang_code'] }}. Reply with the translation only.\n\n{{ item['text'] }}"
+    "{% endfor %}<end_of_turn>\n{% endfor %}{{ '<start_of_turn>model\\n' }}"
+)
+
+
+def render_prompt(template: str, messages: list, bos_token: str = "<bos>") -> str:
+    """Render a Hugging Face style chat template the way apply_chat_template does."""
+    from jinja2.sandbox import ImmutableSandboxedEnvironment
+    env = ImmutableSandboxedEnvironment(trim_blocks=True, lstrip_blocks=True)
+
+    def raise_exception(message):
+        raise ValueError(message)
+
+    env.globals['raise_exception'] = raise_exception
+    return env.from_string(template).render(messages=messages, bos_token=bos_token,
+                                            add_generation_prompt=True)
+
+
+class LlamaCppEngine:
+    """GGUF model driven through llama-cpp-python."""
+
+    def __init__(self, model_path: Optional[str] = None, record_stats: Optional[Callable] = None):
+        self.model_path = model_path or GGUF_PATH
+        self.record_stats = record_stats
+        self._llm = None
+        self._template = None
+        self._lock = threading.Lock()  # One Llama context: one generation at a time
+
+    def load(self) -> None:
+        if self._llm is not None:
+            return
+        if not self.model_path or not os.path.exists(self.model_path):
+            raise FileNotFoundError(
+                f"GGUF model not found at '{self.model_path}'. Set GEMMA_GGUF_PATH to a .gguf file."
+            )
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise ImportError("Please install llama-cpp-python to use GEMMA_BACKEND=llama_cpp.")
+
+        kwargs = {'n_ctx': GGUF_CONTEXT, 'verbose': False}
+        if GGUF_THREADS:
+            kwargs['n_threads'] = GGUF_THREADS
+        self._llm = Llama(model_path=self.model_path, **kwargs)
+        self._template = self._llm.metadata.get('tokenizer.chat_template') or FALLBACK_TEMPLATE
+
+    def unload(self) -> None:
+        self._llm = None
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._llm.tokenize(text.encode('utf-8'), add_bos=False, special=False))
+
+    def _prompt(self, messages: list) -> str:
+        try:
+            return render_prompt(self._template, messages)
+        except Exception as e:
+            print(f"GGUF chat template failed ({e}), using the fallback template")
+            self._template = FALLBACK_TEMPLATE
+            return render_prompt(self._template, messages)
+
+    def generate(self, messages: list, budget: int, source_tokens: int = 0,
+                 cancel_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Stream the translation for one prompt, stopping on end of turn, the
+        token budget, a repetition loop or `cancel_event`.
+        """
+        from app.services.gemma_service import detect_repetition
+
+        prompt = self._prompt(messages)
+        pieces: List[str] = []
+        reason = 'max_tokens'
+        start_time = time.time()
+        with self._lock:
+            stream = self._llm.create_completion(
+                prompt, max_tokens=budget, temperature=0.0, stop=STOP_STRINGS, stream=True
+            )
+            try:
+                for chunk in stream:
+                    choice = chunk['choices'][0]
+                    if choice.get('text'):
+                        pieces.append(choice['text'])
+                        yield choice['text']
+                    if choice.get('finish_reason') == 'stop':
+                        reason = 'eos'
+                    if cancel_event is not None and cancel_event.is_set():
+                        reason = 'cancelled'
+                        break
+                    if detect_repetition(pieces)[0]:
+                        reason = 'repetition'
+                        break
+            finally:
+                stream.close()
+        if self.record_stats is not None:
+            self.record_stats(time.time() - start_time, [source_tokens], [budget], [len(pieces)], [reason])
+
+    def translate(self, messages: list, budget: int, source_tokens: int = 0) -> str:
+        from app.services.gemma_service import detect_repetition
+
+        pieces = list(self.generate(messages, budget, source_tokens))
+        n, span = detect_repetition(pieces)
+        if n:
+            # Keep one copy of the loop, as the transformers backend does
+            pieces = pieces[:len(pieces) - span + n]
+        return ''.join(pieces).strip()
+
+    def iter_translate_batches(self, texts: List[str], build_messages: Callable, budget_for: Callable,
+                               ) -> Iterator[Tuple[List[int], List[Tuple[str, int]]]]:
+        """Translate texts one by one, yielding groups of GROUP_SIZE results."""
+        indices, results = [], []
+        for i, text in enumerate(texts):
+            start_time = time.time()
+            try:
+                source_tokens = self.count_tokens(text)
+                translation = self.translate(build_messages(text), budget_for(source_tokens), source_tokens)
+            except Exception as e:
+                print(f"Error translating text {i}: {e}")
+                translation = ""
+            indices.append(i)
+            results.append((translation, int((time.time() - start_time) * 1000)))
+            if len(indices) >= GROUP_SIZE:
+                yield indices, results
+                indices, results = [], []
+        if indices:
+            yield indices, results
+
+    def info(self) -> Dict:
+        return {'gguf_path': self.model_path, 'n_ctx': GGUF_CONTEXT}
@@ -0,0 +1,146 @@
+"""
+Cached, budgeted machine translation.
+
+translate_cached() sits in front of the DeepL client:
+- Texts are looked up in the MT response cache (get_mt_cache), keyed by
+  (normalized source, source lang, target lang, provider), and only the
+  misses are sent to the provider; results are stored for every user
+- Characters sent (billed) and served from cache are accounted per user
+  per day in MTUsage
+- With MT_MONTHLY_CHAR_LIMIT set, a request that would take the user past
+  the month's budget is refused before anything is sent. The check is
+  soft: concurrent requests of one user can overshoot by one request.
+Must be called inside an app context.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import MTUsage
+from app.services.mt_client import DeepLClient, MTQuotaError, get_mt_client, plan_requests
+from app.services.translation_cache import TranslationCache, get_mt_cache
+
+PROVIDER = 'deepl'
+
+
+class MTBudgetError(MTQuotaError):
+    """The user's local monthly character budget is used up."""
+
+
+def _month_start(today: Optional[date] = None) -> date:
+    return (today or date.today()).replace(day=1)
+
+
+def month_usage(user_id: int, provider: str = PROVIDER, today: Optional[date] = None) -> Dict:
+    """Billed and cached characters of the user's current calendar month."""
+    row = db.session.query(
+        func.coalesce(func.sum(MTUsage.billed_chars), 0),
+        func.coalesce(func.sum(MTUsage.cached_chars), 0),
+        func.coalesce(func.sum(MTUsage.requests), 0)
+    ).filter(
+        MTUsage.user_id == user_id,
+        MTUsage.provider == provider,
+        MTUsage.day >= _month_start(today)
+    ).one()
+    limit = current_app.config.get('MT_MONTHLY_CHAR_LIMIT', 0)
+    return {
+        'billed_chars': int(row[0]),
+        'cached_chars': int(row[1]),
+        'requests': int(row[2]),
+        'limit': limit,
+        'remaining': max(0, limit - int(row[0])) if limit else None,
+    }
+
+
+def check_budget(user_id: int, chars: int, provider: str = PROVIDER) -> None:
+    """
+    Raises:
+        MTBudgetError: Sending `chars` more would exceed the monthly limit
+    """
+    limit = current_app.config.get('MT_MONTHLY_CHAR_LIMIT', 0)
+    if not limit or not chars:
+        return
+    used = month_usage(user_id, provider)['billed_chars']
+    if used + chars > limit:
+        raise MTBudgetError(
+            f"Monthly MT budget exceeded: {used:,} of {limit:,} characters used, {chars:,} requested", 429
+        )
+
+
+def record_usage(user_id: int, billed_chars: int, cached_chars: int, requests: int,
+                 provider: str = PROVIDER) -> None:
+    """Add to the user's usage row for today, creating it if needed."""
+    if not (billed_chars or cached_chars):
+        return
+    today = date.today()
+    values = {
+        MTUsage.billed_chars: MTUsage.billed_chars + billed_chars,
+        MTUsage.cached_chars: MTUsage.cached_chars + cached_chars,
+        MTUsage.requests: MTUsage.requests + requests,
+    }
+    query = MTUsage.query.filter_by(user_id=user_id, provider=provider, day=today)
+    if query.update(values, synchronize_session=False):
+        db.session.commit()
+        return
+    try:
+        db.session.add(MTUsage(user_id=user_id, provider=provider, day=today, billed_chars=billed_chars,
+                               cached_chars=cached_chars, requests=requests))
+        db.session.commit()
+    except IntegrityError:
+        # Another request created today's row first
+        db.session.rollback()
+        query.update(values, synchronize_session=False)
+        db.session.commit()
+
+
+def translate_cached(texts: List[str], target_lang: str, api_key: str, source_lang: Optional[str] = "EN",
+                     user_id: Optional[int] = None, client: Optional[DeepLClient] = None,
+                     cache: Optional[TranslationCache] = None, interactive: bool = False) -> List[str]:
+    """
+    Translate texts, sending only cache misses to the provider.
+
+    Args:
+        texts: Source texts; empty ones come back as ""
+        target_lang: DeepL target code
+        api_key: DeepL API key
+        source_lang: DeepL source code, or None to auto-detect
+        user_id: User charged for the characters sent (None = not accounted)
+        client: DeepL client (defaults to the shared one)
+        cache: MT cache (defaults to the shared one)
+        interactive: A request thread is waiting; fail fast instead of retrying
+
+    Returns:
+        Translations in input order
+
+    Raises:
+        MTBudgetError: The user's monthly budget would be exceeded
+        MTError: The provider failed
+    """
+    client = client or get_mt_client()
+    cache = cache or get_mt_cache()
+    source_key = source_lang.upper().split('-')[0] if source_lang else 'auto'
+    target_key = target_lang.upper()
+
+    wanted = [t for t in texts if t and t.strip()]
+    cached = cache.get_many(wanted, source_key, target_key, PROVIDER)
+    misses = list(dict.fromkeys(t for t in wanted if t not in cached))
+    billed_chars = sum(len(t) for t in misses)
+
+    if user_id is not None:
+        check_budget(user_id, billed_chars)
+
+    translated = dict(cached)
+    if misses:
+        results = client.translate_batch(misses, target_lang, api_key, source_lang, interactive=interactive)
+        cache.put_many(list(zip(misses, results)), source_key, target_key, PROVIDER)
+        translated.update(zip(misses, results))
+
+    if user_id is not None:
+        record_usage(user_id, billed_chars, sum(len(t) for t in wanted if t in cached),
+                     len(plan_requests(misses)))
+    return [translated.get(t, "") if t and t.strip() else "" for t in texts]
@@ -0,0 +1,215 @@
+"""
+DeepL machine translation client.
+
+- Calls go through the shared HTTP gateway (pooled keep-alive session,
+  bounded concurrency, per-host circuit breaker); identical concurrent
+  requests are sent once
+- translate_batch() packs up to MAX_TEXTS_PER_REQUEST texts (DeepL's limit
+  is 50) into each call, within the request size limit, and returns the
+  translations in input order; repeated texts are sent once
+- 429 (too many requests) and 5xx responses are retried with exponential
+  backoff and jitter, honouring Retry-After. Interactive calls (an editor
+  waiting on a web thread) make one attempt and wait at most
+  INTERACTIVE_DEADLINE; the retry loop is for background jobs
+- Free keys (ending in ':fx') go to api-free.deepl.com, others to
+  api.deepl.com; DEEPL_API_URL overrides both (e.g. a local stand-in)
+"""
+
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from app.services.http_gateway import (CircuitOpenError, GatewayBusyError, GatewayTimeoutError,
+                                       HttpGateway, get_http_gateway)
+
+DEEPL_FREE_URL = "https://api-free.deepl.com/v2/translate"
+DEEPL_PRO_URL = "https://api.deepl.com/v2/translate"
+DEEPL_API_URL = os.environ.get('DEEPL_API_URL', '')
+
+# DeepL accepts at most 50 texts and 128 KiB of body per request
+MAX_TEXTS_PER_REQUEST = 50
+MAX_REQUEST_BYTES = 120 * 1024
+
+MAX_RETRIES = int(os.environ.get('MT_MAX_RETRIES', '5'))
+BACKOFF_BASE_SECONDS = float(os.environ.get('MT_BACKOFF_BASE', '0.5'))
+BACKOFF_MAX_SECONDS = 30.0
+
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = float(os.environ.get('MT_READ_TIMEOUT', '30'))
+
+# Seconds an interactive caller waits; the upstream call may finish later
+# in the gateway pool (and feeds a repeated request through coalescing)
+INTERACTIVE_DEADLINE = float(os.environ.get('MT_INTERACTIVE_DEADLINE', '8'))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class MTError(Exception):
+    """A DeepL request failed."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MTAuthError(MTError):
+    """The API key was rejected (403)."""
+
+
+class MTQuotaError(MTError):
+    """The account's character quota is used up (456)."""
+
+
+def plan_requests(texts: List[str], max_texts: int = MAX_TEXTS_PER_REQUEST,
+                  max_bytes: int = MAX_REQUEST_BYTES) -> List[List[int]]:
+    """
+    Group texts into requests by count and encoded size.
+
+    Returns:
+        Lists of indices into texts, in order; a text larger than max_bytes
+        still gets a request of its own
+    """
+    groups = []
+    current, size = [], 0
+    for i, text in enumerate(texts):
+        # Rough form-encoded size: quoting can triple non-ASCII bytes
+        text_bytes = len(text.encode('utf-8')) * 3 + len('&text=')
+        if current and (len(current) >= max_texts or size + text_bytes > max_bytes):
+            groups.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += text_bytes
+    if current:
+        groups.append(current)
+    return groups
+
+
+class DeepLClient:
+    """Batching DeepL client shared by all requests of a process."""
+
+    def __init__(self, api_url: Optional[str] = None, gateway: Optional[HttpGateway] = None,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE_SECONDS,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.api_url = api_url or DEEPL_API_URL
+        self.gateway = gateway or get_http_gateway()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.sleep = sleep
+        self.requests_total = 0
+        self.retries_total = 0
+        self.texts_total = 0
+        self.chars_total = 0
+
+    def endpoint(self, api_key: str) -> str:
+        if self.api_url:
+            return self.api_url
+        return DEEPL_FREE_URL if api_key.endswith(':fx') else DEEPL_PRO_URL
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** attempt), BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _post(self, api_key: str, data: Dict, interactive: bool = False) -> Dict:
+        """POST one translate request, retrying throttling and server errors unless interactive."""
+        headers = {"Authorization": f"DeepL-Auth-Key {api_key}"}
+        deadline = INTERACTIVE_DEADLINE if interactive else CONNECT_TIMEOUT + READ_TIMEOUT
+        max_retries = 0 if interactive else self.max_retries
+        attempt = 0
+        while True:
+            response = None
+            try:
+                self.requests_total += 1
+                response = self.gateway.request(
+                    'POST', self.endpoint(api_key), deadline=deadline, coalesce=True,
+                    headers=headers, data=data, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+                )
+                if response.status_code == 403:
+                    raise MTAuthError("Invalid API Key", 403)
+                if response.status_code == 456:
+                    raise MTQuotaError("DeepL quota exceeded", 456)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = MTError(f"DeepL returned {response.status_code}", response.status_code)
+            except (CircuitOpenError, GatewayBusyError) as e:
+                # Retrying would only add load; fail the request now
+                raise MTError(f"DeepL unavailable: {e}", 503)
+            except (requests.ConnectionError, requests.Timeout, GatewayTimeoutError) as e:
+                error = MTError(f"DeepL unreachable: {e}")
+            except requests.HTTPError as e:
+                raise MTError(str(e), e.response.status_code if e.response is not None else None)
+
+            if attempt >= max_retries:
+                raise error
+            self.retries_total += 1
+            self.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def translate_batch(self, texts: List[str], target_lang: str, api_key: str,
+                        source_lang: Optional[str] = "EN", interactive: bool = False) -> List[str]:
+        """
+        Translate many texts with as few requests as DeepL's limits allow.
+
+        Args:
+            texts: Source texts; empty ones come back as ""
+            target_lang: DeepL target code (e.g. 'ES', 'EN-US')
+            api_key: DeepL API key
+            source_lang: DeepL source code, or None to auto-detect
+            interactive: A request thread is waiting: one attempt, short deadline
+
+        Returns:
+            Translations in input order
+
+        Raises:
+            MTAuthError, MTQuotaError, MTError
+        """
+        unique = list(dict.fromkeys(t for t in texts if t and t.strip()))
+        translated: Dict[str, str] = {}
+        for group in plan_requests(unique):
+            batch = [unique[i] for i in group]
+            data = {'text': batch, 'target_lang': target_lang.upper()}
+            if source_lang:
+                # Source codes carry no regional variant
+                data['source_lang'] = source_lang.upper().split('-')[0]
+            result = self._post(api_key, data, interactive)
+            translations = result.get('translations') or []
+            if len(translations) != len(batch):
+                raise MTError(f"DeepL returned {len(translations)} translations for {len(batch)} texts")
+            for text, item in zip(batch, translations):
+                translated[text] = item['text']
+            self.texts_total += len(batch)
+            self.chars_total += sum(len(t) for t in batch)
+        return [translated.get(t, "") if t and t.strip() else "" for t in texts]
+
+    def translate(self, text: str, target_lang: str, api_key: str, source_lang: Optional[str] = "EN",
+                  interactive: bool = False) -> str:
+        """Translate one text."""
+        return self.translate_batch([text], target_lang, api_key, source_lang, interactive)[0]
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.requests_total,
+            'retries': self.retries_total,
+            'texts': self.texts_total,
+            'chars': self.chars_total,
+        }
+
+
+# Singleton instance for the application
+_mt_client = None
+
+def get_mt_client() -> DeepLClient:
+    """Get the global DeepL client."""
+    global _mt_client
+    if _mt_client is None:
+        _mt_client = DeepLClient()
+    return _mt_client
@@ -0,0 +1,171 @@
+"""
+Bulk machine pretranslation of a project through DeepL.
+
+Untranslated segments are sent in document order through the MT cache
+and the pooled, batching DeepL client, PRETRANSLATE_CHUNK texts at a time;
+characters sent count against the user's MT budget. Results are written
+straight into target_text. A segment is only filled if it is still empty
+and unlocked when the chunk is written, so concurrent edits always win.
+start_pretranslate_job() runs it as a Socket.IO background task, one per
+project at a time, emitting PROGRESS_EVENT with the filled segment ids to
+the project room so open editors mark them translated.
+The other functions must be called inside an app context.
+"""
+
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, or_, update
+
+from app.extensions import db
+from app.models import Paragraph, Segment
+from app.services.audit_sink import audit_sink
+from app.services.mt_cache import translate_cached
+from app.services.mt_client import DeepLClient, MAX_TEXTS_PER_REQUEST
+from app.services.translation_cache import TranslationCache
+
+# Texts translated and written per transaction (a few DeepL requests)
+PRETRANSLATE_CHUNK = MAX_TEXTS_PER_REQUEST * 4
+
+PROGRESS_EVENT = 'mt_pretranslate_progress'
+
+# Projects with a pretranslation running in this process
+_running = set()
+_running_lock = threading.Lock()
+
+
+def untranslated_segments(project_id: int) -> List[Tuple[int, str]]:
+    """(segment id, source text) of the project's empty segments, in document order."""
+    rows = db.session.query(Segment.id, Segment.source_text).join(Paragraph).filter(
+        Paragraph.project_id == project_id,
+        or_(Segment.target_text.is_(None), Segment.target_text == '')
+    ).order_by(Paragraph.p_idx, Segment.s_idx).all()
+    return [(row.id, row.source_text) for row in rows if row.source_text and row.source_text.strip()]
+
+
+def write_translations(rows: List[Tuple[int, str]], user_id: int) -> List[Tuple[int, str]]:
+    """
+    Fill target_text for segments that are still empty and unlocked.
+
+    Returns:
+        The (segment id, text) pairs actually written
+    """
+    if not rows:
+        return []
+    ids = [sid for sid, _ in rows]
+    writable = {
+        row.id for row in db.session.query(Segment.id).filter(
+            Segment.id.in_(ids),
+            or_(Segment.target_text.is_(None), Segment.target_text == ''),
+            Segment.locked_by_user_id.is_(None)
+        )
+    }
+    written = [(sid, text) for sid, text in rows if sid in writable and text]
+    if not written:
+        return []
+
+    table = Segment.__table__
+    # Re-checked in the WHERE clause: an edit between the SELECT and here still wins
+    stmt = update(table).where(
+        table.c.id == bindparam('b_id'),
+        or_(table.c.target_text.is_(None), table.c.target_text == ''),
+        table.c.locked_by_user_id.is_(None)
+    ).values(target_text=bindparam('b_text'), last_modified_by_id=user_id,
+             last_modified_at=datetime.utcnow())
+    db.session.execute(stmt, [{'b_id': sid, 'b_text': text} for sid, text in written])
+    db.session.commit()
+    return written
+
+
+def pretranslate_project(project_id: int, user_id: int, api_key: str, target_lang: str,
+                         source_lang: Optional[str] = "EN", client: Optional[DeepLClient] = None,
+                         cache: Optional[TranslationCache] = None,
+                         segments: Optional[List[Tuple[int, str]]] = None,
+                         progress: Optional[Callable[[Dict, List[Tuple[int, str]]], None]] = None) -> Dict:
+    """
+    Machine translate every untranslated segment of a project.
+
+    Args:
+        project_id: Project to pretranslate
+        user_id: User recorded as last modifier of filled segments and
+            charged for the characters sent
+        api_key: DeepL API key
+        target_lang: DeepL target code
+        source_lang: DeepL source code, or None to auto-detect
+        client: DeepL client (defaults to the shared one)
+        cache: MT cache (defaults to the shared one)
+        segments: (segment id, source text) to translate; defaults to
+            untranslated_segments(project_id)
+        progress: Optional callback(summary, written) after each chunk
+
+    Returns:
+        Dict with total, completed (sent to DeepL), written and skipped counts
+
+    Raises:
+        MTError: DeepL failed or the budget ran out (MTBudgetError); chunks
+            written before the failure are kept
+    """
+    if segments is None:
+        segments = untranslated_segments(project_id)
+    summary = {'total': len(segments), 'completed': 0, 'written': 0, 'skipped': 0}
+
+    for start in range(0, len(segments), PRETRANSLATE_CHUNK):
+        chunk = segments[start:start + PRETRANSLATE_CHUNK]
+        translations = translate_cached([text for _, text in chunk], target_lang, api_key, source_lang,
+                                        user_id=user_id, client=client, cache=cache)
+        written = write_translations([(sid, t) for (sid, _), t in zip(chunk, translations)], user_id)
+        summary['completed'] += len(chunk)
+        summary['written'] += len(written)
+        summary['skipped'] += len(chunk) - len(written)
+        if progress:
+            progress(summary, written)
+    return summary
+
+
+def _run_job(app, project_id: int, user_id: int, api_key: str, target_lang: str,
+             source_lang: Optional[str], segments: List[Tuple[int, str]]) -> None:
+    from app.extensions import socketio
+
+    room = f"project_{project_id}"
+    summary = {'total': len(segments), 'completed': 0, 'written': 0, 'skipped': 0}
+
+    def progress(current, written):
+        summary.update(current)
+        socketio.emit(PROGRESS_EVENT, dict(summary, project_id=project_id, status='running',
+                                           segment_ids=[sid for sid, _ in written]), to=room)
+
+    try:
+        with app.app_context():
+            pretranslate_project(project_id, user_id, api_key, target_lang, source_lang,
+                                 segments=segments, progress=progress)
+            audit_sink.record(project_id=project_id, user_id=user_id, action='mt_pretranslate',
+                              details=f"MT pretranslated {summary['written']} of {summary['total']} segments")
+        socketio.emit(PROGRESS_EVENT, dict(summary, project_id=project_id, status='completed'), to=room)
+    except Exception as e:
+        print(f"MT pretranslation of project {project_id} failed: {e}")
+        socketio.emit(PROGRESS_EVENT, dict(summary, project_id=project_id, status='failed', error=str(e)),
+                      to=room)
+    finally:
+        with _running_lock:
+            _running.discard(project_id)
+
+
+def start_pretranslate_job(app, project_id: int, user_id: int, api_key: str,
+                           target_lang: str, source_lang: Optional[str],
+                           segments: List[Tuple[int, str]]) -> bool:
+    """
+    Pretranslate `segments` in the background.
+
+    Returns:
+        False if this project already has a pretranslation running
+    """
+    from app.extensions import socketio
+
+    with _running_lock:
+        if project_id in _running:
+            return False
+        _running.add(project_id)
+    socketio.start_background_task(_run_job, app, project_id, user_id, api_key,
+                                   target_lang, source_lang, segments)
+    return True
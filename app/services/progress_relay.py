@@ -0,0 +1,118 @@
+"""
+Relay of AI translation job progress from Redis pub/sub to Socket.IO.
+
+Workers publish progress on the task queue's pub/sub channel. One
+background task per web process subscribes to it and re-emits each
+message as 'translation_progress' to the job's project room, so editors
+follow bulk jobs live instead of polling the job endpoint.
+"""
+
+import json
+import threading
+from typing import Any, Dict, Optional
+
+PROGRESS_EVENT = 'translation_progress'
+
+# Seconds to wait before resubscribing after a Redis error
+RECONNECT_DELAY = 5
+
+# Seconds each pub/sub poll blocks before yielding to other green threads
+POLL_TIMEOUT = 1.0
+
+# job_id -> project_id lookups kept for messages without a project_id
+MAX_CACHED_JOBS = 1000
+
+
+class ProgressRelay:
+    """Subscribes to worker progress and emits it to project rooms."""
+
+    def __init__(self):
+        self.app = None
+        self.relayed_total = 0
+        self._lock = threading.Lock()
+        self._started = False
+        self._job_projects: Dict[int, int] = {}
+
+    def ensure_started(self, app) -> None:
+        """Start the subscriber (once per process)."""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self.app = app
+        from app.extensions import socketio
+        socketio.start_background_task(self._run)
+
+    def _project_for_job(self, job_id: int) -> Optional[int]:
+        if job_id in self._job_projects:
+            return self._job_projects[job_id]
+        if self.app is None:
+            return None
+        from app.extensions import db
+        from app.models import AITranslationJob
+        with self.app.app_context():
+            job = db.session.get(AITranslationJob, job_id)
+            project_id = job.project_id if job else None
+        if project_id is not None:
+            if len(self._job_projects) >= MAX_CACHED_JOBS:
+                self._job_projects.clear()
+            self._job_projects[job_id] = project_id
+        return project_id
+
+    def handle(self, data: Any) -> Optional[Dict[str, Any]]:
+        """
+        Emit one pub/sub payload to its project room.
+
+        Returns:
+            The emitted message, or None if it was dropped
+        """
+        from app.extensions import socketio
+        try:
+            message = json.loads(data) if isinstance(data, (str, bytes)) else data
+        except ValueError:
+            return None
+        if not isinstance(message, dict) or 'job_id' not in message:
+            return None
+
+        project_id = message.get('project_id') or self._project_for_job(message['job_id'])
+        if project_id is None:
+            return None
+        message['project_id'] = project_id
+        socketio.emit(PROGRESS_EVENT, message, to=f"project_{project_id}")
+        self.relayed_total += 1
+        return message
+
+    def _run(self) -> None:
+        from app.extensions import socketio
+        from app.services.task_queue import get_task_queue
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_task_queue().subscribe_progress()
+                while True:
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=POLL_TIMEOUT)
+                    if message and message.get('type') == 'message':
+                        self.handle(message['data'])
+                    socketio.sleep(0)
+            except Exception as e:
+                print(f"Progress relay error, resubscribing in {RECONNECT_DELAY}s: {e}")
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            socketio.sleep(RECONNECT_DELAY)
+
+
+# Singleton instance for the application
+_relay = None
+
+def get_progress_relay() -> ProgressRelay:
+    """Get the global progress relay instance."""
+    global _relay
+    if _relay is None:
+        _relay = ProgressRelay()
+    return _relay
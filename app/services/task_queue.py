@@ -2,23 +2,116 @@
 Redis-based task queue for AI translation jobs.
 
 This module provides functionality for:
-- Enqueuing translation jobs
-- Dequeuing jobs for processing
+- Enqueuing translation jobs, split into fixed-size segment chunks
+- Fair dequeuing of chunks across users and their jobs, so many worker
+  processes can share one big job and a small job never waits behind it
+- Reliable delivery: a dequeued chunk is leased, not removed. Unless the
+  worker acknowledges it (or extends the lease) within the visibility
+  timeout it is redelivered, and after AI_MAX_ATTEMPTS deliveries it goes
+  to the dead-letter list
+- Per-job progress counters shared by all workers, plus a set of finished
+  segment ids so a redelivered chunk skips work that was already done
+- O(1) cancellation: a per-job flag that dequeue uses to lazily discard the
+  job's chunks and that workers check between batches
+- A priority lane for interactive single-segment requests, which workers
+  serve before (and between batches of) bulk chunks, with the answer
+  returned on a per-request result key
 - Publishing/subscribing to progress updates
+
+Redis layout (all keys under ai:):
+    ai:ring:users             list of user ids with queued chunks
+    ai:ring:user:<user_id>    list of that user's job ids with queued chunks
+    ai:job:<job_id>           hash of job metadata and progress counters
+    ai:job:<job_id>:chunks    list of queued chunk payloads (JSON)
+    ai:job:<job_id>:done      set of segment ids finished for the job
+    ai:job:<job_id>:cancel    flag set when the job is cancelled
+    ai:inflight               zset of leased chunk payloads, scored by lease deadline
+    ai:dead                   list of chunks that ran out of attempts
+    ai:interactive            list of pending interactive requests
+    ai:result:<request_id>    the answer to one interactive request
 """
 
 import redis
 import json
 import os
+import time
+import uuid
 from typing import Optional, List, Dict, Any
 
+# Segments per work unit handed to a worker
+CHUNK_SIZE = int(os.environ.get('AI_CHUNK_SIZE', '64'))
+
+# Finished job hashes are kept this long for status inspection
+JOB_STATE_TTL_SECONDS = 86400
+
+# Seconds a worker may hold a chunk without acknowledging or extending it
+VISIBILITY_TIMEOUT = int(os.environ.get('AI_VISIBILITY_TIMEOUT', '600'))
+
+# Deliveries per chunk before it is dead-lettered
+MAX_ATTEMPTS = int(os.environ.get('AI_MAX_ATTEMPTS', '3'))
+
+# Expired leases reclaimed per reap_expired() call
+REAP_BATCH = 100
+
+# Seconds an interactive caller waits for a worker's answer; unanswered
+# requests older than this are skipped by workers
+INTERACTIVE_TIMEOUT = int(os.environ.get('AI_INTERACTIVE_TIMEOUT', '60'))
+RESULT_TTL_SECONDS = 60
+
+# Pops the next chunk round-robin: rotate the user ring, then that user's job
+# ring, and take the first chunk of the first job that still has one. Empty
+# jobs and users are dropped from their rings on the way, and so are cancelled
+# jobs, whose chunks are discarded. The chunk is leased in the in-flight zset
+# until the server's clock passes now + ARGV[2].
+_DEQUEUE_CHUNK = """
+local users = KEYS[1]
+local inflight = KEYS[2]
+local prefix = ARGV[1]
+local now = redis.call('TIME')
+local deadline = tonumber(now[1]) + tonumber(ARGV[2])
+for _ = 1, redis.call('LLEN', users) do
+    local user = redis.call('LMOVE', users, users, 'LEFT', 'RIGHT')
+    if not user then return nil end
+    local jobs = prefix .. 'ring:user:' .. user
+    for _ = 1, redis.call('LLEN', jobs) do
+        local job = redis.call('LMOVE', jobs, jobs, 'LEFT', 'RIGHT')
+        if not job then break end
+        local chunks = prefix .. 'job:' .. job .. ':chunks'
+        local chunk = false
+        if redis.call('EXISTS', prefix .. 'job:' .. job .. ':cancel') == 1 then
+            redis.call('DEL', chunks)
+        else
+            chunk = redis.call('LPOP', chunks)
+        end
+        if redis.call('LLEN', chunks) == 0 then
+            redis.call('LREM', jobs, 0, job)
+        end
+        if chunk then
+            if redis.call('LLEN', jobs) == 0 then
+                redis.call('LREM', users, 0, user)
+            end
+            redis.call('ZADD', inflight, deadline, chunk)
+            return chunk
+        end
+    end
+    redis.call('LREM', users, 0, user)
+end
+return nil
+"""
+
 class TaskQueue:
     """Manages Redis-based job queue for AI translations."""
     
     def __init__(self, redis_url: Optional[str] = None):
         self.redis_url = redis_url or os.environ.get('REDIS_URL', 'redis://localhost:6379')
         self._redis = None
-        self.queue_name = 'ai_translation_jobs'
+        self._dequeue_script = None
+        self.queue_name = 'ai_translation_jobs'  # Legacy whole-job list
+        self.prefix = 'ai:'
+        self.users_ring = f'{self.prefix}ring:users'
+        self.inflight_key = f'{self.prefix}inflight'
+        self.dead_key = f'{self.prefix}dead'
+        self.interactive_key = f'{self.prefix}interactive'
         self.pubsub_channel = 'translation_progress'
     
     @property
@@ -28,32 +121,285 @@ class TaskQueue:
             self._redis = redis.from_url(self.redis_url, decode_responses=True)
         return self._redis
     
+    def _job_key(self, job_id) -> str:
+        return f'{self.prefix}job:{job_id}'
+    
+    def _chunks_key(self, job_id) -> str:
+        return f'{self.prefix}job:{job_id}:chunks'
+    
+    def _done_key(self, job_id) -> str:
+        return f'{self.prefix}job:{job_id}:done'
+    
+    def _cancel_key(self, job_id) -> str:
+        return f'{self.prefix}job:{job_id}:cancel'
+    
+    def _result_key(self, request_id) -> str:
+        return f'{self.prefix}result:{request_id}'
+    
+    def _user_ring(self, user_id) -> str:
+        return f'{self.prefix}ring:user:{user_id}'
+    
+    @staticmethod
+    def _payload(chunk: Dict[str, Any]) -> str:
+        return json.dumps({k: v for k, v in chunk.items() if k != 'receipt'})
+    
+    @staticmethod
+    def _load(raw: str) -> Dict[str, Any]:
+        """Decode a leased chunk; `receipt` is the exact in-flight member."""
+        chunk = json.loads(raw)
+        chunk['receipt'] = raw
+        return chunk
+    
     def enqueue_job(self, job_id: int, project_id: int, segment_ids: List[int], 
-                    target_lang: str = 'ES') -> bool:
+                    target_lang: str = 'ES', source_lang: str = 'EN', pre_resolved: int = 0,
+                    user_id: int = 0, chunk_size: Optional[int] = None) -> bool:
         """
-        Add a translation job to the queue.
+        Add a translation job to the queue as chunks of segment ids.
         
         Args:
             job_id: Database ID of the AITranslationJob
             project_id: Project being translated
             segment_ids: List of segment IDs to translate
             target_lang: Target language code
+            source_lang: Source language code
+            pre_resolved: Segments of the job already answered before queuing (TM matches)
+            user_id: Owner of the job, for fair scheduling between users
+            chunk_size: Override AI_CHUNK_SIZE
         
         Returns:
             True if successful
         """
-        job_data = {
-            'job_id': job_id,
+        size = chunk_size or CHUNK_SIZE
+        chunks = [segment_ids[i:i + size] for i in range(0, len(segment_ids), size)]
+        
+        pipeline = self.redis.pipeline()
+        pipeline.hset(self._job_key(job_id), mapping={
             'project_id': project_id,
-            'segment_ids': segment_ids,
-            'target_lang': target_lang
-        }
-        self.redis.rpush(self.queue_name, json.dumps(job_data))
+            'user_id': user_id,
+            'source_lang': source_lang,
+            'target_lang': target_lang,
+            'total': pre_resolved + len(segment_ids),
+            'pre_resolved': pre_resolved,
+            'chunks': len(chunks),
+            'chunks_done': 0,
+            'failed_chunks': 0,
+            'completed': 0,
+            'model_segments': 0,
+            'time_ms': 0,
+        })
+        for index, ids in enumerate(chunks):
+            pipeline.rpush(self._chunks_key(job_id), json.dumps({
+                'job_id': job_id,
+                'project_id': project_id,
+                'chunk': index,
+                'segment_ids': ids,
+                'source_lang': source_lang,
+                'target_lang': target_lang,
+                'attempts': 0,
+            }))
+        pipeline.rpush(self._user_ring(user_id), job_id)
+        # New arrivals join the back of the user ring
+        pipeline.lrem(self.users_ring, 0, user_id)
+        pipeline.rpush(self.users_ring, user_id)
+        pipeline.execute()
         return True
     
+    def dequeue_chunk(self, timeout: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next chunk, round-robin across users and then their jobs.
+        
+        The caller must finish_chunk(), retry_chunk() or requeue_chunk() it,
+        calling extend_chunk() while working, or it is redelivered once the
+        visibility timeout passes.
+        
+        Args:
+            timeout: Seconds to keep polling for work (0 = non-blocking)
+        
+        Returns:
+            Chunk dict (job_id, project_id, chunk, segment_ids, source_lang,
+            target_lang, attempts, receipt) or None if nothing is queued
+        """
+        if self._dequeue_script is None:
+            self._dequeue_script = self.redis.register_script(_DEQUEUE_CHUNK)
+        
+        deadline = time.time() + timeout
+        while True:
+            result = self._dequeue_script(keys=[self.users_ring, self.inflight_key],
+                                          args=[self.prefix, VISIBILITY_TIMEOUT])
+            if result:
+                return self._load(result)
+            if time.time() >= deadline:
+                return None
+            time.sleep(min(0.5, max(0.0, deadline - time.time())))
+    
+    def _claim(self, chunk: Dict[str, Any]) -> bool:
+        """Drop the chunk's lease; False if it already expired and was reclaimed."""
+        receipt = chunk.get('receipt')
+        return receipt is None or self.redis.zrem(self.inflight_key, receipt) == 1
+    
+    def _push_chunk(self, chunk: Dict[str, Any], front: bool = True) -> None:
+        job_id = chunk['job_id']
+        user_id = self.redis.hget(self._job_key(job_id), 'user_id') or 0
+        pipeline = self.redis.pipeline()
+        if front:
+            pipeline.lpush(self._chunks_key(job_id), self._payload(chunk))
+        else:
+            pipeline.rpush(self._chunks_key(job_id), self._payload(chunk))
+        pipeline.lrem(self._user_ring(user_id), 0, job_id)
+        pipeline.lpush(self._user_ring(user_id), job_id)
+        pipeline.lrem(self.users_ring, 0, user_id)
+        pipeline.lpush(self.users_ring, user_id)
+        pipeline.execute()
+    
+    def requeue_chunk(self, chunk: Dict[str, Any]) -> None:
+        """
+        Put an unfinished chunk back at the front of its job (e.g. on shutdown).
+        Does not count as a failed attempt.
+        """
+        if self._claim(chunk):
+            self._push_chunk(chunk)
+    
+    def extend_chunk(self, chunk: Dict[str, Any], seconds: Optional[int] = None) -> bool:
+        """
+        Push back the lease deadline of a chunk being worked on.
+        
+        Returns:
+            False if the lease was lost (expired and redelivered); the caller
+            should stop working on the chunk
+        """
+        receipt = chunk.get('receipt')
+        if receipt is None:
+            return True
+        now = self.redis.time()[0]
+        return self.redis.zadd(self.inflight_key, {receipt: now + (seconds or VISIBILITY_TIMEOUT)},
+                               xx=True, ch=True) == 1 or \
+            self.redis.zscore(self.inflight_key, receipt) is not None
+    
+    def drop_chunk(self, chunk: Dict[str, Any]) -> None:
+        """Release a chunk without finishing it (its job was cancelled)."""
+        self._claim(chunk)
+    
+    def _retry_claimed(self, chunk: Dict[str, Any], error: str = '') -> Optional[Dict[str, Any]]:
+        if self.is_cancelled(chunk['job_id']):
+            return None
+        chunk = dict(chunk, attempts=chunk.get('attempts', 0) + 1)
+        if chunk['attempts'] < MAX_ATTEMPTS:
+            # Back of the job so a poison chunk doesn't hog a worker
+            self._push_chunk(chunk, front=False)
+            return None
+        self.redis.rpush(self.dead_key, json.dumps(dict(
+            {k: v for k, v in chunk.items() if k != 'receipt'}, error=error, failed_at=time.time()
+        )))
+        return self._count_chunk(chunk['job_id'], failed=True)
+    
+    def retry_chunk(self, chunk: Dict[str, Any], error: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Give back a chunk that failed, for another attempt.
+        
+        Returns:
+            None if it was requeued (or the lease was already lost); the job
+            state (see finish_chunk) if it ran out of attempts and was
+            dead-lettered, which counts as a failed chunk
+        """
+        if not self._claim(chunk):
+            return None
+        return self._retry_claimed(chunk, error)
+    
+    def reap_expired(self) -> List[Dict[str, Any]]:
+        """
+        Redeliver chunks whose lease expired (their worker died or hung).
+        Safe to call from every worker: each expired lease is claimed once.
+        
+        Returns:
+            States (with job_id) of jobs that had a chunk dead-lettered
+        """
+        now = self.redis.time()[0]
+        dead = []
+        for raw in self.redis.zrangebyscore(self.inflight_key, '-inf', now, start=0, num=REAP_BATCH):
+            if self.redis.zrem(self.inflight_key, raw) != 1:
+                continue  # Another worker reclaimed it
+            chunk = json.loads(raw)
+            state = self._retry_claimed(chunk, error='visibility timeout expired')
+            if state is not None:
+                dead.append(dict(state, job_id=chunk['job_id']))
+        return dead
+    
+    def done_segments(self, job_id: int, segment_ids: List[int]) -> set:
+        """Ids among `segment_ids` already finished for the job."""
+        if not segment_ids:
+            return set()
+        flags = self.redis.smismember(self._done_key(job_id), segment_ids)
+        return {sid for sid, flag in zip(segment_ids, flags) if flag}
+    
+    def _job_state(self, raw: Dict[str, str]) -> Dict[str, Any]:
+        state = {k: int(v) for k, v in raw.items()
+                 if k not in ('source_lang', 'target_lang')}
+        model_segments = state.get('model_segments', 0)
+        return {
+            'completed': state.get('pre_resolved', 0) + state.get('completed', 0),
+            'total': state.get('total', 0),
+            'chunks': state.get('chunks', 0),
+            'chunks_done': state.get('chunks_done', 0),
+            'failed_chunks': state.get('failed_chunks', 0),
+            'avg_ms': (state.get('time_ms', 0) / model_segments) if model_segments else 0,
+            'finished': state.get('chunks_done', 0) >= state.get('chunks', 0),
+        }
+    
+    def record_progress(self, job_id: int, segment_ids: List[int], time_ms: int = 0,
+                        model_segments: int = 0) -> Dict[str, Any]:
+        """
+        Atomically add finished segments to a job's shared counters.
+        Segments already counted (by an earlier delivery) are not counted again.
+        
+        Args:
+            job_id: The job being updated
+            segment_ids: Segments finished (translated, cached or skipped)
+            time_ms: Model time spent on them
+            model_segments: How many of them actually went through the model
+        
+        Returns:
+            Job state after the update (see finish_chunk), plus `added`:
+            how many of the segments were newly counted
+        """
+        added = self.redis.sadd(self._done_key(job_id), *segment_ids) if segment_ids else 0
+        pipeline = self.redis.pipeline()
+        pipeline.hincrby(self._job_key(job_id), 'completed', added)
+        pipeline.hincrby(self._job_key(job_id), 'time_ms', time_ms)
+        pipeline.hincrby(self._job_key(job_id), 'model_segments', model_segments)
+        pipeline.hgetall(self._job_key(job_id))
+        return dict(self._job_state(pipeline.execute()[-1]), added=added)
+    
+    def finish_chunk(self, chunk: Dict[str, Any], failed: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Acknowledge a leased chunk as done.
+        
+        Returns:
+            Job state: completed (including pre-resolved), total, chunks,
+            chunks_done, failed_chunks, avg_ms and finished. Exactly one
+            caller sees finished flip to True, and it finalizes the job.
+            None if the lease had already expired; the chunk was then
+            redelivered and its new holder reports it.
+        """
+        if not self._claim(chunk):
+            return None
+        return self._count_chunk(chunk['job_id'], failed)
+    
+    def _count_chunk(self, job_id: int, failed: bool) -> Dict[str, Any]:
+        pipeline = self.redis.pipeline()
+        pipeline.hincrby(self._job_key(job_id), 'chunks_done', 1)
+        pipeline.hincrby(self._job_key(job_id), 'failed_chunks', 1 if failed else 0)
+        pipeline.hgetall(self._job_key(job_id))
+        results = pipeline.execute()
+        state = self._job_state(results[-1])
+        state['finished'] = results[0] == state['chunks']
+        if state['finished']:
+            self.redis.expire(self._job_key(job_id), JOB_STATE_TTL_SECONDS)
+            self.redis.expire(self._done_key(job_id), JOB_STATE_TTL_SECONDS)
+        return state
+    
     def dequeue_job(self, timeout: int = 0) -> Optional[Dict[str, Any]]:
         """
-        Get the next job from the queue.
+        Get the next whole job from the legacy (pre-chunking) queue.
         
         Args:
             timeout: Seconds to wait for a job (0 = non-blocking)
@@ -71,9 +417,82 @@ class TaskQueue:
                 return json.loads(result)
         return None
     
+    def submit_interactive(self, text: str, source_lang: str, target_lang: str,
+                           timeout: Optional[int] = None) -> str:
+        """
+        Queue a single-segment translation on the priority lane.
+        
+        Returns:
+            Request id to pass to wait_result()
+        """
+        request_id = uuid.uuid4().hex
+        self.redis.rpush(self.interactive_key, json.dumps({
+            'request_id': request_id,
+            'text': text,
+            'source_lang': source_lang,
+            'target_lang': target_lang,
+            'expires_at': time.time() + (timeout or INTERACTIVE_TIMEOUT),
+        }))
+        return request_id
+    
+    def wait_result(self, request_id: str, timeout: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Block until a worker answers `request_id`; None on timeout."""
+        result = self.redis.blpop(self._result_key(request_id), timeout=timeout or INTERACTIVE_TIMEOUT)
+        return json.loads(result[1]) if result else None
+    
+    def translate_interactive(self, text: str, source_lang: str, target_lang: str,
+                              timeout: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Translate one segment on a worker, ahead of queued bulk chunks.
+        
+        Returns:
+            Dict with translation, time_ms and cached
+        
+        Raises:
+            TimeoutError: No worker answered in time
+            RuntimeError: The worker failed to translate
+        """
+        timeout = timeout or INTERACTIVE_TIMEOUT
+        request_id = self.submit_interactive(text, source_lang, target_lang, timeout)
+        result = self.wait_result(request_id, timeout)
+        if result is None:
+            raise TimeoutError(f"No translation worker answered within {timeout}s")
+        if result.get('error'):
+            raise RuntimeError(result['error'])
+        return result
+    
+    def dequeue_interactive(self, timeout: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Take the next interactive request, skipping ones whose caller gave up.
+        
+        Args:
+            timeout: Seconds to wait for a request (0 = non-blocking)
+        """
+        while True:
+            if timeout > 0:
+                result = self.redis.blpop(self.interactive_key, timeout=timeout)
+                raw = result[1] if result else None
+            else:
+                raw = self.redis.lpop(self.interactive_key)
+            if raw is None:
+                return None
+            request = json.loads(raw)
+            if request.get('expires_at', float('inf')) >= time.time():
+                return request
+            timeout = 0
+    
+    def publish_result(self, request_id: str, result: Dict[str, Any]) -> None:
+        """Hand the answer to an interactive request back to its caller."""
+        pipeline = self.redis.pipeline()
+        pipeline.rpush(self._result_key(request_id), json.dumps(result))
+        pipeline.expire(self._result_key(request_id), RESULT_TTL_SECONDS)
+        pipeline.execute()
+    
     def publish_progress(self, job_id: int, completed: int, total: int, 
                          segment_id: Optional[int] = None,
-                         status: str = 'running') -> None:
+                         status: str = 'running',
+                         project_id: Optional[int] = None,
+                         remaining_seconds: Optional[float] = None) -> None:
         """
         Publish progress update for subscribers.
         
@@ -83,14 +502,18 @@ class TaskQueue:
             total: Total number of segments
             segment_id: The segment just completed (if any)
             status: Current job status
+            project_id: Project of the job (lets the web relay skip a lookup)
+            remaining_seconds: Estimated time left, if known
         """
         message = {
             'job_id': job_id,
+            'project_id': project_id,
             'completed': completed,
             'total': total,
             'progress_percent': int((completed / total) * 100) if total > 0 else 0,
             'segment_id': segment_id,
-            'status': status
+            'status': status,
+            'remaining_seconds': remaining_seconds
         }
         self.redis.publish(self.pubsub_channel, json.dumps(message))
     
@@ -106,33 +529,34 @@ class TaskQueue:
         return pubsub
     
     def get_queue_length(self) -> int:
-        """Get the number of pending jobs in the queue."""
-        return self.redis.llen(self.queue_name)
+        """Get the number of queued chunks across all jobs."""
+        total = self.redis.llen(self.queue_name)
+        for user_id in self.redis.lrange(self.users_ring, 0, -1):
+            for job_id in self.redis.lrange(self._user_ring(user_id), 0, -1):
+                total += self.redis.llen(self._chunks_key(job_id))
+        return total
     
-    def cancel_job(self, job_id: int) -> bool:
+    def get_stats(self) -> Dict[str, int]:
+        """Queued, in-flight (leased) and dead-lettered chunk counts."""
+        return {
+            'queued': self.get_queue_length(),
+            'in_flight': self.redis.zcard(self.inflight_key),
+            'dead': self.redis.llen(self.dead_key),
+            'interactive': self.redis.llen(self.interactive_key),
+        }
+    
+    def cancel_job(self, job_id: int) -> None:
         """
-        Attempt to remove a job from the queue before it starts.
-        Note: This won't stop a job that's already being processed.
+        Cancel a job in O(1) by flagging it.
         
-        Returns:
-            True if job was found and removed
+        Queued chunks are discarded lazily when dequeue reaches the job, and
+        workers holding one of its chunks stop after their current batch.
         """
-        # Get all items, filter out the job, and replace queue
-        all_jobs = self.redis.lrange(self.queue_name, 0, -1)
-        found = False
-        
-        pipeline = self.redis.pipeline()
-        pipeline.delete(self.queue_name)
-        
-        for job_str in all_jobs:
-            job_data = json.loads(job_str)
-            if job_data.get('job_id') == job_id:
-                found = True
-                continue  # Skip this one
-            pipeline.rpush(self.queue_name, job_str)
-        
-        pipeline.execute()
-        return found
+        self.redis.set(self._cancel_key(job_id), 1, ex=JOB_STATE_TTL_SECONDS)
+    
+    def is_cancelled(self, job_id: int) -> bool:
+        """Whether cancel_job() was called for the job."""
+        return self.redis.exists(self._cancel_key(job_id)) == 1
 
 
 # Singleton instance for the application
@@ -0,0 +1,236 @@
+"""
+Persistent translation cache.
+
+Stores model output in a local SQLite file, keyed by
+sha256(model id, source lang, target lang, normalized source text), so text
+that was already translated never costs model time again. Used by the AI
+worker before batched generation and by /api/translate/local. A second
+instance (get_mt_cache) holds third-party MT output keyed by provider.
+
+- Normalization collapses whitespace and applies Unicode NFC; case is kept
+  because it changes the translation
+- Size-bounded: least recently used entries are evicted past max_entries
+- Optional TTL for entries that go stale (e.g. third-party MT output)
+- Hit/miss counters for monitoring cache effectiveness
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_source(text: str) -> str:
+    """Canonical form of a source segment for cache lookups."""
+    if not text:
+        return ""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def cache_key(text: str, source_lang: str, target_lang: str, model_id: str) -> str:
+    """Stable cache key for a source text, language pair and model."""
+    raw = '\x1f'.join([model_id, source_lang.lower(), target_lang.lower(), normalize_source(text)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """SQLite-backed translation cache with LRU eviction."""
+
+    # How many inserts between size checks
+    EVICT_CHECK_INTERVAL = 100
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None):
+        default_path = os.path.join(os.path.expanduser('~'), '.glossio', 'translation_cache.db')
+        self.path = path or os.environ.get('TRANSLATION_CACHE_PATH', default_path)
+        self.max_entries = max_entries or int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', '200000'))
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._inserts_since_check = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Lazy connection; creates the schema on first use."""
+        if self._conn is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS translation_cache (
+                    key TEXT PRIMARY KEY,
+                    source_lang TEXT,
+                    target_lang TEXT,
+                    model_id TEXT,
+                    translation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hits INTEGER DEFAULT 0
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS ix_translation_cache_last_used ON translation_cache (last_used_at)'
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, text: str, source_lang: str, target_lang: str, model_id: str) -> Optional[str]:
+        """Return the cached translation for one text, or None."""
+        return self.get_many([text], source_lang, target_lang, model_id).get(text)
+
+    def get_many(self, texts: Iterable[str], source_lang: str, target_lang: str,
+                 model_id: str) -> Dict[str, str]:
+        """
+        Look up many texts at once.
+
+        Returns:
+            Dict of {text: translation} for the texts that were cached
+        """
+        keys = {}
+        for text in texts:
+            keys.setdefault(cache_key(text, source_lang, target_lang, model_id), []).append(text)
+        if not keys:
+            return {}
+
+        now = time.time()
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f'SELECT key, translation, created_at FROM translation_cache WHERE key IN ({placeholders})',
+                    chunk
+                ).fetchall()
+                for key, translation, created_at in rows:
+                    if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                        continue
+                    found[key] = translation
+
+            if found:
+                self.conn.executemany(
+                    'UPDATE translation_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?',
+                    [(now, key) for key in found]
+                )
+                self.conn.commit()
+
+        result = {}
+        for key, group in keys.items():
+            if key in found:
+                self.hits += len(group)
+                for text in group:
+                    result[text] = found[key]
+            else:
+                self.misses += len(group)
+        return result
+
+    def put(self, text: str, source_lang: str, target_lang: str, model_id: str,
+            translation: str) -> None:
+        """Store one translation."""
+        self.put_many([(text, translation)], source_lang, target_lang, model_id)
+
+    def put_many(self, items: List[Tuple[str, str]], source_lang: str, target_lang: str,
+                 model_id: str) -> None:
+        """Store (source_text, translation) pairs for one language pair and model."""
+        now = time.time()
+        rows = [
+            (cache_key(text, source_lang, target_lang, model_id), source_lang.lower(),
+             target_lang.lower(), model_id, translation, now, now)
+            for text, translation in items if text and translation
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO translation_cache
+                    (key, source_lang, target_lang, model_id, translation, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self.conn.commit()
+            self._inserts_since_check += len(rows)
+            if self._inserts_since_check >= self.EVICT_CHECK_INTERVAL:
+                self._inserts_since_check = 0
+                self._evict()
+
+    def evict(self) -> int:
+        """Trim the cache down to max_entries. Returns entries removed."""
+        with self._lock:
+            return self._evict()
+
+    def _evict(self) -> int:
+        removed = 0
+        if self.ttl_seconds:
+            cursor = self.conn.execute(
+                'DELETE FROM translation_cache WHERE created_at < ?',
+                (time.time() - self.ttl_seconds,)
+            )
+            removed += cursor.rowcount
+
+        count = self.conn.execute('SELECT COUNT(*) FROM translation_cache').fetchone()[0]
+        if count > self.max_entries:
+            # Drop a little extra so we don't evict on every insert
+            excess = count - int(self.max_entries * 0.9)
+            cursor = self.conn.execute('''
+                DELETE FROM translation_cache WHERE key IN (
+                    SELECT key FROM translation_cache ORDER BY last_used_at LIMIT ?
+                )
+            ''', (excess,))
+            removed += cursor.rowcount
+        self.conn.commit()
+        return removed
+
+    def stats(self) -> dict:
+        """Hit-rate and size statistics."""
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM translation_cache').fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'path': self.path,
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Singleton instances for the application
+_translation_cache = None
+_mt_cache = None
+
+def get_translation_cache() -> TranslationCache:
+    """Get the global model translation cache."""
+    global _translation_cache
+    if _translation_cache is None:
+        _translation_cache = TranslationCache()
+    return _translation_cache
+
+
+def get_mt_cache() -> TranslationCache:
+    """Get the global machine translation (DeepL) response cache."""
+    global _mt_cache
+    if _mt_cache is None:
+        default_path = os.path.join(os.path.expanduser('~'), '.glossio', 'mt_cache.db')
+        _mt_cache = TranslationCache(
+            path=os.environ.get('MT_CACHE_PATH', default_path),
+            max_entries=int(os.environ.get('MT_CACHE_MAX_ENTRIES', '500000')),
+            # Providers update their models; stale output is fetched again
+            ttl_seconds=int(float(os.environ.get('MT_CACHE_TTL_DAYS', '90')) * 86400) or None
+        )
+    return _mt_cache
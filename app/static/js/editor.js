@@ -4,7 +4,7 @@ let currentBibleData = null;
 
 let segments = [];
 let totalSegments = 0;
-let aiJobPollInterval = null;
+let aiJobActive = false;
 
 // Initialize from Config
 if (window.GLOSSIO_CONFIG) {
@@ -113,6 +113,11 @@ function loadSegment(id) {
 
     currentSegmentId = id;
 
+    // Stop streaming a translation for the segment we just left
+    if (typeof cancelStreamTranslation === 'function') {
+        cancelStreamTranslation();
+    }
+
     // Remember last segment position in localStorage
     const projectId = window.GLOSSIO_CONFIG ? window.GLOSSIO_CONFIG.projectId : null;
     if (projectId) {
@@ -210,6 +215,10 @@ function loadSegment(id) {
 
             if (data.bible_data) {
                 linksSpan.innerHTML += `<a href="${data.bible_data.en}" target="_blank" class="me-2 btn btn-sm btn-outline-primary">See on BibleGateway</a>`;
+                if (data.bible_data.text) {
+                    // Passage quoted from the offline Bible store
+                    linksSpan.lastElementChild.title = data.bible_data.text;
+                }
                 hasLinks = true;
             }
 
@@ -269,9 +278,14 @@ function renderAISuggestion(suggestion) {
     // Calculate time nicely
     const timeDisplay = suggestion.translation_time_ms ? `${suggestion.translation_time_ms}ms` : '';
 
+    // TM pre-pass suggestions show where they came from instead of a model time
+    let badge = 'AI Suggestion';
+    if (suggestion.origin === 'tm_exact') badge = 'TM Match (100%)';
+    else if (suggestion.origin === 'tm_fuzzy') badge = `TM Match (${suggestion.match_score}%)`;
+
     aiContainer.innerHTML = `
         <div class="ai-suggestion-card">
-            <div class="ai-suggestion-badge">AI Suggestion</div>
+            <div class="ai-suggestion-badge">${badge}</div>
             <div class="mb-2" style="font-style: italic; color: #495057;">${suggestion.suggested_text}</div>
             <div class="text-muted" style="font-size: 0.75rem;">
                 <i data-lucide="clock" style="width:12px;"></i> ${timeDisplay}
@@ -332,8 +346,8 @@ function startBatchTranslation() {
         }).then(r => r.json())
             .then(data => {
                 if (data.status === 'success') {
-                    // Start polling
-                    pollJobStatus();
+                    // Progress now arrives over the socket
+                    showJobStatus();
                 } else if (data.status === 'no_work') {
                     alert("Nothing to translate!");
                 } else {
@@ -343,53 +357,98 @@ function startBatchTranslation() {
     });
 }
 
-function pollJobStatus() {
-    if (aiJobPollInterval) clearInterval(aiJobPollInterval);
+function cancelBatchTranslation() {
+    const projectId = window.GLOSSIO_CONFIG.projectId;
+
+    showConfirm("Stop the AI translation? Suggestions made so far are kept.", () => {
+        fetch(`/api/project/${projectId}/translation-job/cancel`, {
+            method: 'POST'
+        }).then(r => r.json())
+            .then(data => {
+                if (data.status === 'success') {
+                    document.getElementById('ai-job-eta').innerText = 'Cancelling...';
+                } else {
+                    alert("Error: " + (data.error || data.message));
+                }
+            }).catch(e => alert("Error cancelling translation: " + e));
+    });
+}
+
+// Job progress arrives over Socket.IO ('translation_progress'); one fetch
+// seeds the panel when it opens or after reconnecting
+function showJobStatus() {
+    const projectId = window.GLOSSIO_CONFIG.projectId;
+
+    document.getElementById('ai-job-status').style.display = 'block';
+    aiJobActive = true;
 
+    fetch(`/api/project/${projectId}/translation-job`)
+        .then(r => r.json())
+        .then(job => {
+            onJobProgress({
+                status: job.status,
+                completed: job.completed,
+                total: job.total,
+                progress_percent: job.progress,
+                remaining_seconds: job.remaining_seconds,
+                error: job.error
+            });
+        });
+}
+
+function onJobProgress(job) {
     const statusDiv = document.getElementById('ai-job-status');
+    if (!statusDiv) return;
     const bar = document.getElementById('ai-job-bar');
     const count = document.getElementById('ai-job-count');
     const eta = document.getElementById('ai-job-eta');
-    const projectId = window.GLOSSIO_CONFIG.projectId;
 
-    statusDiv.style.display = 'block';
-
-    aiJobPollInterval = setInterval(() => {
-        fetch(`/api/project/${projectId}/translation-job`)
-            .then(r => r.json())
-            .then(job => {
-                if (job.status === 'none' || job.status === 'completed' || job.status === 'failed') {
-                    clearInterval(aiJobPollInterval);
-                    if (job.status === 'completed') {
-                        bar.style.width = '100%';
-                        bar.className = 'progress-bar bg-success';
-                        eta.innerText = 'Done!';
-                        setTimeout(() => { statusDiv.style.display = 'none'; }, 3000);
-                        // Reload current segment to see changes if any
-                        loadSegment(currentSegmentId);
-                        updateProgress();
-                    } else if (job.status === 'failed') {
-                        bar.className = 'progress-bar bg-danger';
-                        eta.innerText = 'Failed';
-                        alert("Translation job failed: " + job.error);
-                    }
-                    return;
-                }
+    if (job.status === 'none') {
+        statusDiv.style.display = 'none';
+        aiJobActive = false;
+        return;
+    }
+    if (!aiJobActive && (job.status === 'running' || job.status === 'pending')) {
+        // A job started elsewhere (another tab or collaborator)
+        statusDiv.style.display = 'block';
+        aiJobActive = true;
+    }
+    if (!aiJobActive) return;
+
+    if (job.status === 'completed' || job.status === 'failed' || job.status === 'cancelled') {
+        aiJobActive = false;
+        if (job.status === 'completed') {
+            bar.style.width = '100%';
+            bar.className = 'progress-bar bg-success';
+            eta.innerText = 'Done!';
+            setTimeout(() => { statusDiv.style.display = 'none'; }, 3000);
+            // Reload current segment to see changes if any
+            loadSegment(currentSegmentId);
+            updateProgress();
+        } else if (job.status === 'failed') {
+            bar.className = 'progress-bar bg-danger';
+            eta.innerText = 'Failed';
+            alert("Translation job failed: " + (job.error || 'see worker logs'));
+        } else if (job.status === 'cancelled') {
+            eta.innerText = 'Cancelled';
+            setTimeout(() => { statusDiv.style.display = 'none'; }, 3000);
+            updateProgress();
+        }
+        return;
+    }
 
-                // Running
-                const pct = Math.round(job.progress);
-                bar.style.width = `${pct}%`;
-                count.innerText = `${job.completed}/${job.total} segments`;
+    // Running
+    const pct = Math.round(job.progress_percent || 0);
+    bar.style.width = `${pct}%`;
+    count.innerText = `${job.completed}/${job.total} segments`;
 
-                if (job.remaining_seconds) {
-                    const min = Math.floor(job.remaining_seconds / 60);
-                    const sec = Math.floor(job.remaining_seconds % 60);
-                    eta.innerText = `~${min}m ${sec}s left`;
-                } else {
-                    eta.innerText = 'Calculating...';
-                }
-            });
-    }, 2000); // Check every 2s
+    if (job.remaining_seconds) {
+        const min = Math.floor(job.remaining_seconds / 60);
+        const sec = Math.floor(job.remaining_seconds % 60);
+        eta.innerText = `~${min}m ${sec}s left`;
+    } else {
+        eta.innerText = 'Calculating...';
+    }
 }
 
 // Check for running jobs on load
@@ -400,7 +459,7 @@ document.addEventListener('DOMContentLoaded', () => {
             .then(r => r.json())
             .then(job => {
                 if (job.status === 'running' || job.status === 'pending') {
-                    pollJobStatus();
+                    showJobStatus();
                 }
             });
     }
@@ -558,6 +617,97 @@ function requestMT() {
         });
 }
 
+function startMTPretranslate() {
+    const projectId = window.GLOSSIO_CONFIG.projectId;
+    const apiKey = localStorage.getItem('glossio_deepl_key');
+    if (!apiKey) {
+        alert("Please configure your DeepL API Key in Settings first.");
+        const modal = new bootstrap.Modal(document.getElementById('settingsModal'));
+        modal.show();
+        return;
+    }
+
+    const overrideLang = localStorage.getItem('glossio_target_lang');
+    const finalLang = overrideLang || targetLangCode;
+
+    showConfirm("Fill all untranslated segments with DeepL? Segments being edited are skipped.", () => {
+        fetch(`/api/project/${projectId}/mt-pretranslate`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ target_lang: finalLang, api_key: apiKey })
+        }).then(r => r.json())
+            .then(data => {
+                if (data.status === 'started') {
+                    // Progress arrives over the socket
+                    onMTPretranslateProgress({ status: 'running', completed: 0, total: data.total });
+                } else if (data.status === 'no_work') {
+                    alert("Nothing to translate!");
+                } else {
+                    alert("MT Error: " + (data.error || data.message));
+                }
+            }).catch(e => alert("Error starting MT pretranslation: " + e));
+    });
+}
+
+function onMTPretranslateProgress(data) {
+    (data.segment_ids || []).forEach(id => {
+        const segItem = document.getElementById(`seg-item-${id}`);
+        if (segItem) segItem.classList.add('translated');
+    });
+    if (data.segment_ids && data.segment_ids.length) updateProgress();
+
+    const statusInd = document.getElementById('status-indicator');
+    if (!statusInd) return;
+    if (data.status === 'running') {
+        statusInd.innerText = `MT ${data.completed}/${data.total}`;
+        statusInd.className = "badge bg-info text-dark border";
+    } else if (data.status === 'completed') {
+        statusInd.innerText = `MT filled ${data.written}`;
+        statusInd.className = "badge bg-light text-dark border";
+    } else if (data.status === 'failed') {
+        statusInd.innerText = "Saved";
+        statusInd.className = "badge bg-light text-dark border";
+        alert(`MT pretranslation stopped after ${data.written} segments: ${data.error}`);
+    }
+}
+
+function requestLocalAI() {
+    const text = document.getElementById('source-display').innerText;
+    const segmentId = currentSegmentId;
+    if (!segmentId || !text.trim()) return;
+
+    const overrideLang = localStorage.getItem('glossio_target_lang');
+    const finalLang = overrideLang || targetLangCode;
+    const sourceLang = (window.GLOSSIO_CONFIG.sourceLang || 'EN').toUpperCase();
+
+    const statusInd = document.getElementById('status-indicator');
+    if (statusInd) {
+        statusInd.innerText = "Translating...";
+        statusInd.className = "badge bg-info text-dark border";
+    }
+
+    const targetInput = document.getElementById('target-input');
+    const started = requestStreamTranslation(segmentId, text, sourceLang, finalLang, {
+        onChunk: (partial) => {
+            if (currentSegmentId === segmentId) targetInput.value = partial;
+        },
+        onDone: (data) => {
+            if (currentSegmentId !== segmentId) return;
+            targetInput.value = data.translation;
+            saveSegment(segmentId);
+        },
+        onError: (error) => {
+            if (statusInd) {
+                statusInd.innerText = "Error";
+                statusInd.className = "badge bg-danger";
+            }
+            alert("Local AI Error: " + error);
+        }
+    });
+
+    if (!started) alert("Not connected to the server.");
+}
+
 function mergePrev() {
     showConfirm("Merge with previous segment?", () => {
         fetch(`/api/segment/${currentSegmentId}/merge_prev`, {
@@ -835,6 +985,36 @@ function onVersionChange() {
         });
 }
 
+function preloadBibleVersion() {
+    const version = document.getElementById('bible-version-select').value;
+    const btn = document.getElementById('bible-preload-btn');
+    if (!version || !btn) return;
+
+    fetch(`/api/bible/preload/${version}`, { method: 'POST' })
+        .then(r => r.json().then(data => ({ status: r.status, data })))
+        .then(({ status, data }) => {
+            if (status !== 202 && status !== 409) {
+                alert("Bible download error: " + data.error);
+                return;
+            }
+            btn.disabled = true;
+            const poll = setInterval(() => {
+                fetch('/api/bible/cache').then(r => r.json()).then(stats => {
+                    const job = (stats.preloads || {})[version] || {};
+                    if (job.status === 'running') {
+                        btn.innerText = job.total ? `Saving ${version}: ${job.done}/${job.total}` : `Saving ${version}...`;
+                        return;
+                    }
+                    clearInterval(poll);
+                    btn.disabled = false;
+                    btn.innerText = job.status === 'completed'
+                        ? `${version} saved (${job.loaded} chapters${job.failed ? `, ${job.failed} failed` : ''})`
+                        : `Download failed: ${job.error || 'unknown error'}`;
+                }).catch(() => clearInterval(poll));
+            }, 2000);
+        }).catch(e => alert("Bible download error: " + e));
+}
+
 function fetchCustomBibleText() {
     const version = document.getElementById('bible-version-select').value;
     const book = document.getElementById('bible-book-select').value;
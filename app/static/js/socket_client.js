@@ -2,6 +2,9 @@
 
 let socket;
 let activeUsers = {};
+// Local AI stream currently shown in the editor: {requestId, segmentId, onChunk, onDone, onError}
+let activeStream = null;
+let streamCounter = 0;
 
 // Shared color generator
 window.getUserColor = function (name) {
@@ -101,6 +104,49 @@ function initSocket(projectId) {
         updateActiveUsersUI();
     });
 
+    // Typing indicators and live edits arrive coalesced in one frame per window
+    socket.on('segment_batch', (frame) => {
+        const selfId = window.GLOSSIO_CONFIG ? window.GLOSSIO_CONFIG.userId : null;
+        frame.events.forEach(evt => {
+            if (evt.user_id === selfId) return; // Server broadcasts to the whole room
+            if (evt.type === 'typing') {
+                showTypingIndicator(evt.user_id);
+            } else if (evt.type === 'update') {
+                applyRemoteSegmentUpdate(evt);
+            }
+        });
+    });
+
+    // Bulk AI job progress, relayed from the workers to the project room
+    socket.on('translation_progress', (data) => {
+        if (typeof onJobProgress === 'function') onJobProgress(data);
+    });
+
+    // Bulk DeepL pretranslation progress, with the segment ids filled so far
+    socket.on('mt_pretranslate_progress', (data) => {
+        if (typeof onMTPretranslateProgress === 'function') onMTPretranslateProgress(data);
+    });
+
+    // Streaming local AI translation (only sent to the requesting client)
+    socket.on('translation_chunk', (data) => {
+        if (!activeStream || data.request_id !== activeStream.requestId) return;
+        activeStream.onChunk(data.text);
+    });
+
+    socket.on('translation_done', (data) => {
+        if (!activeStream || data.request_id !== activeStream.requestId) return;
+        const stream = activeStream;
+        activeStream = null;
+        if (!data.cancelled) stream.onDone(data);
+    });
+
+    socket.on('translation_error', (data) => {
+        if (!activeStream || data.request_id !== activeStream.requestId) return;
+        const stream = activeStream;
+        activeStream = null;
+        stream.onError(data.error);
+    });
+
     // Listen for merge events from other users
     socket.on('segment_merged_broadcast', (data) => {
         console.log('Segment merged by another user:', data);
@@ -167,6 +213,41 @@ function initSocket(projectId) {
     }, 60000); // 1 min
 }
 
+const typingTimers = {};
+
+function showTypingIndicator(userId) {
+    const dots = document.getElementById(`typing-dots-${userId}`);
+    if (!dots) return;
+    dots.classList.add('active');
+    if (typingTimers[userId]) clearTimeout(typingTimers[userId]);
+    typingTimers[userId] = setTimeout(() => dots.classList.remove('active'), 2000);
+}
+
+function applyRemoteSegmentUpdate(data) {
+    showTypingIndicator(data.user_id);
+
+    const segItem = document.getElementById(`seg-item-${data.segment_id}`);
+    if (segItem) {
+        if (data.target_text && data.target_text.trim()) {
+            segItem.classList.add('translated');
+        } else {
+            segItem.classList.remove('translated');
+        }
+    }
+
+    // Mirror live text only when someone else holds the segment we are viewing
+    if (window.currentSegmentId === data.segment_id) {
+        const targetInput = document.getElementById('target-input');
+        if (targetInput && targetInput.disabled) {
+            targetInput.value = data.target_text;
+        }
+    }
+
+    if (typeof updateProgress === 'function') {
+        updateProgress();
+    }
+}
+
 function updateSegmentLockUI(segmentId, lockedByName) {
     const segItem = document.getElementById(`seg-item-${segmentId}`);
     if (!segItem) return;
@@ -334,3 +415,25 @@ function emitParagraphMerged(projectId, deletedSegmentIds, mergedSegmentId) {
         });
     }
 }
+
+// Stream a local AI translation; a new request replaces (and cancels) the previous one
+function requestStreamTranslation(segmentId, text, sourceLang, targetLang, callbacks) {
+    if (!socket) return false;
+    streamCounter += 1;
+    activeStream = Object.assign({ requestId: `${socket.id}-${streamCounter}`, segmentId: segmentId }, callbacks);
+    socket.emit('translate_stream', {
+        request_id: activeStream.requestId,
+        segment_id: segmentId,
+        text: text,
+        source_lang: sourceLang,
+        target_lang: targetLang
+    });
+    return true;
+}
+
+function cancelStreamTranslation() {
+    if (socket && activeStream) {
+        socket.emit('translate_cancel', { request_id: activeStream.requestId });
+    }
+    activeStream = null;
+}
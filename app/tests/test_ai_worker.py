@@ -0,0 +1,301 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.extensions import db
+from app.models import User, Project, Paragraph, Segment, AITranslationJob, AISuggestion
+import ai_worker
+
+class FakeGemma:
+    model_id = 'fake-model'
+
+    def __init__(self):
+        self.calls = []
+
+    def iter_translate_batches(self, texts, source_lang='en', target_lang='es'):
+        self.calls.append(list(texts))
+        yield list(range(len(texts))), [(t.upper(), 10) for t in texts]
+
+    def translate(self, text, source_lang='en', target_lang='es'):
+        self.calls.append([text])
+        return text.upper(), 10
+
+    def generation_stats(self):
+        return {}
+
+class FakeQueue:
+    """In-memory stand-in for the shared job counters in Redis."""
+
+    def __init__(self, total, chunks=1):
+        self.progress = []
+        self.requeued = []
+        self.retried = []
+        self.dropped = []
+        self.cancelled = set()
+        self.interactive = []
+        self.results = {}
+        self.done = set()
+        self.state = {'completed': 0, 'total': total, 'chunks': chunks, 'chunks_done': 0,
+                      'failed_chunks': 0, 'avg_ms': 0, 'finished': False}
+
+    def publish_progress(self, **kwargs):
+        self.progress.append(kwargs)
+
+    def done_segments(self, job_id, segment_ids):
+        return self.done & set(segment_ids)
+
+    def record_progress(self, job_id, segment_ids, time_ms=0, model_segments=0):
+        added = len(set(segment_ids) - self.done)
+        self.done.update(segment_ids)
+        self.state['completed'] += added
+        return dict(self.state, added=added)
+
+    def extend_chunk(self, chunk, seconds=None):
+        return True
+
+    def finish_chunk(self, chunk, failed=False):
+        self.state['chunks_done'] += 1
+        self.state['failed_chunks'] += int(failed)
+        self.state['finished'] = self.state['chunks_done'] == self.state['chunks']
+        return dict(self.state)
+
+    def retry_chunk(self, chunk, error=''):
+        self.retried.append(chunk)
+
+    def requeue_chunk(self, chunk):
+        self.requeued.append(chunk)
+
+    def drop_chunk(self, chunk):
+        self.dropped.append(chunk)
+
+    def is_cancelled(self, job_id):
+        return job_id in self.cancelled
+
+    def dequeue_interactive(self, timeout=0):
+        return self.interactive.pop(0) if self.interactive else None
+
+    def publish_result(self, request_id, result):
+        self.results[request_id] = result
+
+class FailingGemma(FakeGemma):
+    """Translates the first batch, then dies."""
+
+    def iter_translate_batches(self, texts, source_lang='en', target_lang='es'):
+        self.calls.append(list(texts))
+        yield [0], [(texts[0].upper(), 10)]
+        raise RuntimeError('out of memory')
+
+class LockedCommitGemma(FakeGemma):
+    """Translates normally, but the commit of its first batch fails."""
+
+    def __init__(self, session):
+        super().__init__()
+        commit = session.commit
+        self.fail_next_commit = False
+
+        def failing_commit():
+            if self.fail_next_commit:
+                self.fail_next_commit = False
+                raise RuntimeError('database is locked')
+            commit()
+        session.commit = failing_commit
+
+    def iter_translate_batches(self, texts, source_lang='en', target_lang='es'):
+        self.fail_next_commit = True
+        return super().iter_translate_batches(texts, source_lang, target_lang)
+
+class OneByOneGemma(FakeGemma):
+    """Yields one text per batch."""
+
+    def iter_translate_batches(self, texts, source_lang='en', target_lang='es'):
+        for i, text in enumerate(texts):
+            self.calls.append([text])
+            yield [i], [(text.upper(), 10)]
+
+class ShutdownGemma(FakeGemma):
+    """Yields one text per batch; a shutdown is requested while the first is generated."""
+
+    def iter_translate_batches(self, texts, source_lang='en', target_lang='es'):
+        for i, text in enumerate(texts):
+            self.calls.append([text])
+            ai_worker.shutdown_requested = True
+            yield [i], [(text.upper(), 10)]
+
+class ProcessJobTests(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine('sqlite:///:memory:')
+        db.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+
+        user = User(email='worker@example.com')
+        self.session.add(user)
+        self.session.flush()
+        project = Project(filename='book.docx', user_id=user.id)
+        self.session.add(project)
+        self.session.flush()
+        para = Paragraph(project_id=project.id, p_idx=0)
+        self.session.add(para)
+        self.session.flush()
+
+        texts = ['Amen.', 'Selah', ' Amen. ', '', 'Praise the Lord']
+        self.segments = [Segment(paragraph_id=para.id, s_idx=i, source_text=t) for i, t in enumerate(texts)]
+        self.session.add_all(self.segments)
+        self.session.flush()
+        # Already has a pending suggestion, must be skipped
+        self.session.add(AISuggestion(segment_id=self.segments[1].id, suggested_text='Selah', status='pending'))
+        self.job = AITranslationJob(project_id=project.id, user_id=user.id, total_segments=len(texts))
+        self.session.add(self.job)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def _run(self, chunk_size=5, gemma=None, queue=None):
+        self.gemma = gemma or FakeGemma()
+        ids = [s.id for s in self.segments]
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        self.queue = queue or FakeQueue(total=len(ids), chunks=len(chunks))
+        for index, segment_ids in enumerate(chunks):
+            ai_worker.process_chunk({
+                'job_id': self.job.id,
+                'project_id': 1,
+                'chunk': index,
+                'segment_ids': segment_ids,
+                'source_lang': 'EN',
+                'target_lang': 'ES'
+            }, self.session, self.queue, self.gemma)
+
+    def test_duplicates_translated_once(self):
+        self._run()
+
+        self.assertEqual(self.gemma.calls, [['Amen.', 'Praise the Lord']])
+        suggestions = {s.segment_id: s.suggested_text for s in
+                       self.session.query(AISuggestion).filter_by(job_id=self.job.id)}
+        self.assertEqual(suggestions, {
+            self.segments[0].id: 'AMEN.',
+            self.segments[2].id: 'AMEN.',
+            self.segments[4].id: 'PRAISE THE LORD',
+        })
+
+    def test_progress_counts_every_segment(self):
+        self._run()
+
+        job = self.session.get(AITranslationJob, self.job.id)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.completed_segments, 5)
+        self.assertEqual(self.queue.progress[-1]['status'], 'completed')
+        self.assertEqual(self.queue.progress[-1]['completed'], 5)
+
+    def test_job_finalized_by_last_chunk(self):
+        self._run(chunk_size=2)
+
+        self.assertEqual(len(self.gemma.calls), 3)
+        job = self.session.get(AITranslationJob, self.job.id)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.completed_segments, 5)
+        statuses = [p['status'] for p in self.queue.progress]
+        self.assertEqual(statuses.count('completed'), 1)
+        self.assertEqual(statuses[-1], 'completed')
+
+    def test_failure_retries_and_redelivery_resumes(self):
+        queue = FakeQueue(total=5)
+        self._run(gemma=FailingGemma(), queue=queue)
+
+        self.assertEqual(len(queue.retried), 1)
+        job = self.session.get(AITranslationJob, self.job.id)
+        self.assertEqual(job.status, 'running')
+        self.assertEqual(job.completed_segments, 4)  # Empty, already-suggested and both 'Amen.'s
+
+        # Redelivery only translates what the first attempt didn't finish
+        self._run(queue=queue)
+        self.assertEqual(self.gemma.calls, [['Praise the Lord']])
+        job = self.session.get(AITranslationJob, self.job.id)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.completed_segments, 5)
+        self.assertEqual(self.session.query(AISuggestion).filter_by(job_id=self.job.id).count(), 3)
+
+    def test_failed_commit_leaves_batch_for_retry(self):
+        queue = FakeQueue(total=5)
+        self._run(gemma=LockedCommitGemma(self.session), queue=queue)
+
+        self.assertEqual(len(queue.retried), 1)
+        self.assertEqual(queue.done, {self.segments[1].id, self.segments[3].id})
+        self.assertEqual(self.session.get(AITranslationJob, self.job.id).completed_segments, 2)
+        self.assertEqual(self.session.query(AISuggestion).filter_by(job_id=self.job.id).count(), 0)
+
+        self._run(queue=queue)
+        self.assertEqual(self.gemma.calls, [['Amen.', 'Praise the Lord']])
+        self.assertEqual(self.session.get(AITranslationJob, self.job.id).completed_segments, 5)
+        self.assertEqual(self.session.query(AISuggestion).filter_by(job_id=self.job.id).count(), 3)
+
+    def test_cancelled_job_is_dropped(self):
+        queue = FakeQueue(total=5)
+        queue.cancelled.add(self.job.id)
+        self._run(queue=queue)
+
+        self.assertEqual(self.gemma.calls, [])
+        self.assertEqual(len(queue.dropped), 1)
+        self.assertEqual(self.session.get(AITranslationJob, self.job.id).status, 'pending')
+
+    def test_shutdown_writes_current_batch_then_requeues_rest(self):
+        queue = FakeQueue(total=5)
+        try:
+            self._run(gemma=ShutdownGemma(), queue=queue)
+        finally:
+            ai_worker.shutdown_requested = False
+
+        self.assertEqual(self.gemma.calls, [['Amen.']])
+        suggestions = {s.segment_id for s in self.session.query(AISuggestion).filter_by(job_id=self.job.id)}
+        self.assertEqual(suggestions, {self.segments[0].id, self.segments[2].id})
+        self.assertEqual(len(queue.requeued), 1)
+        self.assertEqual(queue.requeued[0]['segment_ids'], [self.segments[4].id])
+
+    def test_interactive_served_between_batches(self):
+        queue = FakeQueue(total=5)
+        queue.interactive.append({'request_id': 'r1', 'text': 'Hosanna', 'source_lang': 'EN', 'target_lang': 'ES'})
+        self._run(queue=queue)
+
+        self.assertEqual(queue.results['r1'], {'translation': 'HOSANNA', 'time_ms': 10, 'cached': False})
+        self.assertEqual(self.gemma.calls[-1], ['Hosanna'])
+
+    def test_progress_throttle(self):
+        throttle = ai_worker.ProgressThrottle(interval=3600, step_percent=5)
+        self.assertFalse(throttle.due(2, 100))
+        self.assertTrue(throttle.due(5, 100))
+        self.assertFalse(throttle.due(9, 100))
+        self.assertTrue(throttle.due(10, 100))
+
+    def test_readiness_probe(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(ai_worker, 'READY_FILE_PREFIX', os.path.join(tmp, 'worker-')):
+            self.assertFalse(ai_worker.check_ready())
+            ai_worker.mark_ready(0)
+            self.assertTrue(ai_worker.check_ready())
+
+            stale = time.time() - 2 * ai_worker.READY_MAX_AGE
+            os.utime(ai_worker.ready_file(0), (stale, stale))
+            self.assertFalse(ai_worker.check_ready())
+
+            ai_worker.clear_ready(0)
+            self.assertFalse(os.path.exists(ai_worker.ready_file(0)))
+
+    def test_readiness_refreshed_after_every_batch(self):
+        queue = FakeQueue(total=5)
+        chunk = {'job_id': self.job.id, 'project_id': 1, 'chunk': 0,
+                 'segment_ids': [s.id for s in self.segments], 'source_lang': 'EN', 'target_lang': 'ES'}
+        with mock.patch.object(ai_worker, 'mark_ready') as mark_ready:
+            ai_worker.process_chunk(chunk, self.session, queue, OneByOneGemma(), worker_id=3)
+
+        self.assertEqual(mark_ready.call_args_list, [mock.call(3), mock.call(3)])
+
+    def test_workers_for_memory(self):
+        self.assertEqual(ai_worker.workers_for_memory(30, per_worker_gb=9, max_workers=8), 3)
+        self.assertEqual(ai_worker.workers_for_memory(4, per_worker_gb=9, max_workers=8), 1)
+        self.assertEqual(ai_worker.workers_for_memory(100, per_worker_gb=9, max_workers=2), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.config import Config
+from app.models import AuditLog, AuditLogArchive, UserDailyStats
+from app.services import audit_retention
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+class AuditRetentionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        now = datetime.utcnow()
+        old = now - timedelta(days=120)
+        db.session.add_all([
+            AuditLog(project_id=1, user_id=1, segment_id=10, action='edit', word_count=5, timestamp=old),
+            AuditLog(project_id=1, user_id=1, segment_id=10, action='edit', word_count=7, timestamp=old),
+            AuditLog(project_id=1, user_id=1, segment_id=11, action='edit', word_count=3, timestamp=old),
+            AuditLog(project_id=1, user_id=1, action='join', timestamp=old),
+            AuditLog(project_id=1, user_id=2, segment_id=12, action='merge', timestamp=now),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_rollup(self):
+        self.assertEqual(audit_retention.rollup_daily_stats(), 2)
+
+        stats = UserDailyStats.query.filter_by(user_id=1).one()
+        self.assertEqual(stats.edits, 3)
+        self.assertEqual(stats.segments_completed, 2)
+        self.assertEqual(stats.words, 15)
+        self.assertEqual(stats.joins, 1)
+        self.assertEqual(UserDailyStats.query.filter_by(user_id=2).one().merges, 1)
+
+        # Re-running is idempotent
+        audit_retention.rollup_daily_stats()
+        self.assertEqual(UserDailyStats.query.count(), 2)
+
+    def test_archive_keeps_rollups(self):
+        self.assertEqual(audit_retention.archive_audit_logs(90), 4)
+        self.assertEqual(AuditLog.query.count(), 1)
+        self.assertEqual(AuditLogArchive.query.count(), 4)
+        self.assertEqual(UserDailyStats.query.filter_by(user_id=1).one().edits, 3)
+
+        self.assertEqual(audit_retention.purge_archive(100), 4)
+        self.assertEqual(AuditLogArchive.query.count(), 0)
+
+    def test_rollup_after_archive_keeps_archived_days(self):
+        audit_retention.archive_audit_logs(90)
+        old_day = (datetime.utcnow() - timedelta(days=120)).date()
+
+        audit_retention.rollup_daily_stats(since=old_day - timedelta(days=30))
+
+        stats = UserDailyStats.query.filter_by(user_id=1).one()
+        self.assertEqual((stats.edits, stats.words, stats.joins), (3, 15, 1))
+        self.assertEqual(UserDailyStats.query.count(), 2)
+
+    def test_rollup_never_rebuilds_purged_days(self):
+        audit_retention.archive_audit_logs(90)
+        audit_retention.purge_archive(100)
+
+        audit_retention.rollup_daily_stats(since=(datetime.utcnow() - timedelta(days=365)).date())
+
+        self.assertEqual(UserDailyStats.query.filter_by(user_id=1).one().edits, 3)
+
+        # Today is still rolled up after a purge
+        db.session.add(AuditLog(project_id=1, user_id=2, segment_id=13, action='merge', timestamp=datetime.utcnow()))
+        db.session.commit()
+        audit_retention.rollup_daily_stats()
+        self.assertEqual(UserDailyStats.query.filter_by(user_id=2).one().merges, 2)
+
+if __name__ == "__main__":
+    unittest.main()
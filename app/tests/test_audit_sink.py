@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+from app import create_app, db
+from app.config import Config
+from app.models import AuditLog
+from app.services.audit_sink import AuditSink
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+class AuditSinkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _sink(self, **config):
+        sink = AuditSink()
+        sink.app = self.app
+        for key, value in config.items():
+            setattr(sink, key, value)
+        return sink
+
+    def test_batched_db_writes(self):
+        sink = self._sink(mode='db', batch_size=3)
+        for i in range(7):
+            sink.record(project_id=1, user_id=1, segment_id=i, action='edit')
+
+        self.assertEqual(sink.pending, 7)
+        self.assertEqual(sink.flush(), 7)
+        self.assertEqual(sink.pending, 0)
+        with self.app.app_context():
+            self.assertEqual(AuditLog.query.filter_by(action='edit').count(), 7)
+
+    def test_full_queue_flushes_inline(self):
+        sink = self._sink(mode='db')
+        sink._queue.maxsize = 2
+        for _ in range(3):
+            sink.record(project_id=1, user_id=1, action='join')
+
+        self.assertEqual(sink.inline_flushes, 1)
+        self.assertEqual(sink.written_total, 2)
+        sink.flush()
+        with self.app.app_context():
+            self.assertEqual(AuditLog.query.count(), 3)
+
+    def test_jsonl_mode(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'audit.jsonl')
+            sink = self._sink(mode='jsonl', path=path)
+            sink.record(project_id=2, user_id=5, action='leave', details='bye')
+            sink.flush()
+
+            with open(path, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['action'], 'leave')
+        self.assertEqual(lines[0]['project_id'], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+from scripts import benchmark
+
+class FakeService:
+    """Stands in for GemmaService: uppercases text, one token per character."""
+
+    model_id = 'fake-model'
+
+    def __init__(self):
+        self.backend = None
+        self.calls = []
+        self.totals = Counter()
+
+    def set_backend(self, name):
+        self.backend = name
+
+    def initialize(self):
+        pass
+
+    @property
+    def device_info(self):
+        return {'device': 'cpu', 'quantized': False, 'backend': self.backend}
+
+    def reset_stats(self):
+        self.totals.clear()
+
+    def generation_stats(self):
+        return {'avg_tokens_per_sec': 100.0, 'budget_used': 0.5, 'stop_reasons': {'eos': 1},
+                'prefix_reuse_rate': 0.0, 'totals': dict(self.totals)}
+
+    def iter_translate_batches(self, texts, source_lang, target_lang, max_batch_size=None):
+        size = max_batch_size or 8
+        for start in range(0, len(texts), size):
+            batch = texts[start:start + size]
+            self.calls.append(len(batch))
+            self.totals['new_tokens'] += sum(len(t) for t in batch)
+            yield list(range(start, start + len(batch))), [(t.upper(), 1) for t in batch]
+
+    def translate_stream(self, text, source_lang, target_lang):
+        yield from text.upper().split()
+
+class PercentileTests(unittest.TestCase):
+
+    def test_defined_for_small_samples(self):
+        self.assertIsNone(benchmark.percentile([], 95))
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+        self.assertEqual(benchmark.percentile([10, 20], 50), 15)
+        self.assertEqual(benchmark.percentile(list(range(1, 11)), 90), 9.1)
+
+class RunBenchmarkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.service = FakeService()
+        self.segments = ['one', 'two', 'one', 'three', 'two', 'four']
+
+    def test_sweep_reports_throughput_cache_and_ttft(self):
+        result = benchmark.run_benchmark(self.segments, 'transformers', [1, 4], warmup=0,
+                                         ttft_samples=2, service=self.service)
+
+        self.assertEqual([run['batch_size'] for run in result['runs']], [1, 4])
+        run = result['runs'][0]
+        # Duplicates within a chunk are translated once
+        self.assertEqual(run['translated'], 4)
+        self.assertEqual(run['tokens']['new_tokens'], len('onetwothreefour'))
+        self.assertEqual(run['cache']['warm_hit_rate'], 1.0)
+        self.assertEqual(run['ttft_ms']['count'], 2)
+        self.assertEqual(self.service.calls[:4], [1, 1, 1, 1])
+        self.assertEqual(self.service.calls[4:], [4])
+
+    def test_cold_cache_hits_repeats_across_chunks(self):
+        cache = benchmark.TranslationCache(path=':memory:')
+        try:
+            result = benchmark.run_pass(self.service, self.segments, 'en', 'es', 8, cache, chunk_size=2)
+            self.assertEqual(result['translated'], 4)
+            self.assertEqual(cache.stats()['hits'], 2)
+        finally:
+            cache.close()
+
+    def test_csv_appends_rows_and_compare_flags_regressions(self):
+        result = benchmark.run_benchmark(self.segments, 'transformers', [2], warmup=0, ttft_samples=1,
+                                         service=self.service)
+        report = {
+            'metadata': benchmark.run_metadata(),
+            'corpus': benchmark.corpus_info(self.segments, 'samples'),
+            'backends': [result, {'backend': 'llama_cpp', 'error': 'missing model'}],
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'history.csv')
+            benchmark.write_csv(report, path)
+            benchmark.write_csv(report, path)
+            with open(path) as f:
+                lines = f.read().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[0].startswith('timestamp,git_commit'))
+
+        slower = {**result, 'runs': [dict(result['runs'][0],
+                                          segments_per_sec=result['runs'][0]['segments_per_sec'] / 2)]}
+        changes = benchmark.compare_reports(report, dict(report, backends=[slower]))
+        flagged = {c['metric'] for c in changes if c['regression']}
+        self.assertEqual(flagged, {'segments_per_sec'})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app import create_app
+from app.config import Config
+from app.routes import proxy_json
+from app.services.bible_cache import BibleCache, MAX_AGE
+from app.services.http_gateway import HttpGateway
+
+BOOKS = [{'bookid': 1, 'name': 'Genesis', 'chapters': 2}, {'bookid': 43, 'name': 'John', 'chapters': 1}]
+
+class StandInBolls(BaseHTTPRequestHandler):
+    """Serves get-books and get-text like bolls.life, with ETags."""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        if server.offline:
+            self._reply(503, {'error': 'down'})
+            return
+        if server.garbage:
+            data = b'<html>Maintenance</html>'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        parts = self.path.strip('/').split('/')
+        if parts[0] == 'get-books':
+            payload = BOOKS
+        elif parts[0] == 'get-text':
+            book, chapter = int(parts[2]), int(parts[3])
+            payload = [{'pk': v, 'verse': v, 'text': f"{book}:{chapter}:{v}"} for v in (1, 2, 3)]
+        else:
+            self._reply(404, {'detail': 'Not found'})
+            return
+        etag = f'"{parts[0]}-{len(parts)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self._reply(200, payload, {'ETag': etag})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+class BibleCacheTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInBolls)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.offline = False
+        self.server.garbage = False
+        self.now = 1000.0
+        self.dir = tempfile.mkdtemp()
+        self.cache = self._cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _cache(self):
+        return BibleCache(cache_dir=self.dir, base_url=self.url, gateway=HttpGateway(), clock=lambda: self.now)
+
+    def test_verses_come_from_the_cached_chapter(self):
+        chapter = self.cache.get_chapter('RV1960', 43, 1)
+        verse = self.cache.get_verse('RV1960', 43, 1, 2)
+
+        self.assertEqual(len(chapter), 3)
+        self.assertEqual(verse['text'], '43:1:2')
+        self.assertEqual(verse['translation'], 'RV1960')
+        self.assertEqual(self.server.requests, ['/get-text/RV1960/43/1/'])
+        with self.assertRaises(LookupError):
+            self.cache.get_verse('RV1960', 43, 1, 9)
+
+    def test_revalidates_with_etag_after_max_age(self):
+        self.cache.get_chapter('RV1960', 1, 1)
+        # A new process reads the disk copy
+        cache = self._cache()
+        self.now += MAX_AGE['text'] + 1
+
+        self.assertEqual(cache.get_chapter('RV1960', 1, 1)[0]['text'], '1:1:1')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(cache.stats()['revalidated'], 1)
+        cache.get_chapter('RV1960', 1, 1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_stale_copy_served_when_upstream_is_down(self):
+        self.cache.preload_version('RV1960')
+        self.server.offline = True
+        self.now += MAX_AGE['text'] + 1
+
+        self.assertEqual(self.cache.get_verse('RV1960', 1, 2, 3)['text'], '1:2:3')
+        self.assertEqual(self.cache.stats()['stale_served'], 1)
+        with self.assertRaises(Exception):
+            self.cache.get_chapter('NVI', 1, 1)
+
+    def test_preload_fetches_every_chapter(self):
+        summary = self.cache.preload_version('RV1960')
+
+        self.assertEqual(summary, {'version': 'RV1960', 'chapters': 3, 'loaded': 3, 'failed': 0})
+        self.assertEqual(self.cache.cached_versions(), {'RV1960': 3})
+
+    def test_rejects_path_like_slugs(self):
+        with self.assertRaises(ValueError):
+            self.cache.get_books('../etc')
+
+    def test_proxy_maps_bad_slug_to_400_and_bad_upstream_body_to_502(self):
+        self.server.garbage = True
+        with create_app(TestConfig).app_context():
+            _, status = proxy_json(lambda: self.cache.get_books('../etc'))
+            self.assertEqual(status, 400)
+            _, status = proxy_json(lambda: self.cache.get_chapter('RV1960', 1, 1))
+            self.assertEqual(status, 502)
+
+if __name__ == "__main__":
+    unittest.main()
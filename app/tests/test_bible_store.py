@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from app.services.bible_store import BibleStore, parse_verse_spec
+from app.utils import TextUtils
+
+def sample_verses():
+    return [
+        {'pk': 1, 'translation': 'RV1960', 'book': 43, 'chapter': 3, 'verse': v,
+         'text': f"Verso <i>{v}</i><S>{1000 + v}</S>"}
+        for v in range(1, 21)
+    ] + [{'pk': 99, 'translation': 'RV1960', 'book': 1, 'chapter': 1, 'verse': 1,
+          'text': 'En el principio creó Dios los cielos y la tierra.'}]
+
+class BibleStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = BibleStore(path=':memory:')
+        self.store.import_records('RV1960', sample_verses(), full_name='Reina-Valera 1960', language='Español')
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_parse_verse_spec(self):
+        self.assertEqual(parse_verse_spec('16'), [16])
+        self.assertEqual(parse_verse_spec('16-18, 20'), [16, 17, 18, 20])
+        self.assertEqual(parse_verse_spec('7 - 9,8, x'), [7, 8, 9])
+        self.assertEqual(parse_verse_spec(''), [])
+
+    def test_serves_bolls_shapes(self):
+        self.assertEqual(self.store.get_books('RV1960'), [
+            {'bookid': 1, 'name': 'Genesis', 'chapters': 1},
+            {'bookid': 43, 'name': 'John', 'chapters': 3},
+        ])
+        self.assertEqual(len(self.store.get_chapter('RV1960', 43, 3)), 20)
+        self.assertEqual(self.store.get_verse('RV1960', 43, 3, 16)['pk'], 1)
+        with self.assertRaises(LookupError):
+            self.store.get_verse('RV1960', 43, 3, 40)
+        self.assertEqual(self.store.versions_listing(), [
+            {'language': 'Español', 'translations': [{'short_name': 'RV1960', 'full_name': 'Reina-Valera 1960'}]}
+        ])
+
+    def test_reference_resolves_to_local_text(self):
+        api_data = TextUtils.get_bible_url('Como dice Juan 3:16-18, 20.')['api_data']
+
+        passage = self.store.get_passage('RV1960', api_data['book_id'], int(api_data['chapter']), api_data['verse'])
+
+        self.assertEqual([v['verse'] for v in passage['verses']], [16, 17, 18, 20])
+        self.assertEqual(passage['verses'][0]['text'], 'Verso 16')
+        self.assertIsNone(self.store.get_passage('RV1960', 43, 4, '1'))
+
+    def test_import_bolls_zip_replaces_version(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'RV1960.zip')
+            with zipfile.ZipFile(path, 'w') as archive:
+                archive.writestr('RV1960.json', json.dumps(sample_verses()[:5]))
+
+            self.assertEqual(self.store.import_file('RV1960', path), 5)
+            self.assertTrue(self.store.has_version('RV1960'))
+            self.assertEqual(self.store.get_books('RV1960'), [{'bookid': 43, 'name': 'John', 'chapters': 3}])
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_sees_versions_imported_by_another_process(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'bible.db')
+            web = BibleStore(path=path)
+            self.assertEqual(web.stats()['versions'], [])
+            self.assertFalse(web.has_version('RV1960'))
+
+            importer = BibleStore(path=path)
+            importer.import_records('RV1960', sample_verses())
+            importer.close()
+
+            self.assertTrue(web.has_version('RV1960'))
+            web.close()
+        finally:
+            shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    unittest.main()
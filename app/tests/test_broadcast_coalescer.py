@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.config import Config
+from app.models import User, Project, project_assignments
+from app.services.broadcast_coalescer import BroadcastCoalescer
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+class BroadcastCoalescerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.coalescer = BroadcastCoalescer(window_ms=50)
+        # Flushing is driven manually through drain() in tests
+        self.coalescer._flusher_started = True
+
+    def test_latest_update_per_segment_wins(self):
+        for text in ['H', 'Ho', 'Hola']:
+            self.coalescer.submit('project_1', 'update', {'segment_id': 7, 'user_id': 1, 'target_text': text})
+
+        frames = self.coalescer.drain()
+        self.assertEqual(len(frames), 1)
+        room, frame = frames[0]
+        self.assertEqual(room, 'project_1')
+        self.assertEqual(len(frame['events']), 1)
+        self.assertEqual(frame['events'][0]['target_text'], 'Hola')
+
+    def test_typing_superseded_by_update(self):
+        self.coalescer.submit('project_1', 'typing', {'segment_id': 7, 'user_id': 1})
+        self.coalescer.submit('project_1', 'update', {'segment_id': 7, 'user_id': 1, 'target_text': 'x'})
+        self.coalescer.submit('project_1', 'typing', {'segment_id': 7, 'user_id': 1})
+        self.coalescer.submit('project_1', 'typing', {'segment_id': 8, 'user_id': 2})
+
+        _, frame = self.coalescer.drain()[0]
+        self.assertEqual([e['type'] for e in frame['events']], ['update', 'typing'])
+        self.assertEqual(frame['events'][1]['user_id'], 2)
+
+    def test_rooms_are_batched_separately(self):
+        self.coalescer.submit('project_1', 'typing', {'segment_id': 1, 'user_id': 1})
+        self.coalescer.submit('project_2', 'typing', {'segment_id': 1, 'user_id': 1})
+
+        rooms = sorted(room for room, _ in self.coalescer.drain())
+        self.assertEqual(rooms, ['project_1', 'project_2'])
+        self.assertEqual(self.coalescer.drain(), [])
+
+    def test_metrics(self):
+        for _ in range(5):
+            self.coalescer.submit('project_1', 'typing', {'segment_id': 1, 'user_id': 1})
+        self.coalescer.drain()
+
+        stats = self.coalescer.metrics()['project_1']
+        self.assertEqual(stats['inbound_total'], 5)
+        self.assertEqual(stats['dropped_total'], 4)
+        self.assertEqual(stats['outbound_frames_total'], 1)
+        self.assertEqual(stats['outbound_events_total'], 1)
+        self.assertGreater(stats['inbound_per_sec'], 0)
+
+    def test_metrics_endpoint_only_lists_users_rooms(self):
+        app = create_app(TestConfig)
+        with app.app_context():
+            db.create_all()
+            user, other = User(email='me@example.com'), User(email='other@example.com')
+            db.session.add_all([user, other])
+            db.session.flush()
+            owned = Project(filename='own.docx', user_id=user.id)
+            shared = Project(filename='shared.docx', user_id=other.id)
+            private = Project(filename='private.docx', user_id=other.id)
+            db.session.add_all([owned, shared, private])
+            db.session.flush()
+            db.session.execute(project_assignments.insert().values(user_id=user.id, project_id=shared.id, role='editor'))
+            db.session.commit()
+
+            for project in (owned, shared, private):
+                self.coalescer.submit(f"project_{project.id}", 'typing', {'segment_id': 1, 'user_id': other.id})
+            self.coalescer.drain()
+
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['_user_id'] = str(user.id)
+            with mock.patch('app.routes.get_broadcast_coalescer', return_value=self.coalescer):
+                response = client.get('/api/realtime/metrics')
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sorted(response.get_json()), sorted([f"project_{owned.id}", f"project_{shared.id}"]))
+            db.session.remove()
+            db.drop_all()
+
+if __name__ == "__main__":
+    unittest.main()
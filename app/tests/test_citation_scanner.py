@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from docx import Document
+from app import create_app, db
+from app.config import Config
+from app.models import User, Project, Segment
+from app.routes import parse_docx_to_db
+from app.services.citation_scanner import get_citation_scanner
+from app.utils import TextUtils
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+class CitationScannerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.scanner = get_citation_scanner('EN')
+
+    def test_finds_all_citations_with_spans(self):
+        text = "Juan 3:16-18, 20 y 2 Pedro 1:3; see The Desire of Ages, p. 214.1 and {SC 43.2}."
+
+        citations = self.scanner.scan(text)
+
+        self.assertEqual([(c['type'], c['match']) for c in citations], [
+            ('bible', 'Juan 3:16-18, 20'),
+            ('bible', '2 Pedro 1:3'),
+            ('egw', 'The Desire of Ages, p. 214.1'),
+            ('egw', 'SC 43.2'),
+        ])
+        for c in citations:
+            self.assertEqual(text[c['start']:c['end']], c['match'])
+        self.assertEqual((citations[0]['book_id'], citations[0]['chapter'], citations[0]['verse']), (43, 3, '16-18, 20'))
+        self.assertEqual(citations[3]['url'], 'https://m.egwwritings.org/en/search?query=SC+43.2')
+
+    def test_book_names_without_accents_and_numbered_books(self):
+        books = [(c['book'], c['chapter']) for c in self.scanner.scan("Exodo 20:3, Génesis 1:1 y 1Cor 13:4")]
+        self.assertEqual(books, [('Exodus', 20), ('Genesis', 1), ('1 Corinthians', 13)])
+        self.assertEqual(self.scanner.scan("In 2 of 3 cases, see John 3 or is 4."), [])
+
+    def test_abbreviation_after_prose(self):
+        for text in ("Read DA 214.1 today.", "As stated in DA 214.1", "Compare with {DA 214.1}."):
+            citations = self.scanner.scan(text)
+            self.assertEqual([(c['type'], c['abbr'], c['match']) for c in citations], [('egw', 'DA', 'DA 214.1')])
+            self.assertEqual(text[citations[0]['start']:citations[0]['end']], 'DA 214.1')
+        self.assertEqual(TextUtils.get_egw_url("As stated in DA 214.1")['en'],
+                         'https://m.egwwritings.org/en/search?query=DA+214.1')
+
+    def test_legacy_helpers_keep_their_shape(self):
+        bible = TextUtils.get_bible_url("Como dice Juan 3:16.")
+        self.assertEqual(bible['api_data'], {'book_id': 43, 'chapter': '3', 'verse': '16'})
+        self.assertEqual(bible['match'], 'Juan 3:16')
+        self.assertIsNone(TextUtils.get_bible_url("No references here."))
+
+        # Abbreviated or known titles win over an earlier unknown title
+        egw = TextUtils.get_egw_url("Unknown Book, p. 1.2 and (Desire of Ages, p. 214.1)")
+        self.assertEqual(egw, {'en': 'https://m.egwwritings.org/en/search?query=DA+214.1', 'type': 'egw',
+                               'match': 'Desire of Ages, p. 214.1'})
+        self.assertEqual(TextUtils.get_egw_url("Some Unknown Book, p. 12.3")['type'], 'google')
+
+    def test_citations_stored_at_import(self):
+        app = create_app(TestConfig)
+        with app.app_context():
+            db.create_all()
+            user = User(email='cite@example.com')
+            db.session.add(user)
+            db.session.flush()
+            project = Project(filename='doc.docx', user_id=user.id, source_lang='EN')
+            db.session.add(project)
+            db.session.commit()
+
+            fd, path = tempfile.mkstemp(suffix='.docx')
+            os.close(fd)
+            try:
+                doc = Document()
+                doc.add_paragraph("Read Romans 8:28 today.")
+                doc.add_paragraph("Nothing to cite here.")
+                doc.save(path)
+                parse_docx_to_db(path, project.id)
+            finally:
+                os.remove(path)
+
+            segments = Segment.query.order_by(Segment.id).all()
+            self.assertEqual(segments[0].citations[0]['match'], 'Romans 8:28')
+            self.assertEqual(segments[1].citations, [])
+            db.session.remove()
+            db.drop_all()
+
+if __name__ == "__main__":
+    unittest.main()
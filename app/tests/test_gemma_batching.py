@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import unittest
+from app.services.gemma_service import (
+    plan_batches, detect_repetition, max_new_tokens_for, split_template, PromptPrefix,
+    local_model_path, read_export_marker, PROMPT_SENTINEL, MIN_NEW_TOKENS, MAX_NEW_TOKENS,
+    EXPORT_MARKER, MODEL_ID
+)
+
+class CharTokenizer:
+    """One token per character, enough to check prefix splicing."""
+
+    def __call__(self, texts, add_special_tokens=False):
+        if isinstance(texts, str):
+            return {'input_ids': [ord(c) for c in texts]}
+        return {'input_ids': [[ord(c) for c in t] for t in texts]}
+
+class PlanBatchesTests(unittest.TestCase):
+
+    def test_batches_are_length_sorted(self):
+        lengths = [50, 10, 40, 12, 11, 45]
+        batches = plan_batches(lengths, max_batch_size=3, token_budget=10**6, max_new_tokens=0)
+
+        self.assertEqual(batches, [[1, 4, 3], [2, 5, 0]])
+
+    def test_token_budget_limits_batch(self):
+        lengths = [100, 100, 100, 100]
+        # Each sequence needs 100 prompt + 100 generated tokens
+        batches = plan_batches(lengths, max_batch_size=8, token_budget=400, max_new_tokens=100)
+
+        self.assertEqual([len(b) for b in batches], [2, 2])
+
+    def test_oversized_prompt_gets_own_batch(self):
+        batches = plan_batches([10, 5000], max_batch_size=8, token_budget=1000, max_new_tokens=100)
+
+        self.assertEqual(batches, [[0], [1]])
+
+    def test_every_index_planned_once(self):
+        lengths = [7, 3, 90, 15, 15, 2, 64, 33, 8]
+        batches = plan_batches(lengths, max_batch_size=4, token_budget=600, max_new_tokens=64)
+
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(len(lengths))))
+
+class GenerationLimitTests(unittest.TestCase):
+
+    def test_budget_scales_with_source_and_pair(self):
+        short = max_new_tokens_for(1, 'en', 'es')
+        long = max_new_tokens_for(60, 'en', 'es')
+
+        self.assertEqual(short, MIN_NEW_TOKENS)
+        self.assertGreater(long, 60)
+        self.assertLess(long, MAX_NEW_TOKENS)
+        self.assertGreater(max_new_tokens_for(60, 'en', 'el'), max_new_tokens_for(60, 'en', 'zh'))
+        self.assertEqual(max_new_tokens_for(5000, 'en', 'es'), MAX_NEW_TOKENS)
+
+    def test_detect_repetition(self):
+        self.assertEqual(detect_repetition([5, 6, 7, 1, 2, 3, 1, 2, 3, 1, 2, 3]), (3, 9))
+        self.assertEqual(detect_repetition([9] * 8), (1, 8))
+        # "very very very" is language, not a loop
+        self.assertEqual(detect_repetition([4, 9, 9, 9]), (0, 0))
+        self.assertEqual(detect_repetition([1, 2, 3, 4, 5, 6]), (0, 0))
+
+class PromptPrefixTests(unittest.TestCase):
+
+    def test_split_template(self):
+        rendered = f"<bos><start_of_turn>user\nen->es: {PROMPT_SENTINEL}<end_of_turn>\n<start_of_turn>model\n"
+
+        prefix, suffix = split_template(rendered)
+        self.assertEqual(prefix, "<bos><start_of_turn>user\nen->es: ")
+        self.assertEqual(suffix, "<end_of_turn>\n<start_of_turn>model\n")
+        self.assertIsNone(split_template("no sentinel here"))
+
+    def test_encode_matches_full_render(self):
+        tokenizer = CharTokenizer()
+        prefix = PromptPrefix(tokenizer("<p>")['input_ids'], "</p>")
+
+        self.assertEqual(prefix.encode(tokenizer, ["Amen", "Selah"]),
+                         [tokenizer("<p>Amen</p>")['input_ids'], tokenizer("<p>Selah</p>")['input_ids']])
+
+class LocalExportTests(unittest.TestCase):
+
+    def test_marker_required_and_model_checked(self):
+        with tempfile.TemporaryDirectory() as base:
+            path = local_model_path(True, base)
+            self.assertTrue(path.endswith('nf4'))
+            self.assertIsNone(read_export_marker(path))
+
+            os.makedirs(path)
+            with open(os.path.join(path, EXPORT_MARKER), 'w') as f:
+                json.dump({'model_id': 'someone/else'}, f)
+            self.assertIsNone(read_export_marker(path))
+
+            with open(os.path.join(path, EXPORT_MARKER), 'w') as f:
+                json.dump({'model_id': MODEL_ID, 'quantized': True}, f)
+            self.assertTrue(read_export_marker(path)['quantized'])
+
+if __name__ == "__main__":
+    unittest.main()
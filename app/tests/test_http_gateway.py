@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services.http_gateway import (HttpGateway, CircuitBreaker, CircuitOpenError, GatewayBusyError,
+                                       GatewayTimeoutError)
+
+class Upstream(BaseHTTPRequestHandler):
+    """/slow waits for the test's release event, /fail answers 500, anything else 200."""
+
+    def do_GET(self):
+        server = self.server
+        server.hits.append(self.path)
+        if self.path.startswith('/slow'):
+            server.release.wait(5)
+        status = 500 if self.path.startswith('/fail') else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class HttpGatewayTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.hits = []
+        self.server.release = threading.Event()
+        self.addCleanup(self.server.release.set)
+
+    def test_identical_in_flight_gets_are_coalesced(self):
+        gateway = HttpGateway(max_workers=4)
+        futures = [gateway.submit('GET', f"{self.base}/slow") for _ in range(5)]
+        self.server.release.set()
+
+        self.assertTrue(all(f.result(timeout=5).json() == {'ok': True} for f in futures))
+        self.assertEqual(self.server.hits, ['/slow'])
+        self.assertEqual(gateway.stats()['coalesced'], 4)
+        # Finished requests are not reused
+        gateway.get_json(f"{self.base}/slow")
+        self.assertEqual(len(self.server.hits), 2)
+
+    def test_caller_deadline_and_busy_pool_fail_fast(self):
+        gateway = HttpGateway(max_workers=1, max_pending=1)
+
+        with self.assertRaises(GatewayTimeoutError):
+            gateway.request('GET', f"{self.base}/slow/1", deadline=0.05)
+        gateway.submit('GET', f"{self.base}/slow/2")
+        start = time.time()
+        with self.assertRaises(GatewayBusyError):
+            gateway.submit('GET', f"{self.base}/slow/3")
+        self.assertLess(time.time() - start, 1)
+
+        self.server.release.set()
+        deadline = time.time() + 5
+        while gateway.stats()['outstanding'] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(gateway.get_json(f"{self.base}/ok"), {'ok': True})
+
+    def test_breaker_opens_per_host_and_recovers(self):
+        clock = FakeClock()
+        gateway = HttpGateway(breaker_factory=lambda: CircuitBreaker(failure_threshold=2, reset_seconds=30,
+                                                                     clock=clock))
+        for _ in range(2):
+            self.assertEqual(gateway.request('GET', f"{self.base}/fail").status_code, 500)
+
+        with self.assertRaises(CircuitOpenError):
+            gateway.request('GET', f"{self.base}/ok")
+        self.assertEqual(len(self.server.hits), 2)
+        # Other hosts are unaffected
+        self.assertEqual(gateway.get_json(f"http://localhost:{self.server.server_port}/ok"), {'ok': True})
+
+        clock.now = 31
+        self.assertEqual(gateway.get_json(f"{self.base}/ok"), {'ok': True})
+        host = f"127.0.0.1:{self.server.server_port}"
+        self.assertEqual(gateway.stats()['breakers'][host]['state'], 'closed')
+
+    def test_half_open_failure_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # one trial at a time
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+if __name__ == "__main__":
+    unittest.main()
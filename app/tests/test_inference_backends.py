@@ -0,0 +1,76 @@
+import unittest
+from app.services.gemma_service import GemmaService
+from app.services.llama_cpp_backend import LlamaCppEngine, render_prompt, FALLBACK_TEMPLATE
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+class FakeLlama:
+    """Stands in for llama_cpp.Llama: replays canned completion chunks."""
+
+    def __init__(self, pieces, finish='stop'):
+        self.pieces = pieces
+        self.finish = finish
+        self.prompts = []
+
+    def create_completion(self, prompt, max_tokens, temperature, stop, stream):
+        self.prompts.append(prompt)
+        chunks = [{'choices': [{'text': p, 'finish_reason': None}]} for p in self.pieces[:max_tokens]]
+        chunks[-1]['choices'][0]['finish_reason'] = self.finish if len(self.pieces) <= max_tokens else 'length'
+        self.stream = FakeStream(chunks)
+        return self.stream
+
+    def tokenize(self, data, add_bos=False, special=False):
+        return data.split()
+
+def engine_with(llm):
+    stats = []
+    engine = LlamaCppEngine(model_path='/models/test.gguf',
+                            record_stats=lambda *args: stats.append(args))
+    engine._llm = llm
+    engine._template = FALLBACK_TEMPLATE
+    return engine, stats
+
+MESSAGES = GemmaService._build_messages("In the beginning", "en", "es")
+
+class LlamaCppEngineTests(unittest.TestCase):
+
+    def test_fallback_template_renders_structured_message(self):
+        prompt = render_prompt(FALLBACK_TEMPLATE, MESSAGES)
+        self.assertTrue(prompt.startswith('<bos><start_of_turn>user'))
+        self.assertIn('In the beginning', prompt)
+        self.assertTrue(prompt.endswith('<start_of_turn>model\n'))
+
+    def test_translate_stops_at_eos(self):
+        engine, stats = engine_with(FakeLlama(['En', ' el', ' principio']))
+        self.assertEqual(engine.translate(MESSAGES, budget=16, source_tokens=3), 'En el principio')
+        self.assertEqual(stats[-1][4], ['eos'])
+
+    def test_repetition_loop_trimmed(self):
+        engine, stats = engine_with(FakeLlama(['Amen', ' amen'] + [' y'] * 40))
+        translation = engine.translate(MESSAGES, budget=64)
+        self.assertEqual(translation, 'Amen amen y')
+        self.assertEqual(stats[-1][4], ['repetition'])
+        self.assertTrue(engine._llm.stream.closed)
+
+    def test_batches_grouped_in_input_order(self):
+        engine, _ = engine_with(FakeLlama(['Hola']))
+        batches = list(engine.iter_translate_batches(['a'] * 10, lambda t: MESSAGES, lambda n: 8))
+        self.assertEqual([indices for indices, _ in batches], [list(range(8)), [8, 9]])
+
+class BackendSwitchTests(unittest.TestCase):
+
+    def test_unknown_backend_rejected(self):
+        with self.assertRaises(ValueError):
+            GemmaService().set_backend('tensorrt')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.config import Config
+from app.models import User
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    AI_INFERENCE_MODE = 'worker'
+
+class InteractiveLaneTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        user = User(email='lane@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+
+        self.cache = mock.Mock()
+        self.cache.get.return_value = None
+        mock.patch('app.routes.get_translation_cache', return_value=self.cache).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_local_translate_goes_to_worker(self):
+        queue = mock.Mock()
+        queue.translate_interactive.return_value = {'translation': 'Hola', 'time_ms': 42, 'cached': False}
+        with mock.patch('app.routes.get_task_queue', return_value=queue), \
+                mock.patch('app.routes.GemmaService.translate') as local_translate:
+            response = self.client.post('/api/translate/local', json={'text': 'Hello', 'target_lang': 'ES'})
+
+        self.assertEqual(response.get_json(), {'translation': 'Hola', 'time_ms': 42})
+        queue.translate_interactive.assert_called_once_with('Hello', 'EN', 'ES')
+        local_translate.assert_not_called()
+        # The worker caches under its own backend's model id
+        self.cache.get.assert_not_called()
+        self.cache.put.assert_not_called()
+
+    def test_worker_timeout(self):
+        queue = mock.Mock()
+        queue.translate_interactive.side_effect = TimeoutError('No translation worker answered within 60s')
+        with mock.patch('app.routes.get_task_queue', return_value=queue):
+            response = self.client.post('/api/translate/local', json={'text': 'Hello'})
+
+        self.assertEqual(response.status_code, 504)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.config import Config
+from app.models import User, Project, AITranslationJob
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    ENABLE_AI_FEATURES = True
+
+class CancelJobTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.user = User(email='cancel@example.com')
+        db.session.add(self.user)
+        db.session.flush()
+        self.project = Project(filename='ruth.docx', user_id=self.user.id)
+        db.session.add(self.project)
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = str(self.user.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_cancel_flags_running_job(self):
+        job = AITranslationJob(project_id=self.project.id, user_id=self.user.id,
+                               total_segments=10, completed_segments=4, status='running')
+        db.session.add(job)
+        db.session.commit()
+
+        queue = mock.Mock()
+        with mock.patch('app.routes.get_task_queue', return_value=queue):
+            response = self.client.post(f'/api/project/{self.project.id}/translation-job/cancel')
+
+        self.assertEqual(response.status_code, 200)
+        queue.cancel_job.assert_called_once_with(job.id)
+        self.assertEqual(db.session.get(AITranslationJob, job.id).status, 'cancelled')
+
+    def test_cancel_without_active_job(self):
+        db.session.add(AITranslationJob(project_id=self.project.id, user_id=self.user.id,
+                                        total_segments=1, status='completed'))
+        db.session.commit()
+
+        with mock.patch('app.routes.get_task_queue') as get_queue:
+            response = self.client.post(f'/api/project/{self.project.id}/translation-job/cancel')
+
+        self.assertEqual(response.status_code, 404)
+        get_queue.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from app import create_app, db
+from app.config import Config
+from app.models import User, MTUsage
+from app.services.mt_cache import translate_cached, month_usage, MTBudgetError
+from app.services.translation_cache import TranslationCache
+
+class FakeClient:
+    """Stands in for DeepLClient: uppercases text and records what was sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    def translate_batch(self, texts, target_lang, api_key, source_lang="EN", interactive=False):
+        self.sent.append(list(texts))
+        return [t.upper() for t in texts]
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    MT_MONTHLY_CHAR_LIMIT = 30
+
+class MTCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.user = User(email='mt@example.com')
+        db.session.add(self.user)
+        db.session.commit()
+        self.client = FakeClient()
+        self.cache = TranslationCache(path=':memory:', ttl_seconds=3600)
+
+    def tearDown(self):
+        self.cache.close()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _translate(self, texts, source_lang='EN'):
+        return translate_cached(texts, 'ES', 'key', source_lang, user_id=self.user.id,
+                                client=self.client, cache=self.cache)
+
+    def test_repeats_are_served_from_cache_and_not_billed(self):
+        self.assertEqual(self._translate(['Hello.', 'Bye.', 'Hello.']), ['HELLO.', 'BYE.', 'HELLO.'])
+        # Whitespace differences normalize to the same key; regional source variants too
+        self.assertEqual(self._translate(['Hello. ', 'Bye.', ''], source_lang='en-GB'), ['HELLO.', 'BYE.', ''])
+
+        self.assertEqual(self.client.sent, [['Hello.', 'Bye.']])
+        usage = month_usage(self.user.id)
+        self.assertEqual(usage['billed_chars'], len('Hello.Bye.'))
+        self.assertEqual(usage['cached_chars'], len('Hello. Bye.'))
+        self.assertEqual(usage['remaining'], 30 - len('Hello.Bye.'))
+        self.assertEqual(MTUsage.query.count(), 1)
+
+    def test_budget_is_enforced_before_sending(self):
+        self._translate(['x' * 25])
+
+        with self.assertRaises(MTBudgetError):
+            self._translate(['y' * 10])
+        self.assertEqual(len(self.client.sent), 1)
+        # Cached text is still free once the budget is spent
+        self.assertEqual(self._translate(['x' * 25]), ['X' * 25])
+
+    def test_expired_entries_are_fetched_again(self):
+        self._translate(['Hello.'])
+        self.cache.conn.execute('UPDATE translation_cache SET created_at = created_at - 7200')
+
+        self._translate(['Hello.'])
+        self.assertEqual(self.client.sent, [['Hello.'], ['Hello.']])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from app import create_app, db
+from app.config import Config
+from app.models import User, Project, Paragraph, Segment
+from app.services.http_gateway import HttpGateway
+from app.services.mt_client import DeepLClient, MTAuthError, MTError, plan_requests
+from app.services.mt_pretranslate import pretranslate_project
+from app.services.translation_cache import TranslationCache
+
+class StandInDeepL(BaseHTTPRequestHandler):
+    """Answers /v2/translate like DeepL, reversing each text."""
+
+    def do_POST(self):
+        server = self.server
+        body = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        server.requests.append({'auth': self.headers.get('Authorization'), 'body': body})
+
+        if server.throttle > 0:
+            server.throttle -= 1
+            self._reply(429, {'message': 'Too many requests'}, {'Retry-After': '0'})
+        elif self.headers.get('Authorization') != 'DeepL-Auth-Key good-key':
+            self._reply(403, {'message': 'Forbidden'})
+        else:
+            self._reply(200, {'translations': [
+                {'detected_source_language': 'EN', 'text': text[::-1]} for text in body['text']
+            ]})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+class MTClientTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInDeepL)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/v2/translate"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.throttle = 0
+        self.sleeps = []
+        self.client = DeepLClient(api_url=self.url, gateway=HttpGateway(), sleep=self.sleeps.append)
+
+    def test_batches_of_fifty_in_order(self):
+        texts = [f"segment {i}" for i in range(120)] + ['segment 3', '']
+
+        result = self.client.translate_batch(texts, 'es', 'good-key', source_lang='en-us')
+
+        self.assertEqual(result, [t[::-1] for t in texts])
+        self.assertEqual([len(r['body']['text']) for r in self.server.requests], [50, 50, 20])
+        self.assertEqual(self.server.requests[0]['body']['target_lang'], ['ES'])
+        self.assertEqual(self.server.requests[0]['body']['source_lang'], ['EN'])
+
+    def test_plan_requests_respects_size_limit(self):
+        self.assertEqual(plan_requests(['a' * 40, 'b' * 40, 'c'], max_bytes=200), [[0], [1, 2]])
+
+    def test_retries_429_then_succeeds(self):
+        self.server.throttle = 2
+
+        self.assertEqual(self.client.translate('Hello', 'ES', 'good-key'), 'olleH')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.sleeps, [0.0, 0.0])
+        self.assertEqual(self.client.stats()['retries'], 2)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.throttle = 10
+        client = DeepLClient(api_url=self.url, gateway=HttpGateway(), max_retries=2, sleep=self.sleeps.append)
+
+        with self.assertRaises(MTError) as ctx:
+            client.translate('Hello', 'ES', 'good-key')
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_interactive_call_is_not_retried(self):
+        self.server.throttle = 1
+
+        with self.assertRaises(MTError) as ctx:
+            self.client.translate('Hello', 'ES', 'good-key', interactive=True)
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_bad_key_is_not_retried(self):
+        with self.assertRaises(MTAuthError):
+            self.client.translate('Hello', 'ES', 'bad-key')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_pretranslate_fills_only_empty_unlocked_segments(self):
+        app = create_app(TestConfig)
+        with app.app_context():
+            db.create_all()
+            user = User(email='mt@example.com')
+            db.session.add(user)
+            db.session.flush()
+            project = Project(filename='doc.docx', user_id=user.id)
+            db.session.add(project)
+            db.session.flush()
+            para = Paragraph(project_id=project.id, p_idx=0, original_text='...')
+            db.session.add(para)
+            db.session.flush()
+            empty = Segment(paragraph_id=para.id, s_idx=0, source_text='First.')
+            done = Segment(paragraph_id=para.id, s_idx=1, source_text='Second.', target_text='Segundo.')
+            locked = Segment(paragraph_id=para.id, s_idx=2, source_text='Third.', locked_by_user_id=user.id)
+            db.session.add_all([empty, done, locked])
+            db.session.commit()
+
+            progress = []
+            cache = TranslationCache(path=':memory:')
+            summary = pretranslate_project(project.id, user.id, 'good-key', 'ES', client=self.client, cache=cache,
+                                           progress=lambda s, written: progress.append(written))
+            cache.close()
+
+            self.assertEqual(summary, {'total': 2, 'completed': 2, 'written': 1, 'skipped': 1})
+            self.assertEqual(progress, [[(empty.id, '.tsriF')]])
+            db.session.expire_all()
+            self.assertEqual(db.session.get(Segment, empty.id).target_text, '.tsriF')
+            self.assertEqual(db.session.get(Segment, empty.id).last_modified_by_id, user.id)
+            self.assertEqual(db.session.get(Segment, done.id).target_text, 'Segundo.')
+            self.assertFalse(db.session.get(Segment, locked.id).target_text)
+            db.session.remove()
+            db.drop_all()
+
+if __name__ == "__main__":
+    unittest.main()
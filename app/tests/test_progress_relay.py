@@ -0,0 +1,62 @@
+import json
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.config import Config
+from app.models import User, Project, AITranslationJob
+from app.services.progress_relay import ProgressRelay, PROGRESS_EVENT
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+class ProgressRelayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.relay = ProgressRelay()
+        self.relay.app = self.app
+        self.emit = mock.patch('app.extensions.socketio.emit').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_emits_to_project_room(self):
+        self.relay.handle(json.dumps({'job_id': 3, 'project_id': 9, 'completed': 5, 'total': 10}))
+
+        self.emit.assert_called_once()
+        args, kwargs = self.emit.call_args
+        self.assertEqual(args[0], PROGRESS_EVENT)
+        self.assertEqual(args[1]['completed'], 5)
+        self.assertEqual(kwargs['to'], 'project_9')
+
+    def test_looks_up_project_when_missing(self):
+        user = User(email='relay@example.com')
+        db.session.add(user)
+        db.session.flush()
+        project = Project(filename='mark.docx', user_id=user.id)
+        db.session.add(project)
+        db.session.flush()
+        job = AITranslationJob(project_id=project.id, user_id=user.id, total_segments=4)
+        db.session.add(job)
+        db.session.commit()
+
+        message = self.relay.handle(json.dumps({'job_id': job.id, 'completed': 1, 'total': 4}))
+
+        self.assertEqual(message['project_id'], project.id)
+        self.assertEqual(self.emit.call_args[1]['to'], f'project_{project.id}')
+
+    def test_drops_unknown_job_and_garbage(self):
+        self.assertIsNone(self.relay.handle(json.dumps({'job_id': 12345})))
+        self.assertIsNone(self.relay.handle('not json'))
+        self.emit.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.config import Config
+from app.models import User, Project, Paragraph, Segment, TranslationMemory, AITranslationJob, AISuggestion
+from app.utils import lookup_tm_batch
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    ENABLE_AI_FEATURES = True
+    AI_TM_THRESHOLD = 0.9
+
+class TMPrepassTests(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.user = User(email='tm@example.com')
+        db.session.add(self.user)
+        db.session.flush()
+        db.session.add_all([
+            TranslationMemory(user_id=self.user.id, lang_pair='EN-ES',
+                              source_text='In the beginning was the Word.',
+                              target_text='En el principio era el Verbo.'),
+            TranslationMemory(user_id=self.user.id, lang_pair='EN-ES',
+                              source_text='And the Word was with God, and the Word was God.',
+                              target_text='Y el Verbo era con Dios, y el Verbo era Dios.'),
+            TranslationMemory(user_id=self.user.id, lang_pair='EN-FR',
+                              source_text='Jesus wept.', target_text='Jésus pleura.'),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_lookup_tm_batch(self):
+        matches = lookup_tm_batch([
+            'in the beginning was  the Word.',
+            'And the Word was with God, and the Word was God!',
+            'Jesus wept.',
+            'Something else entirely.',
+        ], threshold=0.9, user_id=self.user.id, lang_pair='EN-ES')
+
+        self.assertEqual(matches['in the beginning was  the Word.'], ('En el principio era el Verbo.', 100))
+        target, score = matches['And the Word was with God, and the Word was God!']
+        self.assertEqual(target, 'Y el Verbo era con Dios, y el Verbo era Dios.')
+        self.assertTrue(90 <= score < 100)
+        self.assertNotIn('Jesus wept.', matches)
+        self.assertNotIn('Something else entirely.', matches)
+
+    def test_translate_all_sends_only_remainder(self):
+        project = Project(filename='john.docx', user_id=self.user.id, source_lang='EN', target_lang='ES')
+        db.session.add(project)
+        db.session.flush()
+        para = Paragraph(project_id=project.id, p_idx=0)
+        db.session.add(para)
+        db.session.flush()
+        texts = ['In the beginning was the Word.', 'And the Word was with God, and the Word was God!', 'He was in the world.']
+        segments = [Segment(paragraph_id=para.id, s_idx=i, source_text=t) for i, t in enumerate(texts)]
+        db.session.add_all(segments)
+        db.session.commit()
+        segment_ids = [s.id for s in segments]
+
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(self.user.id)
+
+        queue = mock.Mock()
+        with mock.patch('app.routes.get_task_queue', return_value=queue):
+            response = client.post(f'/api/project/{project.id}/translate-all')
+
+        self.assertEqual(response.get_json()['tm_matches'], 2)
+        args, kwargs = queue.enqueue_job.call_args
+        self.assertEqual(args[2], [segment_ids[2]])
+        self.assertEqual(kwargs['pre_resolved'], 2)
+
+        job = AITranslationJob.query.one()
+        self.assertEqual(job.total_segments, 3)
+        self.assertEqual(job.completed_segments, 2)
+        origins = {s.segment_id: s.origin for s in AISuggestion.query.all()}
+        self.assertEqual(origins, {segment_ids[0]: 'tm_exact', segment_ids[1]: 'tm_fuzzy'})
+
+if __name__ == "__main__":
+    unittest.main()
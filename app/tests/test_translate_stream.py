@@ -0,0 +1,62 @@
+import threading
+import unittest
+from unittest import mock
+from app import events
+from app.services.translation_cache import TranslationCache
+
+class FakeStreamingService:
+    model_id = 'fake-model'
+
+    def __init__(self, pieces, cancel_after=None):
+        self.pieces = pieces
+        self.cancel_after = cancel_after
+
+    def translate_stream(self, text, source_lang, target_lang, cancel_event=None):
+        for i, piece in enumerate(self.pieces):
+            if cancel_event.is_set():
+                return
+            yield piece
+            if self.cancel_after == i:
+                events.cancel_stream('sid-1')
+
+class RunStreamTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TranslationCache(path=':memory:')
+        self.emitted = []
+        mock.patch.object(events.socketio, 'emit',
+                          side_effect=lambda name, data, to=None: self.emitted.append((name, data, to))).start()
+        mock.patch.object(events.socketio, 'sleep').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def _run(self, service):
+        cancel = threading.Event()
+        events.active_streams['sid-1'] = cancel
+        events.run_stream('sid-1', {'request_id': 'r1', 'segment_id': 7}, service, self.cache,
+                          'Hello, world', 'EN', 'ES', cancel)
+
+    def test_chunks_then_done(self):
+        self._run(FakeStreamingService(['Hola', ', mundo']))
+
+        chunks = [data['text'] for name, data, to in self.emitted if name == 'translation_chunk']
+        self.assertEqual(chunks, ['Hola', 'Hola, mundo'])
+        name, done, to = self.emitted[-1]
+        self.assertEqual((name, to), ('translation_done', 'sid-1'))
+        self.assertEqual(done['translation'], 'Hola, mundo')
+        self.assertFalse(done['cancelled'])
+        self.assertEqual(self.cache.get('Hello, world', 'EN', 'ES', 'fake-model'), 'Hola, mundo')
+        self.assertNotIn('sid-1', events.active_streams)
+
+    def test_cancel_stops_stream_and_skips_cache(self):
+        self._run(FakeStreamingService(['Hola', ', mundo', ' cruel'], cancel_after=0))
+
+        chunks = [data['text'] for name, data, to in self.emitted if name == 'translation_chunk']
+        self.assertEqual(chunks, ['Hola'])
+        self.assertTrue(self.emitted[-1][1]['cancelled'])
+        self.assertIsNone(self.cache.get('Hello, world', 'EN', 'ES', 'fake-model'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from app.services.translation_cache import TranslationCache, normalize_source
+
+class TranslationCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TranslationCache(path=':memory:', max_entries=10)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_normalized_lookup(self):
+        self.cache.put('For God so  loved the world', 'en', 'es', 'gemma', 'Porque de tal manera amó Dios al mundo')
+
+        self.assertEqual(
+            self.cache.get(' For God so loved\nthe world ', 'EN', 'ES', 'gemma'),
+            'Porque de tal manera amó Dios al mundo'
+        )
+        self.assertIsNone(self.cache.get('for god so loved the world', 'en', 'es', 'gemma'))
+
+    def test_key_includes_language_pair_and_model(self):
+        self.cache.put('Hello', 'en', 'es', 'gemma', 'Hola')
+
+        self.assertIsNone(self.cache.get('Hello', 'en', 'fr', 'gemma'))
+        self.assertIsNone(self.cache.get('Hello', 'en', 'es', 'other-model'))
+
+    def test_get_many_and_stats(self):
+        self.cache.put_many([('One', 'Uno'), ('Two', 'Dos')], 'en', 'es', 'gemma')
+
+        found = self.cache.get_many(['One', 'Two', 'Three', 'One'], 'en', 'es', 'gemma')
+        self.assertEqual(found, {'One': 'Uno', 'Two': 'Dos'})
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.75)
+        self.assertEqual(stats['entries'], 2)
+
+    def test_lru_eviction(self):
+        self.cache.put_many([(f'text {i}', f'texto {i}') for i in range(10)], 'en', 'es', 'gemma')
+        self.cache.get('text 0', 'en', 'es', 'gemma')  # Touch so it survives
+        self.cache.put('text 10', 'en', 'es', 'gemma', 'texto 10')
+
+        self.assertGreater(self.cache.evict(), 0)
+        self.assertLessEqual(self.cache.stats()['entries'], 10)
+        self.assertEqual(self.cache.get('text 0', 'en', 'es', 'gemma'), 'texto 0')
+        self.assertIsNone(self.cache.get('text 1', 'en', 'es', 'gemma'))
+
+    def test_normalize_source(self):
+        self.assertEqual(normalize_source('  a\t b \n'), 'a b')
+        self.assertEqual(normalize_source(None), '')
+
+if __name__ == "__main__":
+    unittest.main()
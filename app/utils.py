@@ -1,12 +1,15 @@
 import re
 import os
+import bisect
 import difflib
-import requests
 import spacy
 import csv
 import docx
 from flask import current_app
 from app.models import db, TranslationMemory, Glossary
+from app.services.mt_cache import translate_cached
+from app.services.mt_client import MTAuthError
+from app.services.citation_scanner import get_citation_scanner, bible_data, egw_data
 
 # Load Spacy Model (Lazily loaded)
 _nlp = None
@@ -29,6 +32,42 @@ def get_nlp():
                 _nlp = DummyNLP()
     return _nlp
 
+# Pronouns that shouldn't start a new segment after a clause without a sentence end
+SEGMENT_PRONOUNS = ['He', 'She', 'Him', 'Her', 'His', 'They', 'Them', 'Their', 'It', 'Its']
+VERSE_REF_REGEX = re.compile(r'^\d?\s*[A-Za-z]+\s+\d+:\d+(?:-\d+)?$')
+
+def segment_paragraph(text, nlp=None):
+    """
+    Split one paragraph into translation segments.
+
+    spaCy sentences are post-processed: a sentence starting with a pronoun
+    after one that did not end properly, or a standalone verse reference
+    (e.g. "John 3:16"), is merged into the previous segment.
+
+    Returns:
+        List of segment texts; the whole paragraph if spaCy finds no sentence
+    """
+    nlp = nlp or get_nlp()
+    sents = [s.text.strip() for s in nlp(text).sents if s.text.strip()]
+    if not sents:
+        return [text]
+
+    merged = []
+    for i, sent in enumerate(sents):
+        if i == 0:
+            merged.append(sent)
+            continue
+
+        prev = sents[i-1]
+        starts_with_pronoun = any(sent.startswith(p + ' ') or sent == p for p in SEGMENT_PRONOUNS)
+        prev_ends_properly = prev.rstrip().endswith(('.', '!', '?', '."', '!"', '?"'))
+
+        if (starts_with_pronoun and not prev_ends_properly) or VERSE_REF_REGEX.match(sent):
+            merged[-1] += ' ' + sent
+        else:
+            merged.append(sent)
+    return merged
+
 class TextUtils:
     BIBLE_BOOK_MAP = {
         # Antiguo Testamento (Spanish names & abbreviations)
@@ -227,60 +266,13 @@ class TextUtils:
 
     @staticmethod
     def get_bible_url(text):
-        if not text: return None
-        
-        # New regex: supports abbreviations, optional dots, flexible spacing, and complex verse strings
-        # Groups: 1: opt leading number, 2: book name, 3: chapter, 4: verses (range/list)
-        regex = r'\b(?:([1-3]\s*)?([A-Z][a-zñáéíóúÁÉÍÓÚ]*)\.?\s*)(\d+):([\d\s\-,]+)'
-        
-        matches = list(re.finditer(regex, text, re.I))
-        if not matches:
-            return None
-        
-        # Filter matches to only include valid bible books
-        valid_match = None
-        book_en = None
-        for match in matches:
-            book_raw = (match.group(1) or "") + match.group(2)
-            book_clean = book_raw.strip().lower()
-            
-            # Check if it's a valid book name/abbreviation
-            if book_clean in TextUtils.BIBLE_BOOK_MAP:
-                book_en = TextUtils.BIBLE_BOOK_MAP[book_clean]
-                valid_match = match
-                break
-        
-        if not valid_match:
-            return None
-        
-        # Process the valid match
-        citation_string = valid_match.group(0).strip()
-        chapter = valid_match.group(3)
-        verse_str = valid_match.group(4).strip()
-        
-        # Build URL query for BibleGateway
-        url_ref = f"{chapter}:{verse_str}".replace(' ', '').replace(',', '%2C').replace(':', '%3A')
-        query = f"{book_en}%20{url_ref}"
-        
-        BASE_URL = "https://www.biblegateway.com/passage/?search="
-        VERSION = "&version=RVR1960"
-        
-        # API Data for first citation found
-        book_id = TextUtils.BIBLE_BOOK_IDS.get(book_en)
-        api_data = None
-        if book_id:
-            api_data = {
-                "book_id": book_id,
-                "chapter": chapter,
-                "verse": verse_str # Pass the full verse string to frontend
-            }
+        """
+        First Bible reference in text, with its BibleGateway URL and bolls.life ids.
 
-        return {
-            "en": f"{BASE_URL}{query}{VERSION}", 
-            "type": "bible",
-            "api_data": api_data,
-            "match": citation_string
-        }
+        Returns:
+            {'en', 'type': 'bible', 'api_data': {book_id, chapter, verse}, 'match'} or None
+        """
+        return bible_data(get_citation_scanner().scan(text))
 
     @staticmethod
     def get_egw_url(text, lang_code="EN"):
@@ -292,79 +284,14 @@ class TextUtils:
         - The Desire of Ages, p. 214.1
         - (Desire of Ages, p. 214.1)
         - {DA 214.1}
+        Abbreviated and known-title references win over unknown titles,
+        which fall back to a Google search.
         """
-        if not text: return {"en": None, "type": "none"}
-        
-        # Load abbreviations for the specified language
-        abbrevs = TextUtils.load_abbreviations(lang_code)
-        if not abbrevs:
-            return {"en": None, "type": "none"}
-
-        BASE_URL_EN = "https://m.egwwritings.org/en/search?query="
-        GOOGLE_URL = "https://www.google.com/search?q="
-        
-        # Priority 1: Look for abbreviated format: DA 214.1, CE 21.1, 1MCP 23.4
-        abbr_regex = r'\b([1-9]?[A-Z][A-Za-z]{1,5})\s+(\d+\.\d+)\b'
-        abbr_match = re.search(abbr_regex, text)
-        if abbr_match:
-            abbr = abbr_match.group(1)
-            ref = abbr_match.group(2)
-            # Check if this abbreviation exists
-            if abbr in abbrevs.values():
-                query = f"{abbr}+{ref}"
-                return {"en": f"{BASE_URL_EN}{query}", "type": "egw", "match": abbr_match.group(0)}
-
-        # Priority 2: Look for page reference pattern and search backwards for title
-        # Matches: digits.digits format like 214.1
-        page_regex = r'(\d+\.\d+)'
-        page_matches = list(re.finditer(page_regex, text))
-        
-        for page_match in page_matches:
-            ref = page_match.group(1)
-            # Look backwards from page ref for title
-            prefix = text[:page_match.start()]
-            
-            # Try to find a title pattern: "Title, p." or "Title,"
-            title_regex = r'([A-Z][A-Za-z\s\']+?)(?:,\s*(?:p\.?\s*)?|,?\s+(?:p\.?\s*)?)$'
-            title_match = re.search(title_regex, prefix)
-            
-            if title_match:
-                raw_title = title_match.group(1).strip()
-                full_match_str = raw_title + text[title_match.end():page_match.end()]
-                
-                # Try to find this title in abbreviations
-                # Check exact match first
-                if raw_title in abbrevs:
-                    abbr = abbrevs[raw_title]
-                    query = f"{abbr}+{ref}"
-                    return {"en": f"{BASE_URL_EN}{query}", "type": "egw", "match": full_match_str.strip()}
-                
-                # Check if it's already an abbreviation
-                if raw_title in abbrevs.values():
-                    query = f"{raw_title}+{ref}"
-                    return {"en": f"{BASE_URL_EN}{query}", "type": "egw", "match": full_match_str.strip()}
-                
-                # Try partial match - maybe missing "The" prefix
-                for full_title, abbr in abbrevs.items():
-                    # Check if raw_title is at the end of full_title (e.g., "Desire of Ages" in "The Desire of Ages")
-                    if full_title.endswith(raw_title) or raw_title == full_title:
-                        query = f"{abbr}+{ref}"
-                        return {"en": f"{BASE_URL_EN}{query}", "type": "egw", "match": full_match_str.strip()}
-                    # Also try case-insensitive
-                    if full_title.lower().endswith(raw_title.lower()):
-                        query = f"{abbr}+{ref}"
-                        return {"en": f"{BASE_URL_EN}{query}", "type": "egw", "match": full_match_str.strip()}
-                
-                # Fallback to Google search
-                clean_title = raw_title.replace(" ", "+")
-                query = f"{clean_title}+{ref}+Ellen+White"
-                return {"en": f"{GOOGLE_URL}{query}", "type": "google", "match": full_match_str.strip()}
-
-        return {"en": None, "type": "none"}
+        return egw_data(get_citation_scanner(lang_code).scan(text))
 
 
     @staticmethod
-    def get_mt_translation(text, target_lang="ES", api_key=None):
+    def get_mt_translation(text, target_lang="ES", api_key=None, user_id=None):
         if not text.strip(): return ""
         
         # Use provided key or fallback to config
@@ -373,24 +300,12 @@ class TextUtils:
         if not key_to_use:
              return None # Let caller handle missing key error
 
-        URL = "https://api-free.deepl.com/v2/translate"
-        headers = {"Authorization": f"DeepL-Auth-Key {key_to_use}"}
-        data = {
-            'text': [text],
-            'source_lang': 'EN',
-            'target_lang': target_lang.upper()
-        }
         try:
-            response = requests.post(URL, headers=headers, data=data, timeout=10)
-            if response.status_code == 403:
-                return "Error: Invalid API Key"
-            response.raise_for_status()
-            result = response.json()
-            if 'translations' in result:
-                return result['translations'][0]['text']
+            return translate_cached([text], target_lang, key_to_use, user_id=user_id)[0]
+        except MTAuthError:
+            return "Error: Invalid API Key"
         except Exception as e:
             return f"Error MT: {e}"
-        return "Unknown MT Error"
 
 def lookup_tm(source_text, threshold=0.75, user_id=None):
     norm_source = TextUtils.normalize(source_text)
@@ -424,6 +339,77 @@ def lookup_tm(source_text, threshold=0.75, user_id=None):
             
     return best_match, int(best_score * 100)
 
+def lookup_tm_batch(source_texts, threshold=0.9, user_id=None, lang_pair=None):
+    """
+    Resolve many source texts against the TM in a single pass.
+    
+    Loads the TM once, answers exact (normalized) matches from a dict and
+    only runs difflib for the rest, limited to TM entries whose length can
+    still reach the threshold.
+    
+    Args:
+        source_texts: Iterable of source strings
+        threshold: Minimum similarity ratio (0-1) for fuzzy matches
+        user_id: Restrict to this user's TM
+        lang_pair: Restrict to entries for this pair (entries without one also match)
+        
+    Returns:
+        Dict of {source_text: (target_text, score)} for matched texts, score in percent
+    """
+    query = TranslationMemory.query
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    if lang_pair:
+        query = query.filter(db.or_(TranslationMemory.lang_pair == lang_pair,
+                                    TranslationMemory.lang_pair.is_(None)))
+    
+    exact = {}
+    for tm in query.with_entities(TranslationMemory.source_text, TranslationMemory.target_text):
+        norm = TextUtils.normalize(tm.source_text)
+        if norm:
+            exact[norm] = tm.target_text
+    
+    # Sorted by length so candidates for each source are a contiguous slice
+    by_length = sorted(exact, key=len)
+    lengths = [len(s) for s in by_length]
+    
+    matches = {}
+    fuzzy_cache = {}
+    for text in source_texts:
+        norm = TextUtils.normalize(text)
+        if not norm or text in matches:
+            continue
+        if norm in exact:
+            matches[text] = (exact[norm], 100)
+            continue
+        if norm not in fuzzy_cache:
+            fuzzy_cache[norm] = _best_fuzzy_match(norm, by_length, lengths, exact, threshold)
+        if fuzzy_cache[norm]:
+            matches[text] = fuzzy_cache[norm]
+    return matches
+
+def _best_fuzzy_match(norm_source, by_length, lengths, targets, threshold):
+    # ratio() <= 2*min(a, b) / (a + b), so lengths outside this window can't qualify
+    n = len(norm_source)
+    lo = bisect.bisect_left(lengths, n * threshold / (2 - threshold))
+    hi = bisect.bisect_right(lengths, n * (2 - threshold) / threshold)
+    
+    best_match = None
+    best_score = 0.0
+    matcher = difflib.SequenceMatcher(None, "", norm_source)
+    for candidate in by_length[lo:hi]:
+        matcher.set_seq1(candidate)
+        if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+            continue
+        score = matcher.ratio()
+        if score >= threshold and score > best_score:
+            best_score = score
+            best_match = targets[candidate]
+    
+    if best_match is None:
+        return None
+    return best_match, int(best_score * 100)
+
 def lookup_glossary(source_text, user_id=None):
     norm_source = TextUtils.normalize(source_text)
     matches = []
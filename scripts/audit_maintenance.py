@@ -0,0 +1,57 @@
+"""
+AuditLog maintenance job: daily rollups, archiving and purging.
+
+Intended to run from cron (e.g. nightly).
+Usage:
+    python scripts/audit_maintenance.py all
+    python scripts/audit_maintenance.py rollup [--since 2025-01-01]
+    python scripts/audit_maintenance.py archive [--days 90]
+    python scripts/audit_maintenance.py purge --days 730
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services import audit_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AuditLog retention and rollups")
+    parser.add_argument("command", choices=["all", "rollup", "archive", "purge"])
+    parser.add_argument("--days", type=int, help="Retention window in days (overrides config)")
+    parser.add_argument("--since", help="First day to recompute rollups (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        retention_days = args.days or app.config['AUDIT_RETENTION_DAYS']
+
+        if args.command == "rollup":
+            since = datetime.strptime(args.since, '%Y-%m-%d').date() if args.since else None
+            rows = audit_retention.rollup_daily_stats(since)
+            print(f"Rollup complete: {rows} user/project/day rows")
+        elif args.command == "archive":
+            archived = audit_retention.archive_audit_logs(retention_days)
+            print(f"Archived {archived} audit rows older than {retention_days} days")
+        elif args.command == "purge":
+            days = args.days or app.config['AUDIT_ARCHIVE_RETENTION_DAYS']
+            if not days:
+                print("Archive retention is unlimited (AUDIT_ARCHIVE_RETENTION_DAYS=0); nothing to purge")
+                return
+            purged = audit_retention.purge_archive(days)
+            print(f"Purged {purged} archived rows older than {days} days")
+        else:
+            result = audit_retention.run_retention(
+                retention_days, app.config['AUDIT_ARCHIVE_RETENTION_DAYS']
+            )
+            print(f"Maintenance complete: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,84 @@
 """
-Benchmark script for Gemma AI Translation.
+Benchmark suite for Gemma AI Translation.
 
-Measures translation performance and estimates document completion times.
-Usage: python scripts/benchmark.py [--segments 50] [--output benchmark.json]
+Replays a corpus through the inference path the AI worker uses (translation
+cache lookup, then batched generation of the misses) and reports, per
+backend and batch size:
+- Throughput: segments/sec and generated tokens/sec over the whole pass
+- Latency: p50/p90/p95/p99/max per batch, for any number of samples
+- Time to first token and full streaming time on a sample of segments
+- Peak and current RSS after loading and after each run (plus CUDA peak)
+- Translation cache hit rate on the cold pass and lookup cost when warm
+- Token budget use and stop reasons from GemmaService.generation_stats()
+
+Every report carries the git revision, host, CPU, library versions, the
+GEMMA_* / AI_* settings and a hash of the corpus, so results from different
+releases or machines can be compared (--compare) or appended to one CSV.
+
+Usage:
+    python scripts/benchmark.py [--docx file.docx | --project-id 12 | --segments 50]
+                                [--backend transformers,onnx | all] [--batch-sizes 1,4,8]
+                                [--source-lang en] [--target-lang es] [--limit 500]
+                                [--warmup 2] [--ttft-samples 10]
+                                [--output report.json] [--csv history.csv]
+                                [--compare baseline.json]
 """
 
 import sys
 import os
 import time
 import argparse
+import csv
+import hashlib
 import json
-import statistics
-from datetime import timedelta
+import math
+import platform
+import socket
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.services.gemma_service import GemmaService
+from app.services.gemma_service import GemmaService, BACKENDS, GEMMA_BACKEND, MAX_BATCH_SIZE
+from app.services.translation_cache import TranslationCache
+
+# Bump when fields are renamed or change meaning, so old reports are not misread
+REPORT_VERSION = 2
+
+# Segments looked up and translated together, as the worker does per chunk
+CHUNK_SIZE = int(os.environ.get('AI_CHUNK_SIZE', '64'))
+
+# Environment prefixes that change inference behaviour and belong in the report
+CONFIG_PREFIXES = ('GEMMA_', 'AI_', 'TRANSLATION_CACHE_')
+
+# Libraries whose versions are recorded with each run
+TRACKED_PACKAGES = ('torch', 'transformers', 'accelerate', 'bitsandbytes', 'optimum',
+                    'onnxruntime', 'llama-cpp-python')
 
-# Sample texts (mixed lengths)
+# Metrics compared by --compare: name -> True if higher is better
+COMPARED_METRICS = {
+    'segments_per_sec': True,
+    'tokens_per_sec': True,
+    'batch_p95_ms': False,
+    'ttft_p50_ms': False,
+    'peak_rss_mb': False,
+}
+
+# Changes beyond this fraction are flagged as regressions
+REGRESSION_THRESHOLD = 0.05
+
+CSV_FIELDS = [
+    'timestamp', 'git_commit', 'host', 'cpu', 'corpus_hash', 'segments',
+    'backend', 'batch_size', 'device', 'quantized', 'load_seconds',
+    'wall_seconds', 'segments_per_sec', 'tokens_per_sec', 'decode_tokens_per_sec',
+    'batch_p50_ms', 'batch_p95_ms', 'batch_p99_ms', 'ttft_p50_ms', 'ttft_p95_ms',
+    'peak_rss_mb', 'cache_hit_rate', 'budget_used', 'error',
+]
+
+# Sample texts (mixed lengths), used when no corpus is given
 SAMPLE_TEXTS = [
     "Hello, how are you today?",
     "The integration of artificial intelligence in daily workflows significantly enhances productivity.",
@@ -32,80 +92,567 @@ SAMPLE_TEXTS = [
     "Thank you for your business."
 ]
 
-def run_benchmark(num_segments=10, output_file=None):
-    print("=" * 60)
-    print(f"Starting Gemma Translation Benchmark ({num_segments} segments)")
-    print("=" * 60)
-    
-    # Initialize service
-    print("Initializing model (this may take time)...")
-    service = GemmaService()
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """
+    Linearly interpolated percentile, defined for any non-empty sample.
+
+    Args:
+        values: Samples, in any order
+        p: Percentile between 0 and 100
+
+    Returns:
+        The percentile rounded to 0.1, or None for no samples
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    value = ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+    return round(value, 1)
+
+
+def summarize(values: List[float]) -> Dict:
+    """Count, mean and p50/p90/p95/p99/min/max of a sample."""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 1),
+        'min': round(min(values), 1),
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': round(max(values), 1),
+    }
+
+
+# --- Corpus --------------------------------------------------------------
+
+def corpus_from_docx(path: str) -> List[str]:
+    """Segment a DOCX file the way uploads are segmented."""
+    from docx import Document
+    from app.utils import get_nlp, segment_paragraph
+
+    nlp = get_nlp()
+    segments = []
+    for p in Document(path).paragraphs:
+        text = p.text.strip()
+        if text:
+            segments.extend(segment_paragraph(text, nlp))
+    return segments
+
+
+def corpus_from_project(project_id: int) -> Dict:
+    """
+    Load a project's source segments in document order.
+
+    Returns:
+        Dict with segments, source_lang and target_lang
+    """
+    from app import create_app
+    from app.extensions import db
+    from app.models import Project, Paragraph, Segment
+
+    app = create_app()
+    with app.app_context():
+        project = db.session.get(Project, project_id)
+        if project is None:
+            raise ValueError(f"Project {project_id} not found")
+        rows = db.session.query(Segment.source_text).join(Paragraph).filter(
+            Paragraph.project_id == project_id
+        ).order_by(Paragraph.p_idx, Segment.s_idx).all()
+        return {
+            'segments': [row.source_text for row in rows],
+            'source_lang': project.source_lang,
+            'target_lang': project.target_lang,
+        }
+
+
+def sample_corpus(num_segments: int) -> List[str]:
+    """Cycle the built-in sample texts up to num_segments."""
+    return [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(num_segments)]
+
+
+def corpus_info(segments: List[str], source: str) -> Dict:
+    """Size and fingerprint of a corpus; equal hashes mean identical input."""
+    digest = hashlib.sha256('\n'.join(segments).encode('utf-8')).hexdigest()
+    chars = [len(s) for s in segments]
+    return {
+        'source': source,
+        'segments': len(segments),
+        'unique_segments': len(set(segments)),
+        'chars': sum(chars),
+        'chars_per_segment': summarize(chars),
+        'hash': digest[:16],
+    }
+
+
+# --- Environment ---------------------------------------------------------
+
+def rss_mb() -> Dict:
+    """
+    Current and peak resident set size of this process, in MB.
+
+    ru_maxrss is a high-water mark for the whole process, so later runs in
+    one invocation report at least the peak of earlier ones.
+    """
+    info = {'current': None, 'peak': None}
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        info['peak'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        info['current'] = round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import torch
+        if torch.cuda.is_available():
+            info['cuda_peak'] = round(torch.cuda.max_memory_allocated() / (1024 * 1024), 1)
+    except ImportError:
+        pass
+    return info
+
+
+def reset_cuda_peak() -> None:
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+    except ImportError:
+        pass
+
+
+def cpu_model() -> str:
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def git_revision() -> Dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, timeout=10).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit[:12] or None, 'dirty': dirty}
+
+
+def package_versions(names: Iterable[str] = TRACKED_PACKAGES) -> Dict:
+    from importlib import metadata
+    versions = {}
+    for name in names:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def run_metadata() -> Dict:
+    """Everything that identifies where and with what code a run happened."""
+    total_memory_gb = None
+    try:
+        total_memory_gb = round(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3, 1)
+    except (ValueError, OSError, AttributeError):
+        pass
+    gpu = None
+    try:
+        import torch
+        if torch.cuda.is_available():
+            gpu = torch.cuda.get_device_name(0)
+    except ImportError:
+        pass
+    return {
+        'report_version': REPORT_VERSION,
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'git': git_revision(),
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu': cpu_model(),
+        'cpu_count': os.cpu_count(),
+        'total_memory_gb': total_memory_gb,
+        'gpu': gpu,
+        'packages': package_versions(),
+        'config': {k: v for k, v in sorted(os.environ.items()) if k.startswith(CONFIG_PREFIXES)},
+    }
+
+
+# --- Measurement ---------------------------------------------------------
+
+def measure_ttft(service, texts: List[str], source_lang: str, target_lang: str) -> Dict:
+    """Time to first streamed piece and to the end of the stream, per text."""
+    first, total = [], []
+    for text in texts:
+        start = time.perf_counter()
+        first_at = None
+        for _ in service.translate_stream(text, source_lang, target_lang):
+            if first_at is None:
+                first_at = time.perf_counter()
+        end = time.perf_counter()
+        if first_at is not None:
+            first.append((first_at - start) * 1000)
+        total.append((end - start) * 1000)
+    return {'ttft_ms': summarize(first), 'stream_ms': summarize(total)}
+
+
+def run_pass(service, segments: List[str], source_lang: str, target_lang: str, batch_size: int,
+             cache: TranslationCache, chunk_size: int = CHUNK_SIZE) -> Dict:
+    """
+    Translate a corpus chunk by chunk: cache lookup, then batched generation
+    of the distinct misses, then cache write, as the AI worker does.
+
+    Returns:
+        Dict with wall time, per-batch times, translated and cached counts
+    """
+    batch_ms = []
+    translated = 0
+    empty = 0
+    start = time.perf_counter()
+    for offset in range(0, len(segments), chunk_size):
+        chunk = segments[offset:offset + chunk_size]
+        cached = cache.get_many(chunk, source_lang, target_lang, service.model_id)
+        misses = list(dict.fromkeys(text for text in chunk if text not in cached))
+        if not misses:
+            continue
+        results = []
+        batch_start = time.perf_counter()
+        for indices, batch_results in service.iter_translate_batches(
+                misses, source_lang, target_lang, max_batch_size=batch_size):
+            now = time.perf_counter()
+            batch_ms.append((now - batch_start) * 1000)
+            batch_start = now
+            for idx, (translation, _) in zip(indices, batch_results):
+                results.append((misses[idx], translation))
+                translated += 1
+                empty += 0 if translation else 1
+        cache.put_many(results, source_lang, target_lang, service.model_id)
+    return {
+        'wall_seconds': time.perf_counter() - start,
+        'batch_ms': batch_ms,
+        'translated': translated,
+        'empty': empty,
+    }
+
+
+def run_benchmark(segments: List[str], backend: str = GEMMA_BACKEND, batch_sizes: Iterable[int] = (MAX_BATCH_SIZE,),
+                  source_lang: str = "en", target_lang: str = "es", warmup: int = 2,
+                  ttft_samples: int = 10, service=None) -> Dict:
+    """
+    Benchmark one backend over a batch-size sweep.
+
+    Args:
+        segments: Corpus to translate
+        backend: One of BACKENDS
+        batch_sizes: max_batch_size values to sweep
+        source_lang: ISO language code of the source
+        target_lang: ISO language code of the target
+        warmup: Segments translated (unmeasured) after loading
+        ttft_samples: Segments streamed for time to first token
+        service: GemmaService-like object (defaults to the singleton)
+
+    Returns:
+        Dict with load metrics and one result per batch size
+    """
+    service = service or GemmaService()
+    print(f"\n=== {backend}: loading model ===")
+    service.set_backend(backend)
+    reset_cuda_peak()
+    load_start = time.perf_counter()
     service.initialize()
-    print(f"Device Info: {service.device_info}")
-    
-    times = []
-    results = []
-    
-    print("\nRunning translations...")
-    for i in range(num_segments):
-        # Cycle through sample texts
-        text = SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]
-        
-        print(f"[{i+1}/{num_segments}] Translating ({len(text)} chars)... ", end="", flush=True)
-        
-        translation, time_ms = service.translate(text, "es")
-        times.append(time_ms)
-        
-        results.append({
-            "id": i+1,
-            "source_len": len(text),
-            "target_len": len(translation),
-            "time_ms": time_ms
-        })
-        
-        print(f"{time_ms}ms")
-    
-    # Calculate stats
-    avg_time = statistics.mean(times)
-    min_time = min(times)
-    max_time = max(times)
-    p95 = sorted(times)[int(len(times) * 0.95)] if len(times) >= 20 else max_time
-    
-    stats = {
-        "total_segments": num_segments,
-        "total_time_ms": sum(times),
-        "avg_time_ms": avg_time,
-        "min_time_ms": min_time,
-        "max_time_ms": max_time,
-        "p95_time_ms": p95,
-        "device_info": service.device_info,
-        "estimates": {
-            "1_page_doc_50_segs": f"{timedelta(milliseconds=avg_time * 50)}",
-            "10_page_doc_500_segs": f"{timedelta(milliseconds=avg_time * 500)}",
-            "large_doc_2000_segs": f"{timedelta(milliseconds=avg_time * 2000)}"
+    load_seconds = time.perf_counter() - load_start
+    device_info = service.device_info
+    print(f"Loaded in {load_seconds:.1f}s: {device_info}")
+
+    report = {
+        'backend': backend,
+        'device_info': device_info,
+        'load_seconds': round(load_seconds, 2),
+        'rss_after_load_mb': rss_mb(),
+        'runs': [],
+    }
+
+    if warmup:
+        list(service.iter_translate_batches(segments[:warmup], source_lang, target_lang))
+
+    # Unique texts keep one sample from hitting the cache of another
+    ttft_texts = list(dict.fromkeys(segments))[:ttft_samples]
+
+    for batch_size in batch_sizes:
+        print(f"--- {backend}, batch size {batch_size}: {len(segments)} segments ---")
+        with tempfile.TemporaryDirectory() as tmp:
+            # A fresh cache per run: hit rates reflect repetition within the corpus only
+            cache = TranslationCache(path=os.path.join(tmp, 'cache.db'))
+            try:
+                service.reset_stats()
+                cold = run_pass(service, segments, source_lang, target_lang, batch_size, cache)
+                generation = service.generation_stats()
+                cold_cache = cache.stats()
+
+                cache.hits = cache.misses = 0
+                warm = run_pass(service, segments, source_lang, target_lang, batch_size, cache)
+                warm_cache = cache.stats()
+            finally:
+                cache.close()
+
+        totals = generation.get('totals', {})
+        wall = cold['wall_seconds']
+        run = {
+            'batch_size': batch_size,
+            'wall_seconds': round(wall, 3),
+            'segments_per_sec': round(len(segments) / wall, 3) if wall > 0 else None,
+            'translated': cold['translated'],
+            'empty_translations': cold['empty'],
+            'batch_ms': summarize(cold['batch_ms']),
+            'tokens': totals,
+            'tokens_per_sec': round(totals.get('new_tokens', 0) / wall, 2) if wall > 0 else None,
+            'decode_tokens_per_sec': generation.get('avg_tokens_per_sec'),
+            'budget_used': generation.get('budget_used'),
+            'stop_reasons': generation.get('stop_reasons', {}),
+            'prefix_reuse_rate': generation.get('prefix_reuse_rate'),
+            'cache': {
+                'cold_hit_rate': cold_cache['hit_rate'],
+                'warm_hit_rate': warm_cache['hit_rate'],
+                'warm_wall_seconds': round(warm['wall_seconds'], 3),
+                'entries': warm_cache['entries'],
+            },
         }
+        if ttft_texts:
+            run.update(measure_ttft(service, ttft_texts, source_lang, target_lang))
+        run['rss_mb'] = rss_mb()
+        report['runs'].append(run)
+
+        print(f"{run['segments_per_sec']} seg/s, {run['tokens_per_sec']} tok/s, "
+              f"batch p95 {run['batch_ms'].get('p95')}ms, "
+              f"ttft p50 {run.get('ttft_ms', {}).get('p50')}ms, "
+              f"peak RSS {run['rss_mb']['peak']}MB, cache hit {run['cache']['cold_hit_rate']}")
+
+    return report
+
+
+# --- Output --------------------------------------------------------------
+
+def csv_rows(report: Dict) -> List[Dict]:
+    """Flatten a report to one row per backend and batch size."""
+    meta = report['metadata']
+    base = {
+        'timestamp': meta['timestamp'],
+        'git_commit': meta['git']['commit'],
+        'host': meta['host'],
+        'cpu': meta['cpu'],
+        'corpus_hash': report['corpus']['hash'],
+        'segments': report['corpus']['segments'],
     }
-    
-    print("\n" + "=" * 60)
+    rows = []
+    for result in report['backends']:
+        backend_row = dict(base, backend=result['backend'])
+        if 'error' in result:
+            rows.append(dict(backend_row, error=result['error']))
+            continue
+        backend_row.update({
+            'device': result['device_info'].get('device'),
+            'quantized': result['device_info'].get('quantized'),
+            'load_seconds': result['load_seconds'],
+        })
+        for run in result['runs']:
+            rows.append(dict(
+                backend_row,
+                batch_size=run['batch_size'],
+                wall_seconds=run['wall_seconds'],
+                segments_per_sec=run['segments_per_sec'],
+                tokens_per_sec=run['tokens_per_sec'],
+                decode_tokens_per_sec=run['decode_tokens_per_sec'],
+                batch_p50_ms=run['batch_ms'].get('p50'),
+                batch_p95_ms=run['batch_ms'].get('p95'),
+                batch_p99_ms=run['batch_ms'].get('p99'),
+                ttft_p50_ms=run.get('ttft_ms', {}).get('p50'),
+                ttft_p95_ms=run.get('ttft_ms', {}).get('p95'),
+                peak_rss_mb=run['rss_mb']['peak'],
+                cache_hit_rate=run['cache']['cold_hit_rate'],
+                budget_used=run['budget_used'],
+            ))
+    return rows
+
+
+def write_csv(report: Dict, path: str) -> None:
+    """Append the report's rows to a CSV, writing the header for a new file."""
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        if is_new:
+            writer.writeheader()
+        writer.writerows(csv_rows(report))
+
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Relative change of COMPARED_METRICS per backend and batch size.
+
+    Returns:
+        One entry per metric present in both reports, with `regression`
+        set when it moved the wrong way by more than `threshold`
+    """
+    def index(report):
+        return {(row['backend'], row.get('batch_size')): row for row in csv_rows(report)}
+
+    old_rows, new_rows = index(baseline), index(current)
+    changes = []
+    for key, new in new_rows.items():
+        old = old_rows.get(key)
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            changes.append({
+                'backend': key[0],
+                'batch_size': key[1],
+                'metric': metric,
+                'baseline': before,
+                'current': after,
+                'change': round(change, 3),
+                'regression': (-change if higher_is_better else change) > threshold,
+            })
+    return changes
+
+
+def print_summary(report: Dict) -> None:
+    print("\n" + "=" * 78)
     print("RESULTS")
-    print("=" * 60)
-    print(f"Device: {stats['device_info']['device']} (Quantized: {stats['device_info']['quantized']})")
-    print(f"Average time per segment: {avg_time:.0f} ms")
-    print(f"p95 time: {p95} ms")
-    print("-" * 30)
-    print(f"Est. 1 page document (50 segs):  {stats['estimates']['1_page_doc_50_segs']}")
-    print(f"Est. 10 page document (500 segs): {stats['estimates']['10_page_doc_500_segs']}")
-    print("=" * 60)
-    
-    if output_file:
-        with open(output_file, 'w') as f:
-            json.dump(stats, f, indent=2)
-        print(f"Results saved to {output_file}")
+    print("=" * 78)
+    meta = report['metadata']
+    print(f"Commit {meta['git']['commit']}{' (dirty)' if meta['git']['dirty'] else ''} on {meta['host']}, "
+          f"{meta['cpu']} x{meta['cpu_count']}")
+    print(f"Corpus: {report['corpus']['source']}, {report['corpus']['segments']} segments "
+          f"({report['corpus']['unique_segments']} unique), hash {report['corpus']['hash']}")
+    print(f"{'backend':<13}{'batch':>6}{'seg/s':>9}{'tok/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'ttft ms':>9}{'RSS MB':>9}{'hit':>7}")
+    for row in csv_rows(report):
+        if row.get('error'):
+            print(f"{row['backend']:<13} unavailable: {row['error']}")
+            continue
+        print(f"{row['backend']:<13}{row['batch_size']:>6}{row['segments_per_sec'] or 0:>9.2f}"
+              f"{row['tokens_per_sec'] or 0:>9.1f}{row['batch_p50_ms'] or 0:>9.0f}{row['batch_p95_ms'] or 0:>9.0f}"
+              f"{row['ttft_p50_ms'] or 0:>9.0f}{row['peak_rss_mb'] or 0:>9.0f}{row['cache_hit_rate']:>7.2f}")
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--segments", type=int, default=10, help="Number of segments to test")
-    parser.add_argument("--output", help="Output JSON file for results")
+    best = max((row for row in csv_rows(report) if row.get('segments_per_sec')),
+               key=lambda row: row['segments_per_sec'], default=None)
+    if best:
+        per_segment_ms = 1000 / best['segments_per_sec']
+        print("-" * 30)
+        print(f"Fastest: {best['backend']} at batch size {best['batch_size']}")
+        print(f"Est. 1 page document (50 segs):  {timedelta(milliseconds=per_segment_ms * 50)}")
+        print(f"Est. 10 page document (500 segs): {timedelta(milliseconds=per_segment_ms * 500)}")
+        print(f"Est. large document (2000 segs): {timedelta(milliseconds=per_segment_ms * 2000)}")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AI translation backends")
+    corpus = parser.add_mutually_exclusive_group()
+    corpus.add_argument("--docx", help="Benchmark on the segments of a DOCX file")
+    corpus.add_argument("--project-id", type=int, help="Benchmark on the segments of a project")
+    corpus.add_argument("--segments", type=int, default=50, help="Number of built-in sample segments")
+    parser.add_argument("--limit", type=int, help="Use at most this many segments of the corpus")
+    parser.add_argument("--backend", default=GEMMA_BACKEND,
+                        help=f"Comma-separated backends from {', '.join(BACKENDS)}, or 'all'")
+    parser.add_argument("--batch-sizes", default=str(MAX_BATCH_SIZE),
+                        help="Comma-separated max batch sizes to sweep, e.g. 1,4,8")
+    parser.add_argument("--source-lang", help="Source language (default: project's, else en)")
+    parser.add_argument("--target-lang", help="Target language (default: project's, else es)")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured segments after loading")
+    parser.add_argument("--ttft-samples", type=int, default=10, help="Segments streamed for time to first token")
+    parser.add_argument("--output", help="Write the full report to this JSON file")
+    parser.add_argument("--csv", help="Append one row per backend and batch size to this CSV file")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
     args = parser.parse_args()
-    
-    run_benchmark(args.segments, args.output)
+
+    backends = BACKENDS if args.backend == 'all' else tuple(b.strip() for b in args.backend.split(',') if b.strip())
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backend(s): {', '.join(unknown)}")
+    try:
+        batch_sizes = [int(n) for n in args.batch_sizes.split(',') if n.strip()]
+    except ValueError:
+        parser.error("--batch-sizes must be comma-separated integers")
+    if not batch_sizes or min(batch_sizes) < 1:
+        parser.error("--batch-sizes must be positive")
+
+    source_lang, target_lang = 'en', 'es'
+    if args.docx:
+        segments, source = corpus_from_docx(args.docx), f"docx:{os.path.basename(args.docx)}"
+    elif args.project_id:
+        project = corpus_from_project(args.project_id)
+        segments, source = project['segments'], f"project:{args.project_id}"
+        source_lang, target_lang = project['source_lang'] or source_lang, project['target_lang'] or target_lang
+    else:
+        segments, source = sample_corpus(args.segments), "samples"
+    if args.limit:
+        segments = segments[:args.limit]
+    if not segments:
+        parser.error("the corpus has no segments")
+    source_lang = (args.source_lang or source_lang).lower()
+    target_lang = (args.target_lang or target_lang).lower()
+
+    report = {
+        'metadata': run_metadata(),
+        'corpus': dict(corpus_info(segments, source), source_lang=source_lang, target_lang=target_lang),
+        'batch_sizes': batch_sizes,
+        'backends': [],
+    }
+    service = GemmaService()
+    for backend in backends:
+        try:
+            result = run_benchmark(segments, backend, batch_sizes, source_lang, target_lang,
+                                   warmup=args.warmup, ttft_samples=args.ttft_samples, service=service)
+        except Exception as e:
+            print(f"Backend {backend} unavailable: {e}")
+            result = {'backend': backend, 'error': str(e)}
+        report['backends'].append(result)
+        service.unload()
+
+    print_summary(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+    if args.csv:
+        write_csv(report, args.csv)
+        print(f"Rows appended to {args.csv}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('corpus', {}).get('hash') != report['corpus']['hash']:
+            print("Warning: baseline was run on a different corpus")
+        changes = compare_reports(baseline, report)
+        for change in changes:
+            flag = "REGRESSION" if change['regression'] else ""
+            print(f"{change['backend']:<13} batch {change['batch_size']:<4} {change['metric']:<18} "
+                  f"{change['baseline']} -> {change['current']} ({change['change']:+.1%}) {flag}")
+        if any(change['regression'] for change in changes):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for the citation scanner.
+
+Scans a corpus of segments repeatedly and reports segments/sec, time per
+segment (p50/p99 over rounds) and the citations found by type. The
+built-in corpus mixes plain sentences with Bible and EGW references.
+
+Usage:
+    python scripts/benchmark_citations.py [--docx file.docx | --segments 5000]
+                                          [--lang EN] [--rounds 5] [--output report.json]
+"""
+
+import sys
+import os
+import argparse
+import json
+import time
+from collections import Counter
+from typing import Dict, List
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.citation_scanner import get_citation_scanner
+
+SAMPLE_SEGMENTS = [
+    "In the beginning God created the heaven and the earth.",
+    "Porque de tal manera amó Dios al mundo (Juan 3:16-18, 20).",
+    "Compare 1 Cor. 13:4-7 with Romans 8:28 and 2 Pedro 1:3.",
+    "Christ is our example in all things (The Desire of Ages, p. 214.1).",
+    "Education begins at home {CE 21.1}.",
+    "Sustainable development goals aim to address global challenges including poverty, inequality and climate change.",
+    "See also Steps to Christ, 43.2, and Salmos 23:1-3.",
+    "The meeting was moved to 3.30 because of the Annual Report.",
+    "Thank you for your business.",
+    "Éxodo 20:3 y Deuteronomio 6:4-9 son citados en Mind, Character, and Personality, vol. 1, 23.4.",
+]
+
+
+def docx_segments(path: str) -> List[str]:
+    """Segment a DOCX file the way uploads are segmented."""
+    from scripts.benchmark import corpus_from_docx
+    return corpus_from_docx(path)
+
+
+def run(segments: List[str], lang: str, rounds: int) -> Dict:
+    scanner = get_citation_scanner(lang)
+    found = Counter(c['type'] for s in segments for c in scanner.scan(s))
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for s in segments:
+            scanner.scan(s)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    best = timings[0]
+    return {
+        'segments': len(segments),
+        'rounds': rounds,
+        'segments_per_sec': round(len(segments) / best, 1) if best else None,
+        'us_per_segment_p50': round(timings[len(timings) // 2] / len(segments) * 1e6, 2),
+        'us_per_segment_max': round(timings[-1] / len(segments) * 1e6, 2),
+        'citations': dict(found),
+        'pattern_chars': len(scanner.pattern.pattern),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Citation scanner benchmark")
+    parser.add_argument("--docx", help="Scan the segments of a DOCX file")
+    parser.add_argument("--segments", type=int, default=5000, help="Size of the built-in corpus")
+    parser.add_argument("--lang", default="EN", help="Source language (EGW abbreviation file)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.docx:
+        segments = docx_segments(args.docx)
+    else:
+        segments = [SAMPLE_SEGMENTS[i % len(SAMPLE_SEGMENTS)] for i in range(args.segments)]
+
+    report = run(segments, args.lang, args.rounds)
+    print(f"{report['segments']} segments: {report['segments_per_sec']} segments/sec, "
+          f"{report['us_per_segment_p50']} us/segment (p50 of {report['rounds']} rounds)")
+    print(f"Citations: {report['citations']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Import whole Bible versions into the offline Bible store.
+
+Versions come from bolls.life's translation downloads, either fetched
+directly or from a file downloaded beforehand
+(https://bolls.life/static/translations/<slug>.zip).
+Usage:
+    python scripts/import_bible.py RV1960 NVI
+    python scripts/import_bible.py RV1960 --file RV1960.zip
+    python scripts/import_bible.py --list
+    python scripts/import_bible.py --delete RV1960
+"""
+
+import sys
+import os
+import argparse
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.bible_store import get_bible_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Bible versions for offline use")
+    parser.add_argument("versions", nargs="*", help="Version slugs, e.g. RV1960")
+    parser.add_argument("--file", help="Translation .zip or .json to import (one version only)")
+    parser.add_argument("--name", help="Display name of the version (with --file)")
+    parser.add_argument("--language", help="Language shown in the version list (with --file)")
+    parser.add_argument("--list", action="store_true", help="List imported versions and exit")
+    parser.add_argument("--delete", action="store_true", help="Remove the given versions")
+    args = parser.parse_args()
+
+    store = get_bible_store()
+    if args.list or not args.versions:
+        stats = store.stats()
+        for version in stats['versions']:
+            print(f"{version['slug']}: {version['verses']} verses ({version['full_name']}, {version['language']})")
+        print(f"Store: {stats['path']} ({stats['size_mb']} MB)")
+        return 0
+
+    if args.file and len(args.versions) != 1:
+        parser.error("--file imports exactly one version")
+
+    for slug in args.versions:
+        if args.delete:
+            store.delete_version(slug)
+            print(f"{slug}: removed")
+        elif args.file:
+            count = store.import_file(slug, args.file, full_name=args.name, language=args.language)
+            print(f"{slug}: {count} verses imported from {args.file}")
+        else:
+            count = store.import_from_bolls(slug)
+            print(f"{slug}: {count} verses imported from bolls.life")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Download whole Bible versions into the local Bible cache for offline use.
+
+Usage:
+    python scripts/preload_bible.py RV1960 NVI
+    python scripts/preload_bible.py --stats
+"""
+
+import sys
+import os
+import argparse
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.bible_cache import get_bible_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload Bible versions from bolls.life")
+    parser.add_argument("versions", nargs="*", help="Version slugs, e.g. RV1960")
+    parser.add_argument("--stats", action="store_true", help="Show what is cached and exit")
+    args = parser.parse_args()
+
+    cache = get_bible_cache()
+    if args.stats or not args.versions:
+        for slug, chapters in cache.cached_versions().items():
+            print(f"{slug}: {chapters} chapters")
+        return 0
+
+    failed = 0
+    for slug in args.versions:
+        def progress(done, total):
+            if done % 50 == 0 or done == total:
+                print(f"  {slug}: {done}/{total} chapters")
+        summary = cache.preload_version(slug, progress=progress)
+        print(f"{slug}: {summary['loaded']} loaded, {summary['failed']} failed")
+        failed += summary['failed']
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,3 +11,8 @@ if __name__ == "__main__":
     print("Starting Gemma model download...")
     GemmaService.download_model()
     print("Gemma model download finished.")
+    
+    if "--export" in sys.argv:
+        # Quantize once and save locally so every later start is a warm load
+        path = GemmaService().export_local()
+        print(f"Gemma model exported to {path}")
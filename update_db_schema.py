@@ -6,6 +6,26 @@ load_dotenv()
 from app import create_app, db
 from sqlalchemy import text, inspect
 
+def backfill_citations(batch_size=1000):
+    """Fill Segment.citations where it is still NULL, using each project's source language."""
+    from app.models import Project, Paragraph, Segment
+    from app.services.citation_scanner import get_citation_scanner
+
+    total = 0
+    while True:
+        rows = db.session.query(Segment, Project.source_lang).join(
+            Paragraph, Segment.paragraph_id == Paragraph.id
+        ).join(
+            Project, Paragraph.project_id == Project.id
+        ).filter(Segment.citations.is_(None)).limit(batch_size).all()
+        if not rows:
+            break
+        for segment, source_lang in rows:
+            segment.citations = get_citation_scanner(source_lang).scan(segment.source_text)
+        db.session.commit()
+        total += len(rows)
+    print(f"Scanned citations of {total} segments.")
+
 def update_schema():
     print(f"DATABASE_URL from env: {os.environ.get('DATABASE_URL')}")
     app = create_app()
@@ -58,12 +78,56 @@ def update_schema():
                     print("Adding 'locked_at' column to 'segment' table...")
                     conn.execute(text("ALTER TABLE segment ADD COLUMN locked_at TIMESTAMP"))
                     conn.commit()
+
+                if 'citations' not in columns:
+                    print("Adding 'citations' column to 'segment' table...")
+                    conn.execute(text("ALTER TABLE segment ADD COLUMN citations JSON"))
+                    conn.commit()
                     
             print("Segment table check complete.")
         except Exception as e:
             print(f"Error checking/updating 'segment' table: {e}")
 
-        # 3. Create 'audit_log' table if not exists
+        # 3. Check for 'word_count' in 'audit_log' table (used by daily rollups)
+        try:
+            if 'audit_log' in inspector.get_table_names():
+                columns = [c['name'] for c in inspector.get_columns('audit_log')]
+                with db.engine.connect() as conn:
+                    if 'word_count' not in columns:
+                        print("Adding 'word_count' column to 'audit_log' table...")
+                        conn.execute(text("ALTER TABLE audit_log ADD COLUMN word_count INTEGER"))
+                        conn.commit()
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_log_timestamp ON audit_log (timestamp)"))
+                    conn.commit()
+            print("Audit log table check complete.")
+        except Exception as e:
+            print(f"Error checking/updating 'audit_log' table: {e}")
+
+        # 4. Check for 'origin' and 'match_score' in 'ai_suggestion' table (TM pre-pass)
+        try:
+            if 'ai_suggestion' in inspector.get_table_names():
+                columns = [c['name'] for c in inspector.get_columns('ai_suggestion')]
+                with db.engine.connect() as conn:
+                    if 'origin' not in columns:
+                        print("Adding 'origin' column to 'ai_suggestion' table...")
+                        conn.execute(text("ALTER TABLE ai_suggestion ADD COLUMN origin VARCHAR(20) DEFAULT 'ai'"))
+                        conn.commit()
+                    if 'match_score' not in columns:
+                        print("Adding 'match_score' column to 'ai_suggestion' table...")
+                        conn.execute(text("ALTER TABLE ai_suggestion ADD COLUMN match_score INTEGER"))
+                        conn.commit()
+            print("AI suggestion table check complete.")
+        except Exception as e:
+            print(f"Error checking/updating 'ai_suggestion' table: {e}")
+
+        # 5. Scan Bible/EGW citations of segments imported before they were stored
+        try:
+            backfill_citations()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error backfilling segment citations: {e}")
+
+        # 6. Create missing tables (audit_log, audit_log_archive, user_daily_stats)
         print("Creating missing tables (e.g. audit_log)...")
         db.create_all()
         print("Done.")
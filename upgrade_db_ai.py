@@ -52,6 +52,8 @@ def upgrade():
                 suggested_text TEXT NOT NULL,
                 status VARCHAR(20),
                 translation_time_ms INTEGER,
+                origin VARCHAR(20) DEFAULT 'ai',
+                match_score INTEGER,
                 created_at DATETIME,
                 reviewed_at DATETIME,
                 FOREIGN KEY(segment_id) REFERENCES segment(id),
@@ -59,6 +61,16 @@ def upgrade():
             )
             ''')
             
+            # Columns added after the first release
+            cursor.execute("PRAGMA table_info(ai_suggestion)")
+            columns = [row[1] for row in cursor.fetchall()]
+            if 'origin' not in columns:
+                print("Adding origin column to AISuggestion...")
+                cursor.execute("ALTER TABLE ai_suggestion ADD COLUMN origin VARCHAR(20) DEFAULT 'ai'")
+            if 'match_score' not in columns:
+                print("Adding match_score column to AISuggestion...")
+                cursor.execute("ALTER TABLE ai_suggestion ADD COLUMN match_score INTEGER")
+            
             conn.commit()
             conn.close()
             print("Migration complete!")